@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Analysis Checkpoint Journal
+
+Checkpoints long analysis runs by appending one JSON line per finished video
+to youtube_analysis_journal_<CHANNEL_ID>.jsonl, instead of rewriting the whole
+intermediate results file after every video. Appends are flushed at once and
+fsynced in batches, so a crash loses at most the last few videos and never
+corrupts the videos already written.
+
+A restarted run reads the journal and only analyzes the videos missing from
+it. When all videos are done, the journal is compacted into the
+youtube_analysis_intermediate_<CHANNEL_ID>.json file (written atomically) and
+removed.
+"""
+
+import json
+import os
+import threading
+import time
+
+# fsync the journal after this many appends, or this many seconds since the last fsync
+FSYNC_EVERY = 8
+FSYNC_INTERVAL_SECONDS = 2.0
+
+
+def journal_path(channel_id):
+    """
+    Returns the journal file path for a channel.
+    """
+    return f"youtube_analysis_journal_{channel_id}.jsonl"
+
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+class AnalysisJournal:
+    """
+    Append-only JSONL journal. Thread-safe; use as a context manager so the
+    last batch of appends is fsynced on exit.
+    """
+
+    def __init__(self, path, fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL_SECONDS):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+        if self._file.tell() > 0 and not _ends_with_newline(path):
+            # Start on a fresh line after a truncated record from a crashed run
+            self._file.write('\n')
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, record):
+        """
+        Appends one record as a JSON line.
+        """
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                self._sync()
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load_journal(path):
+    """
+    Reads all records from a journal, or an empty list if it does not exist.
+    """
+    if not os.path.exists(path):
+        return []
+
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A crash mid-write can leave a truncated last line
+                    continue
+    return records
+
+
+def load_journaled_analyses(path):
+    """
+    Returns the video analyses recorded in a journal.
+
+    Returns:
+        Dictionary mapping video ID to its analysis entry (later entries win)
+    """
+    analyses = {}
+    for record in load_journal(path):
+        video_id = record.pop('video_id', None)
+        if video_id:
+            analyses[video_id] = record
+    return analyses
+
+
+def write_json_atomic(path, data):
+    """
+    Writes a JSON file through a temporary file and a rename, so readers
+    never see a partially written file.
+    """
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def compact_journal(path, output_path, data):
+    """
+    Writes the compacted results to output_path and removes the journal.
+
+    Args:
+        path: Journal file path
+        output_path: File to write the compacted results to
+        data: Compacted results (JSON-serializable)
+    """
+    write_json_atomic(output_path, data)
+    if os.path.exists(path):
+        os.remove(path)
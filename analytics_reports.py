@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Media Kit Analytics Reports
+
+The media kits are built from independent YouTube Analytics report queries
+(demographics, devices, performance totals...). ANALYTICS_REPORTS declares
+every query once, by the media kit section it fills; each script lists only
+the sections it actually emits and runs them concurrently on a FetchEngine
+with submit_reports(), so building the kit takes as long as the slowest
+query instead of the sum of all of them. A failed query falls back to its
+default response, so one missing section never blocks the others.
+"""
+
+from datetime import datetime, timedelta
+
+from async_engine import execute_request
+
+# Metrics of the performance totals sections, in the order their row is read by totals_section()
+TOTALS_METRICS = "views,estimatedMinutesWatched,averageViewDuration,subscribersGained,likes,comments,shares"
+
+# Report queries by media kit section:
+# - description: what is retrieved, for progress messages
+# - period: date range ending today, see period_start_date()
+# - query: reports().query parameters besides ids and dates
+# - default: response used when the query fails (default: no rows)
+ANALYTICS_REPORTS = {
+    'ageGender': {
+        'description': 'age and gender demographics',
+        'period': '90d',
+        'query': {'metrics': 'viewerPercentage', 'dimensions': 'ageGroup,gender', 'sort': 'gender,ageGroup'}
+    },
+    'countries': {
+        'description': 'country demographics',
+        'period': '90d',
+        # Using views instead of viewerPercentage for better compatibility
+        'query': {'metrics': 'views', 'dimensions': 'country', 'sort': '-views', 'maxResults': 25}
+    },
+    'devices': {
+        'description': 'device demographics',
+        'period': '90d',
+        'query': {'metrics': 'views', 'dimensions': 'deviceType', 'sort': '-views'}
+    },
+    'last30Days': {
+        'description': '30-day metrics',
+        'period': '30d',
+        'query': {'metrics': TOTALS_METRICS},
+        'default': {'rows': [[0, 0, 0, 0, 0, 0, 0]]}
+    },
+    'last90Days': {
+        'description': '90-day metrics',
+        'period': '90d',
+        'query': {'metrics': TOTALS_METRICS},
+        'default': {'rows': [[0, 0, 0, 0, 0, 0, 0]]}
+    },
+    'yearToDate': {
+        'description': 'year-to-date metrics',
+        'period': 'ytd',
+        'query': {'metrics': TOTALS_METRICS},
+        'default': {'rows': [[0, 0, 0, 0, 0, 0, 0]]}
+    },
+    'monthlyGrowth': {
+        'description': 'monthly growth data',
+        'period': '12m',
+        'query': {'metrics': 'views,subscribersGained', 'dimensions': 'month', 'sort': 'month'}
+    },
+    'averageViewPercentage': {
+        'description': 'average view percentage',
+        'period': '90d',
+        'query': {'metrics': 'averageViewPercentage'},
+        'default': {'rows': [[0]]}
+    }
+}
+
+
+def period_start_date(period, now):
+    """
+    Returns the start date (YYYY-MM-DD) of a report period ending at `now`.
+
+    Args:
+        period: '30d' or '90d' (days back), 'ytd' (January 1st) or '12m'
+            (twelve months back, from the first day of a month as the month dimension requires)
+        now: End of the period
+    """
+    if period.endswith('d') and period[:-1].isdigit():
+        return (now - timedelta(days=int(period[:-1]))).strftime('%Y-%m-%d')
+    if period == 'ytd':
+        return datetime(now.year, 1, 1).strftime('%Y-%m-%d')
+    if period == '12m':
+        return datetime(now.year - 1, now.month, 1).strftime('%Y-%m-%d')
+    raise ValueError(f"Unknown report period '{period}'")
+
+
+def fetch_report(youtube_analytics, channel_ids, section, now):
+    """
+    Runs the report query of one media kit section.
+
+    Args:
+        youtube_analytics: YouTube Analytics API service
+        channel_ids: Value of the query's ids parameter, e.g. "channel==MINE"
+        section: Key of ANALYTICS_REPORTS
+        now: End of the report period
+
+    Returns:
+        The report response
+    """
+    report = ANALYTICS_REPORTS[section]
+    request = youtube_analytics.reports().query(
+        ids=channel_ids,
+        startDate=period_start_date(report['period'], now),
+        endDate=now.strftime('%Y-%m-%d'),
+        **report['query']
+    )
+    return execute_request(request)
+
+
+def submit_reports(engine, youtube_analytics, channel_ids, sections, now=None):
+    """
+    Starts the report queries of the given media kit sections concurrently.
+
+    Args:
+        engine: FetchEngine to run the queries on (rate limited as 'analytics')
+        youtube_analytics: YouTube Analytics API service
+        channel_ids: Value of the query's ids parameter, e.g. "channel==MINE"
+        sections: Keys of ANALYTICS_REPORTS to query
+        now: End of the report periods (default: now)
+
+    Returns:
+        Dictionary mapping section to the Future of its response
+    """
+    now = now or datetime.now()
+    print(f"Running {len(sections)} Analytics report queries concurrently: {', '.join(sections)}")
+    return {section: engine.submit('analytics', fetch_report, youtube_analytics, channel_ids, section, now)
+            for section in sections}
+
+
+def collect_reports(report_futures):
+    """
+    Waits for the report queries started by submit_reports().
+
+    Returns:
+        Dictionary mapping section to its response, or to the section's
+        default response if the query failed
+    """
+    responses = {}
+    for section, future in report_futures.items():
+        report = ANALYTICS_REPORTS[section]
+        try:
+            responses[section] = future.result()
+            print(f"Successfully retrieved {report['description']}")
+        except Exception as e:
+            responses[section] = report.get('default', {'rows': []})
+            print(f"Could not retrieve {report['description']}: {str(e)}")
+    return responses
+
+
+def totals_section(response):
+    """
+    Returns the performance totals of a TOTALS_METRICS report as a dictionary
+    (empty if the report has no rows).
+    """
+    if 'rows' not in response or not response['rows']:
+        return {}
+    row = response['rows'][0]
+    return {
+        'views': row[0],
+        'watchTimeMinutes': row[1],
+        'avgViewDuration': row[2],
+        'subscribersGained': row[3],
+        'likes': row[4],
+        'comments': row[5],
+        'shares': row[6]
+    }
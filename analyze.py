@@ -1,29 +1,44 @@
 import json
-import os
-import requests
-from io import BytesIO
+import threading
 import pandas as pd
-import google.generativeai as genai
 import argparse
-import time
-
-from PIL import Image
-from urllib.request import urlopen
-import matplotlib.pyplot as plt
-import seaborn as sns
 
+from async_engine import DEFAULT_MAX_CONCURRENCY, FetchEngine, analyze_videos_concurrently, apply_rate_limit_args, model_api
+from llm_cache import get_cache, input_hash, model_name
+from llm_metrics import generate_content, get_metrics, record_cache_hit
+from patterns_mapreduce import PATTERNS_TOKEN_BUDGET, condense_analyses
+from thumbnail_store import get_vision_image
+from title_batch import TITLE_BATCH_SIZE, analyze_titles_batched
 
 GEMINI_API_KEY = "YOUR_GEMINI_API_KEY_HERE"
 
-# Configure Gemini client
-genai.configure(api_key=GEMINI_API_KEY)
-
-# Initialize Gemini models
-models = {
-    'text': genai.GenerativeModel('gemini-pro'),
-    'vision': genai.GenerativeModel('gemini-pro-vision')
+# Gemini model for each role; the models are created on first use by get_model()
+MODEL_NAMES = {
+    'text': 'gemini-pro',
+    'vision': 'gemini-pro-vision'
 }
 
+models = {}
+_models_lock = threading.Lock()
+
+def get_model(role):
+    """
+    Returns the Gemini model for a role ('text' or 'vision'), creating it
+    on first use so that importing google.generativeai and configuring the
+    client do not slow down startup.
+    """
+    with _models_lock:
+        if role not in models:
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+            models[role] = genai.GenerativeModel(MODEL_NAMES[role])
+        return models[role]
+
+# Cache keys include these versions; bump one whenever its prompt changes
+TITLE_PROMPT_VERSION = 'title-v1'
+THUMBNAIL_PROMPT_VERSION = 'thumbnail-v2'
+PATTERNS_PROMPT_VERSION = 'patterns-v1'
+
 def load_data(json_file_path):
     """Load YouTube data from JSON file"""
     try:
@@ -49,10 +64,21 @@ def get_top_videos(data, metric='views', count=10):
 
 def analyze_title_with_llm(title):
     """Analyze title using Gemini"""
+    cache = get_cache()
+    model = model_name(get_model('text'))
+    cache_key = input_hash(title)
+    
+    cached_analysis = cache.get(model, TITLE_PROMPT_VERSION, cache_key)
+    if cached_analysis is not None:
+        record_cache_hit('analyze_title_with_llm', get_model('text'))
+        return cached_analysis
+    
     try:
         prompt = f"You are an expert in YouTube content strategy and SEO. Analyze this video title and identify key patterns and elements that make it effective. Focus on psychological triggers, keywords, structure, emotion, and clarity. Analyze this YouTube title and explain why it's effective: \"{title}\""
-        response = models['text'].generate_content(prompt)
-        return response.text
+        response = generate_content('analyze_title_with_llm', get_model('text'), prompt)
+        analysis = response.text
+        cache.set(model, TITLE_PROMPT_VERSION, cache_key, analysis)
+        return analysis
     except Exception as e:
         print(f"Error analyzing title with LLM: {e}")
         return "Error analyzing title"
@@ -60,16 +86,20 @@ def analyze_title_with_llm(title):
 def analyze_thumbnail_with_vision(thumbnail_url):
     """Analyze thumbnail using Gemini Vision model"""
     try:
-        # Get image data
-        image_response = requests.get(thumbnail_url)
-        if image_response.status_code != 200:
+        # Get image data from the local thumbnail store, downscaled for the vision model
+        image_part = get_vision_image(thumbnail_url)
+        if image_part is None:
             return "Failed to retrieve thumbnail image"
         
-        image_bytes = image_response.content
-        image_part = {
-            "mime_type": "image/jpeg",  # Assuming JPEG, adjust if necessary
-            "data": image_bytes
-        }
+        # Check if this exact image was already analyzed
+        cache = get_cache()
+        model = model_name(get_model('vision'))
+        cache_key = input_hash(image_part['data'])
+        
+        cached_analysis = cache.get(model, THUMBNAIL_PROMPT_VERSION, cache_key)
+        if cached_analysis is not None:
+            record_cache_hit('analyze_thumbnail_with_vision', get_model('vision'))
+            return cached_analysis
 
         prompt_parts = [
             "You are an expert in YouTube thumbnail analysis. Examine this thumbnail and identify key elements that make it effective. Focus on composition, colors, text usage, emotional triggers, and clickability factors.",
@@ -77,17 +107,17 @@ def analyze_thumbnail_with_vision(thumbnail_url):
             image_part
         ]
         
-        response = models['vision'].generate_content(prompt_parts)
-        return response.text
+        response = generate_content('analyze_thumbnail_with_vision', get_model('vision'), prompt_parts)
+        analysis = response.text
+        cache.set(model, THUMBNAIL_PROMPT_VERSION, cache_key, analysis)
+        return analysis
     except Exception as e:
         print(f"Error analyzing thumbnail with Vision: {e}")
         return "Error analyzing thumbnail"
 
-def get_combined_analysis(row):
+def format_combined_analysis(row, title_analysis, thumbnail_analysis):
     """Combined analysis of title and thumbnail with additional video metrics"""
     
-    print(f"Analyzing {row['title']} ({row['video_id']})...")
-    
     # Get video metrics
     metrics_analysis = f"""
 VIDEO METRICS:
@@ -99,12 +129,6 @@ VIDEO METRICS:
 - Published: {row['published_at']}
     """
     
-    # Analyze title with GPT
-    title_analysis = analyze_title_with_llm(row['title'])
-    
-    # Analyze thumbnail with Vision
-    thumbnail_analysis = analyze_thumbnail_with_vision(row['thumbnail_url'])
-    
     # Combine all analyses
     combined_analysis = f"""
 === ANALYSIS FOR VIDEO: {row['title']} ===
@@ -122,12 +146,66 @@ VIDEO URL: https://www.youtube.com/watch?v={row['video_id']}
     
     return combined_analysis
 
+def analyze_top_videos(top_videos, max_in_flight=DEFAULT_MAX_CONCURRENCY, on_video=None, title_batch_size=TITLE_BATCH_SIZE):
+    """
+    Analyzes the title and thumbnail of every top video. All Gemini calls run
+    concurrently (at most max_in_flight at once, rate limited per model).
+    
+    Args:
+        top_videos: DataFrame of the videos to analyze
+        max_in_flight: Maximum number of Gemini requests in flight at once
+        on_video: Optional callback(video_id, analysis) run after each video finishes
+        title_batch_size: Titles per batched title request (1 analyzes each title on its own)
+    
+    Returns:
+        Dictionary mapping video ID to its title, views and combined analysis, in top_videos order
+    """
+    rows = [row for _, row in top_videos.iterrows()]
+    tasks = {
+        'title': (model_api(get_model('text')), lambda row: analyze_title_with_llm(row['title'])),
+        'thumbnail': (model_api(get_model('vision')), lambda row: analyze_thumbnail_with_vision(row['thumbnail_url']))
+    }
+    video_analyses = {}
+    
+    def store_analysis(index, row, results):
+        video_analyses[row['video_id']] = {
+            'title': row['title'],
+            'views': row['views'],
+            'analysis': format_combined_analysis(row, results['title'], results['thumbnail'])
+        }
+        print(f"Analyzed video {len(video_analyses)} of {len(rows)}: {row['title']} ({row['video_id']})")
+        if on_video is not None:
+            on_video(row['video_id'], video_analyses[row['video_id']])
+    
+    print(f"Analyzing {len(rows)} videos with up to {max_in_flight} requests in flight...")
+    with FetchEngine(max_concurrency=max_in_flight) as engine:
+        if title_batch_size > 1:
+            # Analyze the titles in batched requests first; the title task then only looks them up
+            title_analyses = analyze_titles_batched(engine, [row['title'] for row in rows], get_model('text'), TITLE_PROMPT_VERSION, analyze_title_with_llm, title_batch_size)
+            tasks['title'] = (None, lambda row: title_analyses[row['title']])
+        analyze_videos_concurrently(engine, rows, tasks, on_complete=store_analysis)
+    
+    # Videos finish in any order; report them in ranking order
+    return {row['video_id']: video_analyses[row['video_id']] for row in rows}
+
 def generate_patterns_report(all_analyses):
     """Generate a report of common patterns across top videos using Gemini"""
+    cache = get_cache()
+    model = model_name(get_model('text'))
+    cache_key = input_hash(all_analyses)
+    
+    cached_report = cache.get(model, PATTERNS_PROMPT_VERSION, cache_key)
+    if cached_report is not None:
+        record_cache_hit('generate_patterns_report', get_model('text'))
+        print("Loading cached patterns report")
+        return cached_report
+    
     try:
         prompt = f"You are an expert in YouTube content strategy. Based on the analyses of multiple top-performing videos, identify common patterns, success factors, and actionable recommendations. Be specific and detailed in your analysis. Here are analyses of top-performing YouTube videos. Identify common patterns, success factors, and provide actionable recommendations:\n\n{all_analyses}"
-        response = models['text'].generate_content(prompt)
-        return response.text
+        response = generate_content('generate_patterns_report', get_model('text'), prompt)
+        report = response.text
+        cache.set(model, PATTERNS_PROMPT_VERSION, cache_key, report)
+        return report
     except Exception as e:
         print(f"Error generating patterns report: {e}")
         return "Error generating patterns report"
@@ -136,7 +214,13 @@ def main():
     parser = argparse.ArgumentParser(description="Analyze YouTube video data using AI models.")
     parser.add_argument("--data_file", type=str, required=True, help="Path to the input YouTube video data JSON file (e.g., youtube_video_data_CHANNELID.json).")
     parser.add_argument("--channel_id", type=str, required=True, help="Channel ID to be used for naming output files.")
+    parser.add_argument("--top_count", type=int, default=10, help="Number of top videos (by views) to analyze (default: 10).")
+    parser.add_argument("--patterns_token_budget", type=int, default=PATTERNS_TOKEN_BUDGET, help=f"Estimated tokens of video analyses per patterns prompt; larger sets are summarized in chunks first (default: {PATTERNS_TOKEN_BUDGET}).")
+    parser.add_argument("--title_batch_size", type=int, default=TITLE_BATCH_SIZE, help=f"Number of uncached titles analyzed per Gemini request; 1 sends one request per title (default: {TITLE_BATCH_SIZE}).")
+    parser.add_argument("--max_in_flight", type=int, default=DEFAULT_MAX_CONCURRENCY, help=f"Maximum number of Gemini requests in flight at once (default: {DEFAULT_MAX_CONCURRENCY}).")
+    parser.add_argument("--rate_limit", action="append", metavar="API=RPS", help="Override the token-bucket rate for Gemini, for all models (gemini=2) or one model (gemini:gemini-pro-vision=0.5). Can be repeated.")
     args = parser.parse_args()
+    apply_rate_limit_args(args.rate_limit)
 
     print(f"Starting analysis for channel {args.channel_id} using data from: {args.data_file}")
 
@@ -147,31 +231,15 @@ def main():
         print(f"Failed to load data from {args.data_file}. Exiting.")
         return
     
-    # Get top 10 videos by views
-    top_videos = get_top_videos(data, metric='views', count=10)
+    # Get top videos by views
+    top_videos = get_top_videos(data, metric='views', count=args.top_count)
     print(f"Found {len(top_videos)} top videos by views.")
     
     # Analyze each video's title and thumbnail
-    all_analyses = ""
-    video_analyses = {}
+    video_analyses = analyze_top_videos(top_videos, max_in_flight=args.max_in_flight, title_batch_size=args.title_batch_size)
     
-    for idx, (_, row) in enumerate(top_videos.iterrows()):
-        print(f"Analyzing video {idx+1} of {len(top_videos)}...")
-        analysis = get_combined_analysis(row)
-        
-        # Store analysis
-        video_analyses[row['video_id']] = {
-            'title': row['title'],
-            'views': row['views'],
-            'analysis': analysis
-        }
-        
-        all_analyses += analysis + "\n\n"
-
-        # Add delay here, before processing the next video
-        if idx < len(top_videos) - 1: # Avoid sleep after the last video
-            print(f"Processed video {idx+1}/{len(top_videos)}. Waiting 2 seconds before next API call...")
-            time.sleep(2)
+    # Summarize the analyses in chunks first if they are too long for one prompt
+    all_analyses = condense_analyses([analysis['analysis'] for analysis in video_analyses.values()], get_model('text'), token_budget=args.patterns_token_budget, max_in_flight=args.max_in_flight)
     
     # Generate overall patterns report
     print("Generating patterns report...")
@@ -195,7 +263,7 @@ def main():
     with open(output_report_file, 'w') as f:
         f.write(f"# YouTube Content Analysis for {data['channel']['name']}\n\n")
         f.write(f"Channel Subscribers: {data['channel']['subscribers']}\n\n")
-        f.write("## Top 10 Videos by Views\n\n")
+        f.write(f"## Top {len(video_analyses)} Videos by Views\n\n")
         
         for idx, (_, row) in enumerate(top_videos.iterrows()):
             f.write(f"{idx+1}. **{row['title']}** - {row['views']} views\n")
@@ -212,6 +280,8 @@ def main():
     print("Analysis complete!")
     print(f"Results saved to '{output_json_file}'")
     print(f"Report saved to '{output_report_file}'")
+    get_cache().print_stats()
+    get_metrics().finish()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
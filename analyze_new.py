@@ -1,27 +1,44 @@
 import json
-import os
-import requests
-from io import BytesIO
+import threading
 import pandas as pd
-import google.generativeai as genai
-import time
 
-from PIL import Image
-from urllib.request import urlopen
-import matplotlib.pyplot as plt
-import seaborn as sns
+from analysis_journal import AnalysisJournal, compact_journal, journal_path, load_journaled_analyses
+from async_engine import DEFAULT_MAX_CONCURRENCY, FetchEngine, analyze_videos_concurrently, apply_rate_limit_args, model_api
+from llm_cache import get_cache, input_hash, model_name
+from llm_metrics import generate_content, get_metrics, record_cache_hit
+from patterns_mapreduce import PATTERNS_TOKEN_BUDGET, condense_analyses
+from thumbnail_store import get_vision_image
+from title_batch import TITLE_BATCH_SIZE, analyze_titles_batched
 
 GEMINI_API_KEY = "YOUR_GEMINI_API_KEY_HERE"
 
-# Configure Gemini client
-genai.configure(api_key=GEMINI_API_KEY)
-
-# Initialize Gemini models
-models = {
-    'text': genai.GenerativeModel('gemini-pro'),
-    'vision': genai.GenerativeModel('gemini-pro-vision')
+# Gemini model for each role; the models are created on first use by get_model()
+MODEL_NAMES = {
+    'text': 'gemini-pro',
+    'vision': 'gemini-pro-vision'
 }
 
+models = {}
+_models_lock = threading.Lock()
+
+def get_model(role):
+    """
+    Returns the Gemini model for a role ('text' or 'vision'), creating it
+    on first use so that importing google.generativeai and configuring the
+    client do not slow down startup.
+    """
+    with _models_lock:
+        if role not in models:
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+            models[role] = genai.GenerativeModel(MODEL_NAMES[role])
+        return models[role]
+
+# Cache keys include these versions; bump one whenever its prompt changes
+TITLE_PROMPT_VERSION = 'title-v1'
+THUMBNAIL_PROMPT_VERSION = 'thumbnail-v2'
+PATTERNS_PROMPT_VERSION = 'patterns-v1'
+
 def load_data(json_file_path):
     """Load YouTube data from JSON file"""
     try:
@@ -48,28 +65,23 @@ def get_top_videos(data, metric='views', count=10):
 def analyze_title_with_llm(title):
     """Analyze title using OpenAI's GPT model"""
     # Check if we already have a cached title analysis
-    cache_dir = "title_analysis_cache"
-    os.makedirs(cache_dir, exist_ok=True)
-    
-    # Create a cache filename based on a hash of the title
-    import hashlib
-    title_hash = hashlib.md5(title.encode()).hexdigest()
-    cache_file = os.path.join(cache_dir, f"{title_hash}.txt")
+    cache = get_cache()
+    model = model_name(get_model('text'))
+    cache_key = input_hash(title)
     
-    # Check if analysis is already cached
-    if os.path.exists(cache_file):
+    cached_analysis = cache.get(model, TITLE_PROMPT_VERSION, cache_key)
+    if cached_analysis is not None:
+        record_cache_hit('analyze_title_with_llm', get_model('text'))
         print(f"Loading cached title analysis for '{title}'")
-        with open(cache_file, 'r') as f:
-            return f.read()
+        return cached_analysis
     
     try:
         prompt = f"You are an expert in YouTube content strategy and SEO. Analyze this video title and identify key patterns and elements that make it effective. Focus on psychological triggers, keywords, structure, emotion, and clarity. Analyze this YouTube title and explain why it's effective: \"{title}\""
-        response = models['text'].generate_content(prompt)
+        response = generate_content('analyze_title_with_llm', get_model('text'), prompt)
         analysis = response.text
         
         # Cache the result
-        with open(cache_file, 'w') as f:
-            f.write(analysis)
+        cache.set(model, TITLE_PROMPT_VERSION, cache_key, analysis)
             
         return analysis
     except Exception as e:
@@ -78,31 +90,22 @@ def analyze_title_with_llm(title):
 
 def analyze_thumbnail_with_vision(thumbnail_url):
     """Analyze thumbnail using OpenAI's Vision model"""
-    # Check if we already have a cached thumbnail analysis
-    cache_dir = "thumbnail_analysis_cache"
-    os.makedirs(cache_dir, exist_ok=True)
-    
-    # Create a cache filename based on the video ID (extracted from URL)
-    video_id = thumbnail_url.split('/')[-2] if '/vi/' in thumbnail_url else thumbnail_url.split('/')[-1].split('.')[0]
-    cache_file = os.path.join(cache_dir, f"{video_id}.txt")
-    
-    # Check if analysis is already cached
-    if os.path.exists(cache_file):
-        print(f"Loading cached thumbnail analysis for {video_id}")
-        with open(cache_file, 'r') as f:
-            return f.read()
-    
     try:
-        # Get image data
-        image_response = requests.get(thumbnail_url)
-        if image_response.status_code != 200:
+        # Get image data from the local thumbnail store, downscaled for the vision model
+        image_part = get_vision_image(thumbnail_url)
+        if image_part is None:
             return "Failed to retrieve thumbnail image"
         
-        image_bytes = image_response.content
-        image_part = {
-            "mime_type": "image/jpeg",  # Assuming JPEG, adjust if necessary
-            "data": image_bytes
-        }
+        # Check if this exact image was already analyzed
+        cache = get_cache()
+        model = model_name(get_model('vision'))
+        cache_key = input_hash(image_part['data'])
+        
+        cached_analysis = cache.get(model, THUMBNAIL_PROMPT_VERSION, cache_key)
+        if cached_analysis is not None:
+            record_cache_hit('analyze_thumbnail_with_vision', get_model('vision'))
+            print(f"Loading cached thumbnail analysis for {thumbnail_url}")
+            return cached_analysis
 
         prompt_parts = [
             "You are an expert in YouTube thumbnail analysis. Examine this thumbnail and identify key elements that make it effective. Focus on composition, colors, text usage, emotional triggers, and clickability factors.",
@@ -110,23 +113,20 @@ def analyze_thumbnail_with_vision(thumbnail_url):
             image_part
         ]
         
-        response = models['vision'].generate_content(prompt_parts)
+        response = generate_content('analyze_thumbnail_with_vision', get_model('vision'), prompt_parts)
         analysis = response.text
         
         # Cache the result
-        with open(cache_file, 'w') as f:
-            f.write(analysis)
+        cache.set(model, THUMBNAIL_PROMPT_VERSION, cache_key, analysis)
             
         return analysis
     except Exception as e:
         print(f"Error analyzing thumbnail with Vision: {e}")
         return "Error analyzing thumbnail"
 
-def get_combined_analysis(row):
+def format_combined_analysis(row, title_analysis, thumbnail_analysis):
     """Combined analysis of title and thumbnail with additional video metrics"""
     
-    print(f"Analyzing {row['title']} ({row['video_id']})...")
-    
     # Get video metrics
     metrics_analysis = f"""
 VIDEO METRICS:
@@ -138,12 +138,6 @@ VIDEO METRICS:
 - Published: {row['published_at']}
     """
     
-    # Analyze title with GPT
-    title_analysis = analyze_title_with_llm(row['title'])
-    
-    # Analyze thumbnail with Vision
-    thumbnail_analysis = analyze_thumbnail_with_vision(row['thumbnail_url'])
-    
     # Combine all analyses
     combined_analysis = f"""
 === ANALYSIS FOR VIDEO: {row['title']} ===
@@ -161,18 +155,73 @@ VIDEO URL: https://www.youtube.com/watch?v={row['video_id']}
     
     return combined_analysis
 
+def analyze_top_videos(top_videos, max_in_flight=DEFAULT_MAX_CONCURRENCY, on_video=None, title_batch_size=TITLE_BATCH_SIZE):
+    """
+    Analyzes the title and thumbnail of every top video. All Gemini calls run
+    concurrently (at most max_in_flight at once, rate limited per model).
+    
+    Args:
+        top_videos: DataFrame of the videos to analyze
+        max_in_flight: Maximum number of Gemini requests in flight at once
+        on_video: Optional callback(video_id, analysis) run after each video finishes
+        title_batch_size: Titles per batched title request (1 analyzes each title on its own)
+    
+    Returns:
+        Dictionary mapping video ID to its title, views and combined analysis, in top_videos order
+    """
+    rows = [row for _, row in top_videos.iterrows()]
+    tasks = {
+        'title': (model_api(get_model('text')), lambda row: analyze_title_with_llm(row['title'])),
+        'thumbnail': (model_api(get_model('vision')), lambda row: analyze_thumbnail_with_vision(row['thumbnail_url']))
+    }
+    video_analyses = {}
+    
+    def store_analysis(index, row, results):
+        video_analyses[row['video_id']] = {
+            'title': row['title'],
+            'views': row['views'],
+            'analysis': format_combined_analysis(row, results['title'], results['thumbnail'])
+        }
+        print(f"Analyzed video {len(video_analyses)} of {len(rows)}: {row['title']} ({row['video_id']})")
+        if on_video is not None:
+            on_video(row['video_id'], video_analyses[row['video_id']])
+    
+    print(f"Analyzing {len(rows)} videos with up to {max_in_flight} requests in flight...")
+    with FetchEngine(max_concurrency=max_in_flight) as engine:
+        if title_batch_size > 1:
+            # Analyze the titles in batched requests first; the title task then only looks them up
+            title_analyses = analyze_titles_batched(engine, [row['title'] for row in rows], get_model('text'), TITLE_PROMPT_VERSION, analyze_title_with_llm, title_batch_size)
+            tasks['title'] = (None, lambda row: title_analyses[row['title']])
+        analyze_videos_concurrently(engine, rows, tasks, on_complete=store_analysis)
+    
+    # Videos finish in any order; report them in ranking order
+    return {row['video_id']: video_analyses[row['video_id']] for row in rows}
+
 def generate_patterns_report(all_analyses):
     """Generate a report of common patterns across top videos using Gemini"""
+    cache = get_cache()
+    model = model_name(get_model('text'))
+    cache_key = input_hash(all_analyses)
+    
+    cached_report = cache.get(model, PATTERNS_PROMPT_VERSION, cache_key)
+    if cached_report is not None:
+        record_cache_hit('generate_patterns_report', get_model('text'))
+        print("Loading cached patterns report")
+        return cached_report
+    
     try:
         prompt = f"You are an expert in YouTube content strategy. Based on the analyses of multiple top-performing videos, identify common patterns, success factors, and actionable recommendations. Be specific and detailed in your analysis. Here are analyses of top-performing YouTube videos. Identify common patterns, success factors, and provide actionable recommendations:\n\n{all_analyses}"
-        response = models['text'].generate_content(prompt)
-        return response.text
+        response = generate_content('generate_patterns_report', get_model('text'), prompt)
+        report = response.text
+        cache.set(model, PATTERNS_PROMPT_VERSION, cache_key, report)
+        return report
     except Exception as e:
         print(f"Error generating patterns report: {e}")
         return "Error generating patterns report"
 
 def save_intermediate_results(data, video_analyses, top_videos, channel_id, step="video_analysis"):
-    """Save intermediate results to avoid repeating analysis if there's an error later"""
+    """Save intermediate results to avoid repeating analysis if there's an error later.
+    This compacts the channel's checkpoint journal into one file and removes the journal."""
     intermediate_results = {
         'channel_name': data['channel']['name'],
         'channel_subscribers': data['channel']['subscribers'],
@@ -183,11 +232,39 @@ def save_intermediate_results(data, video_analyses, top_videos, channel_id, step
     
     # Save to JSON file
     filename = f"youtube_analysis_intermediate_{channel_id}.json"
-    with open(filename, 'w') as f:
-        json.dump(intermediate_results, f, indent=2)
+    compact_journal(journal_path(channel_id), filename, intermediate_results)
     
     print(f"Intermediate results saved to {filename} after '{step}' step")
 
+def run_video_analysis(data, top_videos, channel_id, max_in_flight=DEFAULT_MAX_CONCURRENCY, title_batch_size=TITLE_BATCH_SIZE):
+    """
+    Analyzes the top videos, checkpointing each finished video to the channel's
+    journal. Videos already in the journal (from an interrupted run) are not
+    analyzed again. Once all videos are done the journal is compacted into the
+    intermediate results file.
+    
+    Returns:
+        Dictionary mapping video ID to its title, views and combined analysis, in top_videos order
+    """
+    journal_file = journal_path(channel_id)
+    video_analyses = load_journaled_analyses(journal_file)
+    remaining_videos = top_videos[~top_videos['video_id'].isin(list(video_analyses))]
+    if len(remaining_videos) < len(top_videos):
+        print(f"Resuming from {journal_file}: {len(top_videos) - len(remaining_videos)} of {len(top_videos)} videos already analyzed")
+    
+    with AnalysisJournal(journal_file) as journal:
+        video_analyses.update(analyze_top_videos(
+            remaining_videos,
+            max_in_flight=max_in_flight,
+            on_video=lambda video_id, analysis: journal.append({'video_id': video_id, **analysis}),
+            title_batch_size=title_batch_size
+        ))
+    
+    # Save the analyses in ranking order
+    video_analyses = {video_id: video_analyses[video_id] for video_id in top_videos['video_id']}
+    save_intermediate_results(data, video_analyses, top_videos, channel_id, "video_analysis")
+    return video_analyses
+
 def load_intermediate_results(channel_id):
     """Load intermediate results if they exist"""
     filename = f"youtube_analysis_intermediate_{channel_id}.json"
@@ -219,7 +296,7 @@ def create_final_report(data, video_analyses, patterns_report, channel_id, top_v
     with open(output_report_file, 'w') as f:
         f.write(f"# YouTube Content Analysis for {data['channel']['name']}\n\n")
         f.write(f"Channel Subscribers: {data['channel']['subscribers']}\n\n")
-        f.write("## Top 10 Videos by Views\n\n")
+        f.write(f"## Top {len(video_analyses)} Videos by Views\n\n")
         
         # If we have the top_videos DataFrame
         if isinstance(top_videos, pd.DataFrame):
@@ -261,14 +338,9 @@ def main(args): # Add args
         video_analyses = intermediate['video_analyses']
         top_videos = intermediate['top_videos']
         
-        # Build all_analyses string from video_analyses
-        all_analyses = ""
-        for video_id, analysis_data in video_analyses.items():
-            all_analyses += analysis_data['analysis'] + "\n\n"
-        
     else:
         # Start from the beginning
-        print("No intermediate results found or results are incomplete. Starting from scratch.")
+        print("No intermediate results found or results are incomplete. Analyzing videos (resuming from the journal if one exists).")
         
         # Load the JSON data
         data = load_data(args.data_file) # Use args.data_file
@@ -277,33 +349,15 @@ def main(args): # Add args
             print(f"Failed to load data from {args.data_file}. Exiting.")
             return
         
-        # Get top 10 videos by views
-        top_videos = get_top_videos(data, metric='views', count=10)
+        # Get top videos by views
+        top_videos = get_top_videos(data, metric='views', count=args.top_count)
         print(f"Found {len(top_videos)} top videos by views.")
         
-        # Analyze each video's title and thumbnail
-        all_analyses = ""
-        video_analyses = {}
-        
-        for idx, (_, row) in enumerate(top_videos.iterrows()):
-            print(f"Analyzing video {idx+1} of {len(top_videos)}...")
-            analysis = get_combined_analysis(row)
-            
-            # Store analysis
-            video_analyses[row['video_id']] = {
-                'title': row['title'],
-                'views': row['views'],
-                'analysis': analysis
-            }
-            
-            all_analyses += analysis + "\n\n"
-            
-            # Save intermediate results after each video
-            save_intermediate_results(data, video_analyses, top_videos, args.channel_id, "video_analysis") # Pass channel_id
-
-            if idx < len(top_videos) - 1: # Avoid sleep after the last video
-                print(f"Processed video {idx+1}/{len(top_videos)} in main(). Waiting 2 seconds...")
-                time.sleep(2)
+        # Analyze each video's title and thumbnail, checkpointing each video to the journal
+        video_analyses = run_video_analysis(data, top_videos, args.channel_id, max_in_flight=args.max_in_flight, title_batch_size=args.title_batch_size)
+    
+    # Summarize the analyses in chunks first if they are too long for one prompt
+    all_analyses = condense_analyses([analysis['analysis'] for analysis in video_analyses.values()], get_model('text'), token_budget=args.patterns_token_budget, max_in_flight=args.max_in_flight)
     
     # Generate overall patterns report
     print("Generating patterns report...")
@@ -321,30 +375,12 @@ def analyze_videos_only(args): # Add args
         print(f"Failed to load data from {args.data_file}. Exiting.")
         return
     
-    # Get top 10 videos by views
-    top_videos = get_top_videos(data, metric='views', count=10)
+    # Get top videos by views
+    top_videos = get_top_videos(data, metric='views', count=args.top_count)
     print(f"Found {len(top_videos)} top videos by views.")
     
-    # Analyze each video's title and thumbnail
-    video_analyses = {}
-    
-    for idx, (_, row) in enumerate(top_videos.iterrows()):
-        print(f"Analyzing video {idx+1} of {len(top_videos)}...")
-        analysis = get_combined_analysis(row)
-        
-        # Store analysis
-        video_analyses[row['video_id']] = {
-            'title': row['title'],
-            'views': row['views'],
-            'analysis': analysis
-        }
-        
-        # Save intermediate results after each video
-        save_intermediate_results(data, video_analyses, top_videos, args.channel_id, "video_analysis") # Pass channel_id
-
-            if idx < len(top_videos) - 1: # Avoid sleep after the last video
-                print(f"Processed video {idx+1}/{len(top_videos)} in analyze_videos_only(). Waiting 2 seconds...")
-                time.sleep(2)
+    # Analyze each video's title and thumbnail, checkpointing each video to the journal
+    run_video_analysis(data, top_videos, args.channel_id, max_in_flight=args.max_in_flight, title_batch_size=args.title_batch_size)
     
     print("Video analysis complete! Run the script with --patterns flag to generate the patterns report.")
 
@@ -362,10 +398,8 @@ def analyze_patterns_only(args): # Add args
     video_analyses = intermediate['video_analyses']
     top_videos = intermediate['top_videos']
     
-    # Build all_analyses string from video_analyses
-    all_analyses = ""
-    for video_id, analysis_data in video_analyses.items():
-        all_analyses += analysis_data['analysis'] + "\n\n"
+    # Summarize the analyses in chunks first if they are too long for one prompt
+    all_analyses = condense_analyses([analysis['analysis'] for analysis in video_analyses.values()], get_model('text'), token_budget=args.patterns_token_budget, max_in_flight=args.max_in_flight)
     
     # Generate overall patterns report
     print("Generating patterns report...")
@@ -382,8 +416,14 @@ if __name__ == "__main__":
     parser.add_argument('--patterns', action='store_true', help='Run only patterns analysis.')
     parser.add_argument("--data_file", type=str, required=True, help="Path to the input YouTube video data JSON file (e.g., youtube_video_data_CHANNELID.json).")
     parser.add_argument("--channel_id", type=str, required=True, help="Channel ID to be used for naming output files.")
+    parser.add_argument("--top_count", type=int, default=10, help="Number of top videos (by views) to analyze (default: 10).")
+    parser.add_argument("--patterns_token_budget", type=int, default=PATTERNS_TOKEN_BUDGET, help=f"Estimated tokens of video analyses per patterns prompt; larger sets are summarized in chunks first (default: {PATTERNS_TOKEN_BUDGET}).")
+    parser.add_argument("--title_batch_size", type=int, default=TITLE_BATCH_SIZE, help=f"Number of uncached titles analyzed per Gemini request; 1 sends one request per title (default: {TITLE_BATCH_SIZE}).")
+    parser.add_argument("--max_in_flight", type=int, default=DEFAULT_MAX_CONCURRENCY, help=f"Maximum number of Gemini requests in flight at once (default: {DEFAULT_MAX_CONCURRENCY}).")
+    parser.add_argument("--rate_limit", action="append", metavar="API=RPS", help="Override the token-bucket rate for Gemini, for all models (gemini=2) or one model (gemini:gemini-pro-vision=0.5). Can be repeated.")
     
     args = parser.parse_args()
+    apply_rate_limit_args(args.rate_limit)
     
     print(f"Starting analysis for channel {args.channel_id} using data from: {args.data_file}")
     if args.videos:
@@ -394,4 +434,6 @@ if __name__ == "__main__":
         analyze_patterns_only(args)
     else:
         print("Running full analysis (videos and patterns).")
-        main(args)
\ No newline at end of file
+        main(args)
+    get_cache().print_stats()
+    get_metrics().finish()
@@ -1,30 +1,106 @@
 import json
-import os
-import requests
-from io import BytesIO
+import threading
+import re
 import pandas as pd
-import google.generativeai as genai
-import time
 
-from PIL import Image
-from urllib.request import urlopen
-import matplotlib.pyplot as plt
-import seaborn as sns
+from analysis_journal import AnalysisJournal, compact_journal, journal_path, load_journaled_analyses
+from async_engine import DEFAULT_MAX_CONCURRENCY, FetchEngine, analyze_videos_concurrently, apply_rate_limit_args, model_api
+from cassette import wrap_model
+from llm_cache import get_cache, input_hash, model_name
+from llm_metrics import generate_content, get_metrics, record_cache_hit
+from patterns_mapreduce import PATTERNS_TOKEN_BUDGET, condense_analyses
+from output_sinks import is_dataset_path, load_video_dataset
+from thumbnail_store import get_vision_image
+from title_batch import TITLE_BATCH_SIZE, analyze_titles_batched
 
 GEMINI_API_KEY = "YOUR_GEMINI_API_KEY_HERE"
 
-# Configure Gemini client
-genai.configure(api_key=GEMINI_API_KEY)
+# Gemini model for each role; the models are created on first use by get_model()
+# (recorded to or replayed from cassettes when YT_CASSETTE_MODE is set)
+MODEL_NAMES = {
+    'text': 'gemini-pro',
+    'vision': 'gemini-pro-vision',
+    # Used by --structured; response schemas need a Gemini 1.5 model, which also takes images
+    'structured': 'gemini-1.5-flash'
+}
+
+models = {}
+_models_lock = threading.Lock()
+
+def get_model(role):
+    """
+    Returns the Gemini model for a role ('text', 'vision' or 'structured'), creating it
+    on first use so that importing google.generativeai and configuring the
+    client do not slow down startup.
+    """
+    with _models_lock:
+        if role not in models:
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+            models[role] = wrap_model(genai.GenerativeModel(MODEL_NAMES[role]))
+        return models[role]
+
+# Cache keys include these versions; bump one whenever its prompt changes
+TITLE_PROMPT_VERSION = 'title-v1'
+THUMBNAIL_PROMPT_VERSION = 'thumbnail-v2'
+PATTERNS_PROMPT_VERSION = 'patterns-v1'
+STRUCTURED_TITLE_PROMPT_VERSION = 'title-structured-v1'
+STRUCTURED_THUMBNAIL_PROMPT_VERSION = 'thumbnail-structured-v1'
+STRUCTURED_PATTERNS_PROMPT_VERSION = 'patterns-structured-v1'
 
-# Initialize Gemini models
-models = {
-    'text': genai.GenerativeModel('gemini-pro'),
-    'vision': genai.GenerativeModel('gemini-pro-vision')
+# Fields requested from Gemini in --structured mode: (JSON key, section name)
+TITLE_ANALYSIS_FIELDS = [
+    ('keywords', 'Keywords'),
+    ('structure', 'Structure'),
+    ('psychological_triggers', 'Psychological Triggers'),
+    ('emotion', 'Emotion'),
+    ('clarity', 'Clarity')
+]
+THUMBNAIL_ANALYSIS_FIELDS = [
+    ('composition', 'Composition'),
+    ('colors', 'Colors'),
+    ('text_usage', 'Text Usage'),
+    ('emotional_triggers', 'Emotional Triggers'),
+    ('clickability', 'Clickability')
+]
+
+def analysis_schema(fields):
+    """Response schema for a title or thumbnail analysis: a summary plus one string per field"""
+    properties = {'summary': {'type': 'string', 'description': 'One or two sentences on why it is effective'}}
+    for key, name in fields:
+        properties[key] = {'type': 'string', 'description': f"Analysis of the {name.lower()}"}
+    return {'type': 'object', 'properties': properties, 'required': list(properties)}
+
+PATTERN_ITEMS_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'properties': {
+            'title': {'type': 'string'},
+            'description': {'type': 'string'}
+        },
+        'required': ['title', 'description']
+    }
 }
 
-def load_data(json_file_path):
-    """Load YouTube data from JSON file"""
+TITLE_ANALYSIS_SCHEMA = analysis_schema(TITLE_ANALYSIS_FIELDS)
+THUMBNAIL_ANALYSIS_SCHEMA = analysis_schema(THUMBNAIL_ANALYSIS_FIELDS)
+PATTERNS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'summary': {'type': 'string'},
+        'common_patterns': PATTERN_ITEMS_SCHEMA,
+        'success_factors': PATTERN_ITEMS_SCHEMA,
+        'recommendations': PATTERN_ITEMS_SCHEMA
+    },
+    'required': ['summary', 'common_patterns', 'success_factors', 'recommendations']
+}
+
+def load_data(json_file_path, channel_id=None, columns=None):
+    """Load YouTube data from a JSON file or a parquet/arrow dataset (optionally only some video columns)"""
     try:
+        if is_dataset_path(json_file_path):
+            return load_video_dataset(json_file_path, channel_id=channel_id, columns=columns)
         with open(json_file_path, 'r') as file:
             data = json.load(file)
         return data
@@ -48,28 +124,23 @@ def get_top_videos(data, metric='views', count=10):
 def analyze_title_with_llm(title):
     """Analyze title using OpenAI's GPT model"""
     # Check if we already have a cached title analysis
-    cache_dir = "title_analysis_cache"
-    os.makedirs(cache_dir, exist_ok=True)
-    
-    # Create a cache filename based on a hash of the title
-    import hashlib
-    title_hash = hashlib.md5(title.encode()).hexdigest()
-    cache_file = os.path.join(cache_dir, f"{title_hash}.txt")
+    cache = get_cache()
+    model = model_name(get_model('text'))
+    cache_key = input_hash(title)
     
-    # Check if analysis is already cached
-    if os.path.exists(cache_file):
+    cached_analysis = cache.get(model, TITLE_PROMPT_VERSION, cache_key)
+    if cached_analysis is not None:
+        record_cache_hit('analyze_title_with_llm', get_model('text'))
         print(f"Loading cached title analysis for '{title}'")
-        with open(cache_file, 'r') as f:
-            return f.read()
+        return cached_analysis
     
     try:
         prompt = f"You are an expert in YouTube content strategy and SEO. Analyze this video title and identify key patterns and elements that make it effective. Focus on psychological triggers, keywords, structure, emotion, and clarity. Analyze this YouTube title and explain why it's effective: \"{title}\""
-        response = models['text'].generate_content(prompt)
+        response = generate_content('analyze_title_with_llm', get_model('text'), prompt)
         analysis = response.text
         
         # Cache the result
-        with open(cache_file, 'w') as f:
-            f.write(analysis)
+        cache.set(model, TITLE_PROMPT_VERSION, cache_key, analysis)
             
         return analysis
     except Exception as e:
@@ -78,31 +149,22 @@ def analyze_title_with_llm(title):
 
 def analyze_thumbnail_with_vision(thumbnail_url):
     """Analyze thumbnail using OpenAI's Vision model"""
-    # Check if we already have a cached thumbnail analysis
-    cache_dir = "thumbnail_analysis_cache"
-    os.makedirs(cache_dir, exist_ok=True)
-    
-    # Create a cache filename based on the video ID (extracted from URL)
-    video_id = thumbnail_url.split('/')[-2] if '/vi/' in thumbnail_url else thumbnail_url.split('/')[-1].split('.')[0]
-    cache_file = os.path.join(cache_dir, f"{video_id}.txt")
-    
-    # Check if analysis is already cached
-    if os.path.exists(cache_file):
-        print(f"Loading cached thumbnail analysis for {video_id}")
-        with open(cache_file, 'r') as f:
-            return f.read()
-    
     try:
-        # Get image data
-        image_response = requests.get(thumbnail_url)
-        if image_response.status_code != 200:
+        # Get image data from the local thumbnail store, downscaled for the vision model
+        image_part = get_vision_image(thumbnail_url)
+        if image_part is None:
             return "Failed to retrieve thumbnail image"
         
-        image_bytes = image_response.content
-        image_part = {
-            "mime_type": "image/jpeg",  # Assuming JPEG, adjust if necessary
-            "data": image_bytes
-        }
+        # Check if this exact image was already analyzed
+        cache = get_cache()
+        model = model_name(get_model('vision'))
+        cache_key = input_hash(image_part['data'])
+        
+        cached_analysis = cache.get(model, THUMBNAIL_PROMPT_VERSION, cache_key)
+        if cached_analysis is not None:
+            record_cache_hit('analyze_thumbnail_with_vision', get_model('vision'))
+            print(f"Loading cached thumbnail analysis for {thumbnail_url}")
+            return cached_analysis
 
         prompt_parts = [
             "You are an expert in YouTube thumbnail analysis. Examine this thumbnail and identify key elements that make it effective. Focus on composition, colors, text usage, emotional triggers, and clickability factors.",
@@ -110,22 +172,107 @@ def analyze_thumbnail_with_vision(thumbnail_url):
             image_part
         ]
         
-        response = models['vision'].generate_content(prompt_parts)
+        response = generate_content('analyze_thumbnail_with_vision', get_model('vision'), prompt_parts)
         analysis = response.text
         
         # Cache the result
-        with open(cache_file, 'w') as f:
-            f.write(analysis)
+        cache.set(model, THUMBNAIL_PROMPT_VERSION, cache_key, analysis)
             
         return analysis
     except Exception as e:
         print(f"Error analyzing thumbnail with Vision: {e}")
         return "Error analyzing thumbnail"
 
-def get_combined_analysis(row):
-    """Combined analysis of title and thumbnail with additional video metrics"""
+def generate_structured(site, prompt_parts, schema):
+    """Ask the structured model for JSON that follows a response schema and return it parsed"""
+    response = generate_content(
+        site,
+        get_model('structured'),
+        prompt_parts,
+        generation_config={"response_mime_type": "application/json", "response_schema": schema}
+    )
+    return json.loads(response.text)
+
+def analyze_title_structured(title):
+    """Analyze title using Gemini, returning a dictionary following TITLE_ANALYSIS_SCHEMA (None on errors)"""
+    cache = get_cache()
+    model = model_name(get_model('structured'))
+    cache_key = input_hash(title)
+    
+    cached_analysis = cache.get(model, STRUCTURED_TITLE_PROMPT_VERSION, cache_key)
+    if cached_analysis is not None:
+        record_cache_hit('analyze_title_structured', get_model('structured'))
+        print(f"Loading cached title analysis for '{title}'")
+        return cached_analysis
     
-    print(f"Analyzing {row['title']} ({row['video_id']})...")
+    try:
+        prompt = f"You are an expert in YouTube content strategy and SEO. Analyze this YouTube title and explain why it's effective, covering its keywords, structure, psychological triggers, emotion, and clarity: \"{title}\""
+        analysis = generate_structured('analyze_title_structured', prompt, TITLE_ANALYSIS_SCHEMA)
+        cache.set(model, STRUCTURED_TITLE_PROMPT_VERSION, cache_key, analysis)
+        return analysis
+    except Exception as e:
+        print(f"Error analyzing title with LLM: {e}")
+        return None
+
+def analyze_thumbnail_structured(thumbnail_url):
+    """Analyze thumbnail using Gemini, returning a dictionary following THUMBNAIL_ANALYSIS_SCHEMA (None on errors)"""
+    try:
+        image_part = get_vision_image(thumbnail_url)
+        if image_part is None:
+            print(f"Failed to retrieve thumbnail image {thumbnail_url}")
+            return None
+        
+        cache = get_cache()
+        model = model_name(get_model('structured'))
+        cache_key = input_hash(image_part['data'])
+        
+        cached_analysis = cache.get(model, STRUCTURED_THUMBNAIL_PROMPT_VERSION, cache_key)
+        if cached_analysis is not None:
+            record_cache_hit('analyze_thumbnail_structured', get_model('structured'))
+            print(f"Loading cached thumbnail analysis for {thumbnail_url}")
+            return cached_analysis
+        
+        prompt_parts = [
+            "You are an expert in YouTube thumbnail analysis. Analyze this YouTube thumbnail and explain why it's effective, covering its composition, colors, text usage, emotional triggers, and clickability.",
+            image_part
+        ]
+        analysis = generate_structured('analyze_thumbnail_structured', prompt_parts, THUMBNAIL_ANALYSIS_SCHEMA)
+        cache.set(model, STRUCTURED_THUMBNAIL_PROMPT_VERSION, cache_key, analysis)
+        return analysis
+    except Exception as e:
+        print(f"Error analyzing thumbnail with Vision: {e}")
+        return None
+
+def format_structured_analysis(analysis, fields):
+    """Render a structured title/thumbnail analysis as text for the markdown report"""
+    lines = [analysis.get('summary', ''), ""]
+    for index, (key, name) in enumerate(fields, 1):
+        lines.append(f"{index}. **{name}**: {analysis.get(key, '')}")
+    return "\n".join(lines)
+
+def structured_analysis_section(analysis, fields, error_text):
+    """UI form ({'full_text', 'sections'}) of a structured title/thumbnail analysis"""
+    if analysis is None:
+        return {"full_text": error_text}
+    return {
+        "full_text": format_structured_analysis(analysis, fields),
+        "sections": {name.lower(): analysis.get(key, '') for key, name in fields}
+    }
+
+def video_metrics(row):
+    """Metrics of a video, in the same form as the VIDEO METRICS lines of a combined analysis"""
+    return {
+        'views': str(row['views']),
+        'likes': str(row['likes']),
+        'comments': str(row['comments']),
+        'engagement_rate': f"{row['engagement_rate']}%",
+        'avg_view_duration': f"{row['avg_view_duration']} ({row['retention_rate']}% retention)",
+        'retention_rate': f"{row['retention_rate']}%",
+        'published': str(row['published_at'])
+    }
+
+def format_combined_analysis(row, title_analysis, thumbnail_analysis):
+    """Combined analysis of title and thumbnail with additional video metrics"""
     
     # Get video metrics
     metrics_analysis = f"""
@@ -138,12 +285,6 @@ VIDEO METRICS:
 - Published: {row['published_at']}
     """
     
-    # Analyze title with GPT
-    title_analysis = analyze_title_with_llm(row['title'])
-    
-    # Analyze thumbnail with Vision
-    thumbnail_analysis = analyze_thumbnail_with_vision(row['thumbnail_url'])
-    
     # Combine all analyses
     combined_analysis = f"""
 === ANALYSIS FOR VIDEO: {row['title']} ===
@@ -161,18 +302,137 @@ VIDEO URL: https://www.youtube.com/watch?v={row['video_id']}
     
     return combined_analysis
 
+def analyze_top_videos(top_videos, max_in_flight=DEFAULT_MAX_CONCURRENCY, on_video=None, structured=False, title_batch_size=TITLE_BATCH_SIZE):
+    """
+    Analyzes the title and thumbnail of every top video. All Gemini calls run
+    concurrently (at most max_in_flight at once, rate limited per model).
+    
+    Args:
+        top_videos: DataFrame of the videos to analyze
+        max_in_flight: Maximum number of Gemini requests in flight at once
+        on_video: Optional callback(video_id, analysis) run after each video finishes
+        structured: Request schema-constrained JSON analyses; each entry then also
+            carries its UI-ready 'structured_analysis', so nothing has to be parsed later
+        title_batch_size: Titles per batched title request (1 analyzes each title on its own);
+            not used in structured mode
+    
+    Returns:
+        Dictionary mapping video ID to its title, views and combined analysis, in top_videos order
+    """
+    rows = [row for _, row in top_videos.iterrows()]
+    if structured:
+        tasks = {
+            'title': (model_api(get_model('structured')), lambda row: analyze_title_structured(row['title'])),
+            'thumbnail': (model_api(get_model('structured')), lambda row: analyze_thumbnail_structured(row['thumbnail_url']))
+        }
+    else:
+        tasks = {
+            'title': (model_api(get_model('text')), lambda row: analyze_title_with_llm(row['title'])),
+            'thumbnail': (model_api(get_model('vision')), lambda row: analyze_thumbnail_with_vision(row['thumbnail_url']))
+        }
+    video_analyses = {}
+    
+    def store_analysis(index, row, results):
+        if structured:
+            title_analysis = structured_analysis_section(results['title'], TITLE_ANALYSIS_FIELDS, "Error analyzing title")
+            thumbnail_analysis = structured_analysis_section(results['thumbnail'], THUMBNAIL_ANALYSIS_FIELDS, "Error analyzing thumbnail")
+            video_analyses[row['video_id']] = {
+                'title': row['title'],
+                'views': row['views'],
+                'analysis': format_combined_analysis(row, title_analysis['full_text'], thumbnail_analysis['full_text']),
+                'structured_analysis': {
+                    'title': row['title'],
+                    'metrics': video_metrics(row),
+                    'title_analysis': title_analysis,
+                    'thumbnail_analysis': thumbnail_analysis,
+                    'video_url': f"https://www.youtube.com/watch?v={row['video_id']}"
+                }
+            }
+        else:
+            video_analyses[row['video_id']] = {
+                'title': row['title'],
+                'views': row['views'],
+                'analysis': format_combined_analysis(row, results['title'], results['thumbnail'])
+            }
+        print(f"Analyzed video {len(video_analyses)} of {len(rows)}: {row['title']} ({row['video_id']})")
+        if on_video is not None:
+            on_video(row['video_id'], video_analyses[row['video_id']])
+    
+    print(f"Analyzing {len(rows)} videos with up to {max_in_flight} requests in flight...")
+    with FetchEngine(max_concurrency=max_in_flight) as engine:
+        if not structured and title_batch_size > 1:
+            # Analyze the titles in batched requests first; the title task then only looks them up
+            title_analyses = analyze_titles_batched(engine, [row['title'] for row in rows], get_model('text'), TITLE_PROMPT_VERSION, analyze_title_with_llm, title_batch_size)
+            tasks['title'] = (None, lambda row: title_analyses[row['title']])
+        analyze_videos_concurrently(engine, rows, tasks, on_complete=store_analysis)
+    
+    # Videos finish in any order; report them in ranking order
+    return {row['video_id']: video_analyses[row['video_id']] for row in rows}
+
 def generate_patterns_report(all_analyses):
     """Generate a report of common patterns across top videos using Gemini"""
+    cache = get_cache()
+    model = model_name(get_model('text'))
+    cache_key = input_hash(all_analyses)
+    
+    cached_report = cache.get(model, PATTERNS_PROMPT_VERSION, cache_key)
+    if cached_report is not None:
+        record_cache_hit('generate_patterns_report', get_model('text'))
+        print("Loading cached patterns report")
+        return cached_report
+    
     try:
         prompt = f"You are an expert in YouTube content strategy. Based on the analyses of multiple top-performing videos, identify common patterns, success factors, and actionable recommendations. Be specific and detailed in your analysis. Here are analyses of top-performing YouTube videos. Identify common patterns, success factors, and provide actionable recommendations:\n\n{all_analyses}"
-        response = models['text'].generate_content(prompt)
-        return response.text
+        response = generate_content('generate_patterns_report', get_model('text'), prompt)
+        report = response.text
+        cache.set(model, PATTERNS_PROMPT_VERSION, cache_key, report)
+        return report
     except Exception as e:
         print(f"Error generating patterns report: {e}")
         return "Error generating patterns report"
 
+def generate_patterns_structured(all_analyses):
+    """Generate the patterns report as a dictionary following PATTERNS_SCHEMA (None on errors)"""
+    cache = get_cache()
+    model = model_name(get_model('structured'))
+    cache_key = input_hash(all_analyses)
+    
+    cached_report = cache.get(model, STRUCTURED_PATTERNS_PROMPT_VERSION, cache_key)
+    if cached_report is not None:
+        record_cache_hit('generate_patterns_structured', get_model('structured'))
+        print("Loading cached patterns report")
+        return cached_report
+    
+    try:
+        prompt = f"You are an expert in YouTube content strategy. Here are analyses of top-performing YouTube videos. Identify their common patterns and success factors, and provide specific, actionable recommendations:\n\n{all_analyses}"
+        report = generate_structured('generate_patterns_structured', prompt, PATTERNS_SCHEMA)
+        cache.set(model, STRUCTURED_PATTERNS_PROMPT_VERSION, cache_key, report)
+        return report
+    except Exception as e:
+        print(f"Error generating patterns report: {e}")
+        return None
+
+def format_pattern_items(items):
+    """Numbered "1. **Title:** description" lines, the form the dashboard splits pattern sections on"""
+    return "\n".join(f"{index}. **{item.get('title', '')}:** {item.get('description', '')}" for index, item in enumerate(items, 1))
+
+def structured_patterns_sections(patterns):
+    """Sections of a structured patterns report, named like those of the free-text report"""
+    return {
+        "common patterns and success factors": format_pattern_items(patterns.get('common_patterns', []) + patterns.get('success_factors', [])),
+        "actionable recommendations": format_pattern_items(patterns.get('recommendations', []))
+    }
+
+def format_patterns_report(patterns):
+    """Render a structured patterns report as markdown"""
+    text = patterns.get('summary', '') + "\n"
+    for name, content in structured_patterns_sections(patterns).items():
+        text += f"\n### {name.title()}\n\n{content}\n"
+    return text
+
 def save_intermediate_results(data, video_analyses, top_videos, channel_id, step="video_analysis"):
-    """Save intermediate results to avoid repeating analysis if there's an error later"""
+    """Save intermediate results to avoid repeating analysis if there's an error later.
+    This compacts the channel's checkpoint journal into one file and removes the journal."""
     intermediate_results = {
         'channel_name': data['channel']['name'],
         'channel_subscribers': data['channel']['subscribers'],
@@ -183,11 +443,40 @@ def save_intermediate_results(data, video_analyses, top_videos, channel_id, step
     
     # Save to JSON file
     filename = f"youtube_analysis_intermediate_{channel_id}.json"
-    with open(filename, 'w') as f:
-        json.dump(intermediate_results, f, indent=2)
+    compact_journal(journal_path(channel_id), filename, intermediate_results)
     
     print(f"Intermediate results saved to {filename} after '{step}' step")
 
+def run_video_analysis(data, top_videos, channel_id, max_in_flight=DEFAULT_MAX_CONCURRENCY, structured=False, title_batch_size=TITLE_BATCH_SIZE):
+    """
+    Analyzes the top videos, checkpointing each finished video to the channel's
+    journal. Videos already in the journal (from an interrupted run) are not
+    analyzed again. Once all videos are done the journal is compacted into the
+    intermediate results file.
+    
+    Returns:
+        Dictionary mapping video ID to its title, views and combined analysis, in top_videos order
+    """
+    journal_file = journal_path(channel_id)
+    video_analyses = load_journaled_analyses(journal_file)
+    remaining_videos = top_videos[~top_videos['video_id'].isin(list(video_analyses))]
+    if len(remaining_videos) < len(top_videos):
+        print(f"Resuming from {journal_file}: {len(top_videos) - len(remaining_videos)} of {len(top_videos)} videos already analyzed")
+    
+    with AnalysisJournal(journal_file) as journal:
+        video_analyses.update(analyze_top_videos(
+            remaining_videos,
+            max_in_flight=max_in_flight,
+            on_video=lambda video_id, analysis: journal.append({'video_id': video_id, **analysis}),
+            structured=structured,
+            title_batch_size=title_batch_size
+        ))
+    
+    # Save the analyses in ranking order
+    video_analyses = {video_id: video_analyses[video_id] for video_id in top_videos['video_id']}
+    save_intermediate_results(data, video_analyses, top_videos, channel_id, "video_analysis")
+    return video_analyses
+
 def load_intermediate_results(channel_id):
     """Load intermediate results if they exist"""
     filename = f"youtube_analysis_intermediate_{channel_id}.json"
@@ -199,174 +488,142 @@ def load_intermediate_results(channel_id):
         print(f"No intermediate results found for {filename}: {e}")
         return None
 
-def parse_analysis_text(analysis_text):
-    """Parse the analysis text into structured data"""
-    structured_data = {}
-    
-    # Extract video title
-    title_match = analysis_text.split("ANALYSIS FOR VIDEO: ")[1].split(" ===")[0] if "ANALYSIS FOR VIDEO: " in analysis_text else ""
-    structured_data["title"] = title_match.strip()
-    
-    # Extract video metrics
-    metrics_section = analysis_text.split("VIDEO METRICS:")[1].split("TITLE ANALYSIS:")[0] if "VIDEO METRICS:" in analysis_text else ""
-    metrics = {}
-    for line in metrics_section.strip().split("\n"):
-        line = line.strip()
-        if line and ":" in line:
-            key, value = line.split(":", 1)
-            key = key.replace("-", "").strip()
-            metrics[key.lower().replace(" ", "_")] = value.strip()
-    structured_data["metrics"] = metrics
-    
-    # Extract title analysis
-    title_analysis_section = analysis_text.split("TITLE ANALYSIS:")[1].split("THUMBNAIL ANALYSIS:")[0] if "TITLE ANALYSIS:" in analysis_text else ""
-    
-    # Parse title analysis into sections
-    title_analysis = {"full_text": title_analysis_section.strip()}
-    
-    # Try to extract structured sections from title analysis
-    sections = {}
-    current_section = None
-    section_content = []
+# Section markers written by format_combined_analysis, in the order they appear.
+# Markers are only recognized at the start of a line (the pattern anchors on
+# the preceding newline, which is much faster to scan for than ^ in MULTILINE
+# mode), and each marker only after the ones before it, so a model answer
+# quoting e.g. "TITLE ANALYSIS:" does not start a new section.
+ANALYSIS_MARKER_RE = re.compile(
+    r'\n[ \t]*(?:=== ANALYSIS FOR VIDEO: (?P<title>[^\n]*?) ===[ \t]*(?=\n|$)|(?P<marker>VIDEO METRICS|TITLE ANALYSIS|THUMBNAIL ANALYSIS|VIDEO URL):)'
+)
+ANALYSIS_MARKER_ORDER = {'VIDEO METRICS': 0, 'TITLE ANALYSIS': 1, 'THUMBNAIL ANALYSIS': 2, 'VIDEO URL': 3}
+ANALYSIS_END = "=========================================================="
+
+# "- Engagement Rate: 2.4%" lines in the metrics section
+METRIC_LINE_RE = re.compile(r'^[ \t]*([^:\n]*):(.*)$', re.MULTILINE)
+
+# Header lines in title/thumbnail analyses: numbered ("1. Keywords:", "12. Clarity") or bold ("**Colors**")
+ANALYSIS_HEADER_RE = re.compile(r'[0-9]+\.|\*\*(?:.*\*\*|\*)?$')
+# Candidate header lines in patterns reports: "###" or possibly all caps
+PATTERNS_HEADER_RE = re.compile(r'###|[^a-z]{6,}$')
+
+def split_analysis_sections(analysis_text):
+    """
+    Splits a combined analysis into its parts in one scan over the section markers.
     
-    for line in title_analysis_section.strip().split("\n"):
-        line = line.strip()
-        if not line:
+    Returns:
+        Dictionary with the video title and the raw text of each section found,
+        keyed by marker ('title', 'VIDEO METRICS', 'TITLE ANALYSIS', 'THUMBNAIL ANALYSIS', 'VIDEO URL')
+    """
+    # Prepend a newline so a marker on the first line is anchored too
+    text = "\n" + analysis_text
+    segments = {}
+    current_marker, segment_start, stage = None, 0, -1
+    for match in ANALYSIS_MARKER_RE.finditer(text):
+        marker = match.group('marker')
+        if marker is None:
+            segments.setdefault('title', match.group('title'))
             continue
-            
-        # Check if this is a new section header (numbered with a period or has ** around it)
-        if line.startswith(("1.", "2.", "3.", "4.", "5.", "6.", "7.")) or (line.startswith("**") and line.endswith("**")):
-            # Save previous section if it exists
-            if current_section and section_content:
-                sections[current_section] = "\n".join(section_content)
-                section_content = []
-            
-            # Extract new section name
-            if line.startswith(("1.", "2.", "3.", "4.", "5.", "6.", "7.")):
-                parts = line.split(".", 1)
-                if len(parts) > 1:
-                    current_section = parts[1].strip().lower()
-                    if ":" in current_section:
-                        current_section = current_section.split(":", 1)[0].strip()
-            else:
-                current_section = line.replace("**", "").strip().lower()
-        else:
-            # Add content to current section
-            if current_section:
-                section_content.append(line)
-    
-    # Add the last section
-    if current_section and section_content:
-        sections[current_section] = "\n".join(section_content)
-    
-    # Add structured sections to title analysis
-    if sections:
-        title_analysis["sections"] = sections
-    
-    structured_data["title_analysis"] = title_analysis
-    
-    # Extract thumbnail analysis
-    thumbnail_analysis_section = ""
-    if "THUMBNAIL ANALYSIS:" in analysis_text:
-        parts = analysis_text.split("THUMBNAIL ANALYSIS:")
-        if len(parts) > 1:
-            thumbnail_analysis_section = parts[1].split("VIDEO URL:")[0] if "VIDEO URL:" in parts[1] else parts[1]
+        if ANALYSIS_MARKER_ORDER[marker] <= stage:
+            continue
+        if current_marker:
+            segments[current_marker] = text[segment_start:match.start()]
+        current_marker, segment_start, stage = marker, match.end(), ANALYSIS_MARKER_ORDER[marker]
+    if current_marker:
+        segments[current_marker] = text[segment_start:]
+    return segments
+
+def parse_sections(text, header_re, header_name):
+    """
+    Groups the non-empty lines of a text under their section headers.
     
-    # Parse thumbnail analysis into sections
-    thumbnail_analysis = {"full_text": thumbnail_analysis_section.strip()}
+    Args:
+        text: Text to parse
+        header_re: Compiled regex matching header lines (and possibly a few content lines)
+        header_name: Function returning the section name for a matched line, or None if it is content after all
     
-    # Try to extract structured sections from thumbnail analysis
+    Returns:
+        Dictionary mapping section name to its lines joined with newlines (sections without content are left out)
+    """
+    is_candidate = header_re.match
     sections = {}
     current_section = None
     section_content = []
     
-    for line in thumbnail_analysis_section.strip().split("\n"):
+    for line in text.split("\n"):
         line = line.strip()
         if not line:
             continue
-            
-        # Check if this is a new section header (numbered with a period or has ** around it)
-        if line.startswith(("1.", "2.", "3.", "4.", "5.", "6.", "7.")) or (line.startswith("**") and line.endswith("**")):
+        
+        name = header_name(line) if is_candidate(line) else None
+        if name is not None:
             # Save previous section if it exists
             if current_section and section_content:
                 sections[current_section] = "\n".join(section_content)
-                section_content = []
-            
-            # Extract new section name
-            if line.startswith(("1.", "2.", "3.", "4.", "5.", "6.", "7.")):
-                parts = line.split(".", 1)
-                if len(parts) > 1:
-                    current_section = parts[1].strip().lower()
-                    if ":" in current_section:
-                        current_section = current_section.split(":", 1)[0].strip()
-            else:
-                current_section = line.replace("**", "").strip().lower()
-        else:
-            # Add content to current section
-            if current_section:
-                section_content.append(line)
+            current_section, section_content = name, []
+        elif current_section:
+            section_content.append(line)
     
     # Add the last section
     if current_section and section_content:
         sections[current_section] = "\n".join(section_content)
-    
-    # Add structured sections to thumbnail analysis
+    return sections
+
+def analysis_header_name(line):
+    """Section name of a numbered ("3. Psychological Triggers:") or bold ("**Colors**") header line"""
+    if line[0] == "*":
+        return line.replace("**", "").strip().lower()
+    name = line.split(".", 1)[1].strip().lower()
+    return name.split(":", 1)[0].strip() if ":" in name else name
+
+def patterns_header_name(line):
+    """Section name of a "###" or all-caps header line"""
+    if line.startswith("###") or (len(line) > 5 and line.isupper()):
+        name = line.replace("###", "").strip().lower()
+        return name.split(":", 1)[0].strip() if ":" in name else name
+    return None
+
+def parse_analysis_section(section_text):
+    """Full text of an analysis section plus its structured sections, if any"""
+    analysis = {"full_text": section_text.strip()}
+    sections = parse_sections(section_text, ANALYSIS_HEADER_RE, analysis_header_name)
     if sections:
-        thumbnail_analysis["sections"] = sections
-    
-    structured_data["thumbnail_analysis"] = thumbnail_analysis
-    
-    # Extract video URL
-    video_url = ""
-    if "VIDEO URL:" in analysis_text:
-        video_url_section = analysis_text.split("VIDEO URL:")[1].split("==========================================================")[0]
-        video_url = video_url_section.strip()
-    structured_data["video_url"] = video_url
+        analysis["sections"] = sections
+    return analysis
+
+def parse_analysis_text(analysis_text):
+    """Parse the analysis text into structured data"""
+    segments = split_analysis_sections(analysis_text)
     
-    return structured_data
+    metrics = {}
+    for key, value in METRIC_LINE_RE.findall(segments.get('VIDEO METRICS', '')):
+        metrics[key.replace("-", "").strip().lower().replace(" ", "_")] = value.strip()
+    
+    return {
+        "title": segments.get('title', '').strip(),
+        "metrics": metrics,
+        "title_analysis": parse_analysis_section(segments.get('TITLE ANALYSIS', '')),
+        "thumbnail_analysis": parse_analysis_section(segments.get('THUMBNAIL ANALYSIS', '')),
+        "video_url": segments.get('VIDEO URL', '').split(ANALYSIS_END)[0].strip()
+    }
 
 def parse_patterns_report(patterns_text):
     """Parse the patterns report into structured data"""
     structured_data = {"full_text": patterns_text}
     
-    # Try to extract sections
-    sections = {}
-    current_section = None
-    section_content = []
-    
-    for line in patterns_text.strip().split("\n"):
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Check if this is a section header (starts with ### or is all caps)
-        if line.startswith("###") or (line.isupper() and len(line) > 5):
-            # Save previous section if it exists
-            if current_section and section_content:
-                sections[current_section] = "\n".join(section_content)
-                section_content = []
-            
-            # Extract new section name
-            current_section = line.replace("###", "").strip().lower()
-            if ":" in current_section:
-                current_section = current_section.split(":", 1)[0].strip()
-        else:
-            # Add content to current section
-            if current_section:
-                section_content.append(line)
-    
-    # Add the last section
-    if current_section and section_content:
-        sections[current_section] = "\n".join(section_content)
-    
-    # Add structured sections
+    sections = parse_sections(patterns_text, PATTERNS_HEADER_RE, patterns_header_name)
     if sections:
         structured_data["sections"] = sections
     
     return structured_data
 
-def create_final_report(data, video_analyses, patterns_report, channel_id, top_videos=None):
-    """Create the final reports in both markdown and structured JSON formats"""
+def create_final_report(data, video_analyses, patterns_report, channel_id, top_videos=None, patterns_structured=None):
+    """Create the final reports in both markdown and structured JSON formats
+    
+    Analyses produced in --structured mode already carry their UI form
+    ('structured_analysis'), and patterns_structured is the typed patterns
+    report; only free-text results are parsed.
+    """
     # Save original results (for backward compatibility)
     original_results = {
         'channel_name': data['channel']['name'],
@@ -388,6 +645,11 @@ def create_final_report(data, video_analyses, patterns_report, channel_id, top_v
         'video_analyses': {},
         'patterns_report': parse_patterns_report(patterns_report)
     }
+    if patterns_structured is not None:
+        structured_results['patterns_report'] = {
+            'full_text': patterns_report,
+            'sections': structured_patterns_sections(patterns_structured)
+        }
     
     # Process top videos
     if isinstance(top_videos, pd.DataFrame):
@@ -421,7 +683,7 @@ def create_final_report(data, video_analyses, patterns_report, channel_id, top_v
         structured_results['video_analyses'][video_id] = {
             'title': analysis['title'],
             'views': analysis['views'],
-            'structured_analysis': parse_analysis_text(analysis['analysis'])
+            'structured_analysis': analysis.get('structured_analysis') or parse_analysis_text(analysis['analysis'])
         }
     
     # Save structured data to new JSON file (now channel-specific)
@@ -434,7 +696,7 @@ def create_final_report(data, video_analyses, patterns_report, channel_id, top_v
     with open(output_report_md_file, 'w') as f:
         f.write(f"# YouTube Content Analysis for {data['channel']['name']}\n\n")
         f.write(f"Channel Subscribers: {data['channel']['subscribers']}\n\n")
-        f.write("## Top 10 Videos by Views\n\n")
+        f.write(f"## Top {len(video_analyses)} Videos by Views\n\n")
         
         # If we have the top_videos DataFrame
         if isinstance(top_videos, pd.DataFrame):
@@ -464,6 +726,21 @@ def create_final_report(data, video_analyses, patterns_report, channel_id, top_v
     print(f"Structured UI-friendly data saved to '{output_ui_json_file}'")
     print(f"Report saved to '{output_report_md_file}'")
 
+def generate_patterns(all_analyses, structured=False):
+    """
+    Generates the patterns report, as schema-constrained JSON in structured mode.
+    
+    Returns:
+        Tuple of (markdown report text, structured report dictionary or None)
+    """
+    print("Generating patterns report...")
+    if structured:
+        patterns_structured = generate_patterns_structured(all_analyses)
+        if patterns_structured is not None:
+            return format_patterns_report(patterns_structured), patterns_structured
+        print("Falling back to the free-text patterns report")
+    return generate_patterns_report(all_analyses), None
+
 def main(args): # Add args
     # Check for intermediate results first
     intermediate = load_intermediate_results(args.channel_id)
@@ -477,90 +754,48 @@ def main(args): # Add args
         video_analyses = intermediate['video_analyses']
         top_videos = intermediate['top_videos']
         
-        # Build all_analyses string from video_analyses
-        all_analyses = ""
-        for video_id, analysis_data in video_analyses.items():
-            all_analyses += analysis_data['analysis'] + "\n\n"
-        
     else:
         # Start from the beginning
-        print("No intermediate results found or results are incomplete. Starting from scratch.")
+        print("No intermediate results found or results are incomplete. Analyzing videos (resuming from the journal if one exists).")
         
         # Load the JSON data
-        data = load_data(args.data_file) # Use args.data_file
+        data = load_data(args.data_file, channel_id=args.channel_id) # Use args.data_file
         
         if not data:
             print(f"Failed to load data from {args.data_file}. Exiting.")
             return
         
-        # Get top 10 videos by views
-        top_videos = get_top_videos(data, metric='views', count=10)
+        # Get top videos by views
+        top_videos = get_top_videos(data, metric='views', count=args.top_count)
         print(f"Found {len(top_videos)} top videos by views.")
         
-        # Analyze each video's title and thumbnail
-        all_analyses = ""
-        video_analyses = {}
-        
-        for idx, (_, row) in enumerate(top_videos.iterrows()):
-            print(f"Analyzing video {idx+1} of {len(top_videos)}...")
-            analysis = get_combined_analysis(row)
-            
-            # Store analysis
-            video_analyses[row['video_id']] = {
-                'title': row['title'],
-                'views': row['views'],
-                'analysis': analysis
-            }
-            
-            all_analyses += analysis + "\n\n"
-            
-            # Save intermediate results after each video
-            save_intermediate_results(data, video_analyses, top_videos, args.channel_id, "video_analysis") # Pass channel_id
-
-            if idx < len(top_videos) - 1: # Avoid sleep after the last video
-                print(f"Processed video {idx+1}/{len(top_videos)} in main() for JSON output. Waiting 2 seconds...")
-                time.sleep(2)
+        # Analyze each video's title and thumbnail, checkpointing each video to the journal
+        video_analyses = run_video_analysis(data, top_videos, args.channel_id, max_in_flight=args.max_in_flight, structured=args.structured, title_batch_size=args.title_batch_size)
+    
+    # Summarize the analyses in chunks first if they are too long for one prompt
+    all_analyses = condense_analyses([analysis['analysis'] for analysis in video_analyses.values()], get_model('text'), token_budget=args.patterns_token_budget, max_in_flight=args.max_in_flight)
     
     # Generate overall patterns report
-    print("Generating patterns report...")
-    patterns_report = generate_patterns_report(all_analyses)
+    patterns_report, patterns_structured = generate_patterns(all_analyses, structured=args.structured)
     
     # Create final report
-    create_final_report(data, video_analyses, patterns_report, args.channel_id, top_videos) # Pass channel_id
+    create_final_report(data, video_analyses, patterns_report, args.channel_id, top_videos, patterns_structured) # Pass channel_id
 
 def analyze_videos_only(args): # Add args
     """Run only the video analysis part without generating patterns"""
     # Load the JSON data
-    data = load_data(args.data_file) # Use args.data_file
+    data = load_data(args.data_file, channel_id=args.channel_id) # Use args.data_file
     
     if not data:
         print(f"Failed to load data from {args.data_file}. Exiting.")
         return
     
-    # Get top 10 videos by views
-    top_videos = get_top_videos(data, metric='views', count=10)
+    # Get top videos by views
+    top_videos = get_top_videos(data, metric='views', count=args.top_count)
     print(f"Found {len(top_videos)} top videos by views.")
     
-    # Analyze each video's title and thumbnail
-    video_analyses = {}
-    
-    for idx, (_, row) in enumerate(top_videos.iterrows()):
-        print(f"Analyzing video {idx+1} of {len(top_videos)}...")
-        analysis = get_combined_analysis(row)
-        
-        # Store analysis
-        video_analyses[row['video_id']] = {
-            'title': row['title'],
-            'views': row['views'],
-            'analysis': analysis
-        }
-        
-        # Save intermediate results after each video
-        save_intermediate_results(data, video_analyses, top_videos, args.channel_id, "video_analysis") # Pass channel_id
-
-            if idx < len(top_videos) - 1: # Avoid sleep after the last video
-                print(f"Processed video {idx+1}/{len(top_videos)} in analyze_videos_only() for JSON output. Waiting 2 seconds...")
-                time.sleep(2)
+    # Analyze each video's title and thumbnail, checkpointing each video to the journal
+    run_video_analysis(data, top_videos, args.channel_id, max_in_flight=args.max_in_flight, structured=args.structured, title_batch_size=args.title_batch_size)
     
     print("Video analysis complete! Run the script with --patterns flag to generate the patterns report.")
 
@@ -578,17 +813,14 @@ def analyze_patterns_only(args): # Add args
     video_analyses = intermediate['video_analyses']
     top_videos = intermediate['top_videos']
     
-    # Build all_analyses string from video_analyses
-    all_analyses = ""
-    for video_id, analysis_data in video_analyses.items():
-        all_analyses += analysis_data['analysis'] + "\n\n"
+    # Summarize the analyses in chunks first if they are too long for one prompt
+    all_analyses = condense_analyses([analysis['analysis'] for analysis in video_analyses.values()], get_model('text'), token_budget=args.patterns_token_budget, max_in_flight=args.max_in_flight)
     
     # Generate overall patterns report
-    print("Generating patterns report...")
-    patterns_report = generate_patterns_report(all_analyses)
+    patterns_report, patterns_structured = generate_patterns(all_analyses, structured=args.structured)
     
     # Create final report
-    create_final_report(data, video_analyses, patterns_report, args.channel_id, top_videos) # Pass channel_id
+    create_final_report(data, video_analyses, patterns_report, args.channel_id, top_videos, patterns_structured) # Pass channel_id
 
 if __name__ == "__main__":
     import argparse
@@ -596,10 +828,17 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Analyze YouTube video data with options for partial execution and JSON output focus.')
     parser.add_argument('--videos', action='store_true', help='Run only video analysis.')
     parser.add_argument('--patterns', action='store_true', help='Run only patterns analysis.')
-    parser.add_argument("--data_file", type=str, required=True, help="Path to the input YouTube video data JSON file (e.g., youtube_video_data_CHANNELID.json).")
+    parser.add_argument("--data_file", type=str, required=True, help="Path to the input YouTube video data JSON file (e.g., youtube_video_data_CHANNELID.json) or parquet/arrow dataset directory (e.g., youtube_video_dataset).")
     parser.add_argument("--channel_id", type=str, required=True, help="Channel ID to be used for naming output files.")
+    parser.add_argument("--top_count", type=int, default=10, help="Number of top videos (by views) to analyze (default: 10).")
+    parser.add_argument("--patterns_token_budget", type=int, default=PATTERNS_TOKEN_BUDGET, help=f"Estimated tokens of video analyses per patterns prompt; larger sets are summarized in chunks first (default: {PATTERNS_TOKEN_BUDGET}).")
+    parser.add_argument("--title_batch_size", type=int, default=TITLE_BATCH_SIZE, help=f"Number of uncached titles analyzed per Gemini request; 1 sends one request per title (default: {TITLE_BATCH_SIZE}).")
+    parser.add_argument("--max_in_flight", type=int, default=DEFAULT_MAX_CONCURRENCY, help=f"Maximum number of Gemini requests in flight at once (default: {DEFAULT_MAX_CONCURRENCY}).")
+    parser.add_argument("--structured", action="store_true", help="Request schema-constrained JSON analyses from Gemini (gemini-1.5-flash) and build the UI JSON from them directly instead of parsing free text.")
+    parser.add_argument("--rate_limit", action="append", metavar="API=RPS", help="Override the token-bucket rate for Gemini, for all models (gemini=2) or one model (gemini:gemini-pro-vision=0.5). Can be repeated.")
     
     args = parser.parse_args()
+    apply_rate_limit_args(args.rate_limit)
 
     print(f"Starting JSON analysis for channel {args.channel_id} using data from: {args.data_file}")
     if args.videos:
@@ -611,3 +850,5 @@ if __name__ == "__main__":
     else:
         print("Running full analysis (videos and patterns).")
         main(args)
+    get_cache().print_stats()
+    get_metrics().finish()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Async Fetch Engine
+
+Runs blocking API calls (YouTube Data API, YouTube Analytics API, Gemini) on
+worker threads with bounded concurrency. Each API (and each Gemini model) is
+throttled by its own token-bucket limiter, so throughput rises to the
+configured quota ceiling instead of sitting behind fixed sleeps between calls.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from quota_ledger import execute_metered
+
+# Sustained requests per second and burst size allowed for each API.
+# Gemini models are limited separately as 'gemini:<model name>' and start from
+# the 'gemini' values unless configured on their own.
+# Override with configure_rate_limit() or the --rate_limit command-line option.
+RATE_LIMITS = {
+    'data': {'rate': 10.0, 'burst': 20},
+    'analytics': {'rate': 5.0, 'burst': 10},
+    'gemini': {'rate': 1.0, 'burst': 5}
+}
+
+# Maximum number of API calls in flight at once
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter usable from both threads and coroutines.
+    Tokens refill continuously at `rate` per second up to `burst`; every call
+    takes one token and waits only when the bucket is empty.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """
+        Takes one token and returns how many seconds the caller must wait for it.
+        The balance may go negative, which queues callers in arrival order.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self):
+        """Blocks the calling thread until a token is available."""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        """Waits (without blocking the event loop) until a token is available."""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _base_api(api):
+    return api.split(':', 1)[0]
+
+
+def get_limiter(api):
+    """
+    Returns the shared token bucket for an API ('data', 'analytics', 'gemini'
+    or a single Gemini model such as 'gemini:gemini-pro-vision').
+    """
+    with _limiters_lock:
+        if api not in _limiters:
+            limits = RATE_LIMITS.get(api) or RATE_LIMITS[_base_api(api)]
+            _limiters[api] = TokenBucket(limits['rate'], limits['burst'])
+        return _limiters[api]
+
+
+def configure_rate_limit(api, rate, burst=None):
+    """
+    Sets the sustained rate (requests per second) and burst size for an API.
+
+    Args:
+        api: API name ('data', 'analytics', 'gemini' or 'gemini:<model name>')
+        rate: Requests per second
+        burst: Maximum burst size (default: twice the rate, at least 1)
+    """
+    if burst is None:
+        burst = max(1, int(rate * 2))
+    with _limiters_lock:
+        RATE_LIMITS[api] = {'rate': float(rate), 'burst': burst}
+        _limiters[api] = TokenBucket(rate, burst)
+
+
+def apply_rate_limit_args(rate_limit_args):
+    """
+    Applies --rate_limit command-line values of the form 'api=requests_per_second'
+    (e.g. 'analytics=2' or 'gemini:gemini-pro-vision=0.5').
+    """
+    for value in rate_limit_args or []:
+        api, _, rate = value.partition('=')
+        if _base_api(api) not in RATE_LIMITS or not rate:
+            raise ValueError(f"Invalid --rate_limit value '{value}'. Expected one of {', '.join(RATE_LIMITS)} (or gemini:<model name>) followed by =<requests per second>.")
+        configure_rate_limit(api, float(rate))
+
+
+_thread_state = threading.local()
+
+
+def _thread_http(http):
+    """
+    Returns a per-thread authorized HTTP client with the same credentials as `http`.
+    httplib2 connections are not thread-safe, so worker threads must not share
+    the one built into a googleapiclient service object.
+    """
+    credentials = getattr(http, 'credentials', None)
+    if credentials is None:
+        return None
+
+    clients = getattr(_thread_state, 'clients', None)
+    if clients is None:
+        clients = _thread_state.clients = {}
+
+    if id(credentials) not in clients:
+        import httplib2
+        import google_auth_httplib2
+        clients[id(credentials)] = google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+    return clients[id(credentials)]
+
+
+def model_api(model):
+    """
+    Returns the rate limiter name of a Gemini model, e.g. 'gemini:gemini-pro-vision'.
+    """
+    model_name = getattr(model, 'model_name', None) or str(model)
+    return f"gemini:{model_name.split('/')[-1]}"
+
+
+def execute_request(request, api=None):
+    """
+    Executes a googleapiclient request safely from any thread and records it
+    in the quota ledger.
+
+    Args:
+        request: googleapiclient HttpRequest
+        api: If given, waits for a token from this API's limiter first
+
+    Returns:
+        The parsed API response
+    """
+    if api is not None:
+        get_limiter(api).acquire()
+
+    if threading.current_thread() is not threading.main_thread():
+        http = _thread_http(getattr(request, 'http', None))
+        if http is not None:
+            return execute_metered(request, http=http)
+    return execute_metered(request)
+
+
+class FetchEngine:
+    """
+    Runs blocking calls concurrently on an asyncio event loop in a background
+    thread. Calls are rate limited per API and at most `max_concurrency` run at
+    once. submit() returns a concurrent.futures.Future, so synchronous code can
+    keep producing work (e.g. paging through a playlist) while earlier calls
+    are in flight.
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='fetch')
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='fetch-engine', daemon=True)
+        self._thread.start()
+
+    async def _run(self, api, fn, args, kwargs):
+        if api is not None:
+            await get_limiter(api).acquire_async()
+        return await self._loop.run_in_executor(self._executor, lambda: fn(*args, **kwargs))
+
+    def submit(self, api, fn, *args, **kwargs):
+        """
+        Schedules fn(*args, **kwargs) after taking a token from the API's limiter.
+
+        Args:
+            api: API name used for rate limiting, or None for no limit
+            fn: Blocking callable to run on a worker thread
+
+        Returns:
+            concurrent.futures.Future with the call's result
+        """
+        return asyncio.run_coroutine_threadsafe(self._run(api, fn, args, kwargs), self._loop)
+
+    def map(self, api, fn, items):
+        """
+        Runs fn(item) concurrently for every item and returns the results in order.
+        """
+        futures = [self.submit(api, fn, item) for item in items]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Stops the event loop and worker threads."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def analyze_videos_concurrently(engine, rows, tasks, on_complete=None):
+    """
+    Runs independent per-video analyses (e.g. title and thumbnail) for many
+    videos at once. Every call of every video is submitted to the engine up
+    front, so the engine's max_concurrency and the per-API rate limits are the
+    only bounds on throughput.
+
+    Args:
+        engine: FetchEngine to run the calls on
+        rows: List of videos (dicts or pandas rows)
+        tasks: Dictionary mapping a task name to (api, fn); fn(row) returns the task's result
+        on_complete: Optional callback(index, row, results) called on the calling
+            thread as soon as all tasks of a video have finished
+
+    Returns:
+        List with one {task name: result} dictionary per row, in row order
+    """
+    results = [{} for _ in rows]
+    pending = {}
+    for index, row in enumerate(rows):
+        for name, (api, fn) in tasks.items():
+            pending[engine.submit(api, fn, row)] = (index, name)
+
+    for future in as_completed(pending):
+        index, name = pending[future]
+        results[index][name] = future.result()
+        if len(results[index]) == len(tasks) and on_complete is not None:
+            on_complete(index, rows[index], results[index])
+
+    return results
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the command-line scripts.
+
+Imports each script module in a fresh interpreter (what every cron run pays
+before doing any work) and reports the best wall time over --repeat runs,
+plus the slowest imports reported by `python -X importtime`.
+
+Usage:
+    python benchmarks/bench_import_time.py [--modules analyze content_planner ...] [--repeat 5] [--top 5]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT_MODULES = [
+    'analyze', 'analyze_new', 'analyze_new_json', 'content_planner',
+    'get_data', 'get_data_basic', 'media', 'media_basic'
+]
+
+
+def import_seconds(module):
+    """Returns the wall time, in seconds, of importing a module in a new interpreter."""
+    started_at = time.perf_counter()
+    subprocess.run([sys.executable, '-c', f'import {module}'], cwd=REPO_ROOT, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started_at
+
+
+def slowest_imports(module, top):
+    """
+    Returns the module's slowest direct imports by cumulative time
+    (microseconds, package name), from `python -X importtime`.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=REPO_ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    timings = []
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package", nesting shown by indentation
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|', 2)
+        # The script module is indented by one space, its direct imports by three
+        if len(name) - len(name.lstrip()) != 3:
+            continue
+        timings.append((int(cumulative), name.strip()))
+    return sorted(timings, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the import (startup) time of the scripts.")
+    parser.add_argument("--modules", nargs='+', default=SCRIPT_MODULES, help="Modules to import (default: all scripts).")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs per module; the best one is reported (default: 5).")
+    parser.add_argument("--top", type=int, default=5, help="Number of slowest imports to list per module (default: 5).")
+    args = parser.parse_args()
+
+    baseline = min(import_seconds('sys') for _ in range(args.repeat))
+    print(f"Interpreter startup: {baseline * 1000:.0f} ms (best of {args.repeat})")
+    for module in args.modules:
+        try:
+            seconds = min(import_seconds(module) for _ in range(args.repeat))
+        except subprocess.CalledProcessError:
+            print(f"- {module}: import failed")
+            continue
+        print(f"- {module}: {seconds * 1000:.0f} ms ({(seconds - baseline) * 1000:.0f} ms of imports)")
+        for cumulative, name in slowest_imports(module, args.top):
+            print(f"    {cumulative / 1000:7.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for parse_analysis_text and parse_patterns_report, the parsers
+used to build youtube_analysis_ui_<CHANNEL_ID>.json.
+
+Parses the analyses stored in a results file (default: the sample
+youtube_analysis_results.json), repeated until --count analyses have been
+parsed, and reports the time per analysis.
+
+Usage:
+    python benchmarks/bench_parse_analysis.py [--results_file FILE] [--count 5000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyze_new_json import parse_analysis_text, parse_patterns_report
+
+
+def time_parser(parser, texts, repeat):
+    """Returns the best wall time, in seconds, of parsing all texts."""
+    best = float('inf')
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        for text in texts:
+            parser(text)
+        best = min(best, time.perf_counter() - started_at)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis text parsers.")
+    parser.add_argument("--results_file", type=str, default="youtube_analysis_results.json", help="Analysis results JSON file to take the analyses from (default: youtube_analysis_results.json).")
+    parser.add_argument("--count", type=int, default=5000, help="Number of analyses to parse per round (default: 5000).")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of rounds; the best one is reported (default: 5).")
+    args = parser.parse_args()
+
+    with open(args.results_file, 'r', encoding='utf-8') as f:
+        results = json.load(f)
+
+    analyses = [analysis['analysis'] for analysis in results['video_analyses'].values()]
+    texts = (analyses * (args.count // len(analyses) + 1))[:args.count]
+    reports = [results['patterns_report']] * args.count
+    total_mb = sum(len(text) for text in texts) / 1e6
+
+    print(f"Parsing {args.count} analyses ({total_mb:.1f} MB of text), best of {args.repeat} rounds")
+    for name, function, inputs in (('parse_analysis_text', parse_analysis_text, texts),
+                                   ('parse_patterns_report', parse_patterns_report, reports)):
+        seconds = time_parser(function, inputs, args.repeat)
+        print(f"- {name}: {seconds:.3f}s total, {seconds / len(inputs) * 1e6:.1f}us per text, {len(inputs) / seconds:,.0f} texts/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the content planner's top-video selection.
+
+Times content_planner.select_top_videos on a synthetic catalog of video
+dictionaries (the path the planner runs), and splits it into reading the
+metrics out of the dictionaries and the NumPy scoring and top-k selection.
+
+Usage:
+    python benchmarks/bench_video_scoring.py [--count 1000000] [--top 5] [--scoring minmax|rank] [--repeat 3]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from content_planner import select_top_videos
+from video_scoring import DEFAULT_WEIGHTS, NORMALIZATION_METHODS, metric_values, score, top_k
+
+
+def best_time(fn, repeat):
+    """Returns the best wall time, in seconds, of calling fn()."""
+    best = float('inf')
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started_at)
+    return best
+
+
+def synthetic_videos(count, seed=0):
+    """Returns video dictionaries shaped like the JSON export's, with the default weight metrics."""
+    rng = np.random.default_rng(seed)
+    retention = np.round(rng.uniform(5, 80, count), 2).tolist()
+    shares = rng.integers(0, 5000, count).tolist()
+    return [{'video_id': f"v{i}", 'title': f"Video {i}", 'retention_rate': retention[i], 'shares': shares[i]}
+            for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the content planner's top-video selection.")
+    parser.add_argument("--count", type=int, default=1000000, help="Number of videos in the catalog (default: 1000000).")
+    parser.add_argument("--top", type=int, default=5, help="Number of videos to select (default: 5).")
+    parser.add_argument("--scoring", choices=NORMALIZATION_METHODS, default='minmax', help="Normalization method (default: minmax).")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of rounds; the best one is reported (default: 3).")
+    args = parser.parse_args()
+
+    videos = synthetic_videos(args.count)
+    metrics = {metric: metric_values(videos, metric) for metric in DEFAULT_WEIGHTS}
+
+    def select():
+        with contextlib.redirect_stdout(io.StringIO()):
+            select_top_videos(videos, num_videos=args.top, method=args.scoring)
+
+    total = best_time(select, args.repeat)
+    extract = best_time(lambda: [metric_values(videos, metric) for metric in DEFAULT_WEIGHTS], args.repeat)
+    core = best_time(lambda: top_k(score(metrics, DEFAULT_WEIGHTS, args.scoring), args.top), args.repeat)
+
+    print(f"{args.count:,} videos, top {args.top}, {args.scoring} scoring (best of {args.repeat}):")
+    print(f"- select_top_videos:       {total * 1000:8.1f} ms")
+    print(f"  - metric_values:         {extract * 1000:8.1f} ms")
+    print(f"  - score + top_k (NumPy): {core * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
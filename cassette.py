@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Record/Replay Cassettes
+
+Captures YouTube API (googleapiclient) requests, Gemini generate_content calls
+and plain HTTP downloads (thumbnails) into cassette files, and serves them back
+deterministically so the pipeline can be profiled offline without credentials,
+quota or API keys.
+
+Controlled with environment variables:
+- YT_CASSETTE_MODE: off (default), record or replay
+- YT_CASSETTE_DIR: cassette directory (default: cassettes)
+- YT_CASSETTE_LATENCY_MS: latency injected into every replayed call, in
+  milliseconds, or 'recorded' to replay each call's recorded latency (default: 0)
+
+Example:
+    YT_CASSETTE_MODE=record python get_data.py --channel_id UC...
+    YT_CASSETTE_MODE=replay YT_CASSETTE_LATENCY_MS=recorded python get_data.py --channel_id UC...
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import date, datetime
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+CASSETTE_MODES = ('off', 'record', 'replay')
+
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# BatchHttpRequest puts a random UUID in every part's Content-ID and a random
+# MIME boundary in the body; both are masked when matching batch requests.
+_BATCH_ID_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+_BOUNDARY_RE = re.compile(r'=+\d+=+')
+
+_cassette_lock = threading.Lock()
+_loaded_cassettes = {}
+_used_entries = {}
+
+
+def cassette_mode():
+    """
+    Returns the cassette mode from YT_CASSETTE_MODE ('off', 'record' or 'replay').
+    """
+    mode = os.environ.get('YT_CASSETTE_MODE', 'off').strip().lower() or 'off'
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"Invalid YT_CASSETTE_MODE '{mode}'. Expected one of: {', '.join(CASSETTE_MODES)}.")
+    return mode
+
+
+def replaying():
+    """Returns True when calls are served from cassettes instead of the network."""
+    return cassette_mode() == 'replay'
+
+
+def cassette_dir():
+    return os.environ.get('YT_CASSETTE_DIR', 'cassettes')
+
+
+def _replay_delay(recorded_latency_ms):
+    """
+    Sleeps for the configured replay latency (a fixed number of milliseconds,
+    or the call's recorded latency when YT_CASSETTE_LATENCY_MS=recorded).
+    """
+    setting = os.environ.get('YT_CASSETTE_LATENCY_MS', '0').strip().lower()
+    delay_ms = recorded_latency_ms if setting == 'recorded' else float(setting or 0)
+    if delay_ms > 0:
+        time.sleep(delay_ms / 1000)
+
+
+def _cassette_path(kind, key):
+    return os.path.join(cassette_dir(), kind, f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:24]}.json")
+
+
+def _load_entries(path):
+    """
+    Returns the recorded entries in a cassette file (cached after the first read).
+    Must be called with _cassette_lock held.
+    """
+    if path not in _loaded_cassettes:
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                _loaded_cassettes[path] = json.load(f)
+        else:
+            _loaded_cassettes[path] = []
+    return _loaded_cassettes[path]
+
+
+def _append_entry(kind, key, entry):
+    """Records one interaction under a matching key."""
+    path = _cassette_path(kind, key)
+    with _cassette_lock:
+        entries = _load_entries(path)
+        entries.append(entry)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, path)
+
+
+def _find_entry(kind, key, score=None):
+    """
+    Picks the recorded interaction to replay for a matching key. Entries not yet
+    replayed are preferred (so repeated calls are served in recorded order), and
+    among those the one with the highest score(entry) wins.
+    """
+    path = _cassette_path(kind, key)
+    with _cassette_lock:
+        entries = _load_entries(path)
+        if not entries:
+            raise LookupError(f"No {kind} cassette recorded for this call (looked in {path}). Record one with YT_CASSETTE_MODE=record.")
+
+        used = _used_entries.setdefault(path, set())
+        candidates = [index for index in range(len(entries)) if index not in used] or list(range(len(entries)))
+        best = max(candidates, key=lambda index: (score(entries[index]) if score else 0, -index))
+        used.add(best)
+        return entries[best]
+
+
+def _encode_content(content):
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    try:
+        return {'text': content.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'base64': base64.b64encode(content).decode('ascii')}
+
+
+def _decode_content(encoded):
+    if 'base64' in encoded:
+        return base64.b64decode(encoded['base64'])
+    return encoded['text'].encode('utf-8')
+
+
+# --- YouTube API (googleapiclient) ---
+
+def _relative_dates(uri):
+    """
+    Replaces date-valued query parameters with their offset from today, so a
+    query such as 'the last 30 days' matches the recording on a later day.
+    """
+    today = date.today()
+    relative = []
+    for name, value in sorted(parse_qsl(urlsplit(uri).query, keep_blank_values=True)):
+        if _DATE_RE.match(value):
+            value = f"today-{(today - date.fromisoformat(value)).days}"
+        relative.append((name, value))
+    return urlencode(relative)
+
+
+def _http_match_key(method, uri, body):
+    """
+    Builds the key recorded requests are grouped under: method, path and sorted
+    query parameters with dates and batch IDs masked, plus a hash of the body.
+    """
+    parts = urlsplit(uri)
+    params = [(name, 'DATE' if _DATE_RE.match(value) else value)
+              for name, value in sorted(parse_qsl(parts.query, keep_blank_values=True))]
+    body = body or ''
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', errors='replace')
+    body = _BOUNDARY_RE.sub('BOUNDARY', _BATCH_ID_RE.sub('BATCH_ID', body))
+    body = re.sub(r'([?&][A-Za-z]+Date=)\d{4}-\d{2}-\d{2}', r'\1DATE', body)
+    return f"{method} {parts.netloc}{parts.path}?{urlencode(params)} {hashlib.sha256(body.encode('utf-8')).hexdigest()}"
+
+
+def _batch_id(body):
+    match = _BATCH_ID_RE.search(body.decode('utf-8', errors='replace') if isinstance(body, bytes) else (body or ''))
+    return match.group(0) if match else None
+
+
+class CassetteHttp:
+    """
+    httplib2.Http stand-in for googleapiclient services. In record mode every
+    request goes to the network (through a per-thread authorized client) and is
+    written to the cassette; in replay mode responses come from the cassette.
+    """
+
+    def __init__(self, credentials=None, mode=None):
+        self.mode = mode or cassette_mode()
+        self._credentials = credentials
+        self._thread_state = threading.local()
+
+    def _real_http(self):
+        if not hasattr(self._thread_state, 'http'):
+            import google_auth_httplib2
+            import httplib2
+            self._thread_state.http = google_auth_httplib2.AuthorizedHttp(self._credentials, http=httplib2.Http())
+        return self._thread_state.http
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        import httplib2
+
+        key = _http_match_key(method, uri, body)
+
+        if self.mode == 'replay':
+            relative_uri = _relative_dates(uri)
+            entry = _find_entry('http', key, score=lambda entry: (entry['uri'] == uri) * 2 + (entry['relative_uri'] == relative_uri))
+            _replay_delay(entry['latency_ms'])
+
+            content = _decode_content(entry['content'])
+            recorded_batch_id, current_batch_id = entry.get('batch_id'), _batch_id(body)
+            if recorded_batch_id and current_batch_id:
+                # Route batch parts back to this run's Content-IDs
+                content = content.replace(recorded_batch_id.encode('ascii'), current_batch_id.encode('ascii'))
+            return httplib2.Response(entry['response']), content
+
+        started_at = time.monotonic()
+        response, content = self._real_http().request(uri, method=method, body=body, headers=headers, **kwargs)
+        _append_entry('http', key, {
+            'method': method,
+            'uri': uri,
+            'relative_uri': _relative_dates(uri),
+            'batch_id': _batch_id(body),
+            'response': dict(response),
+            'content': _encode_content(content),
+            'latency_ms': round((time.monotonic() - started_at) * 1000, 1),
+            'recorded_at': datetime.now().isoformat()
+        })
+        return response, content
+
+
+def build_service(service_name, version, credentials=None):
+    """
+    Builds a googleapiclient service that records to or replays from cassettes
+    when YT_CASSETTE_MODE is set, and a normal service otherwise.
+
+    Args:
+        service_name: API name (e.g. 'youtube' or 'youtubeAnalytics')
+        version: API version (e.g. 'v3')
+        credentials: OAuth 2.0 credentials (not needed when replaying)
+    """
+    from googleapiclient.discovery import build
+
+    mode = cassette_mode()
+    if mode == 'off':
+        return build(service_name, version, credentials=credentials)
+    # The bundled discovery documents keep service construction offline
+    return build(service_name, version, http=CassetteHttp(credentials, mode), static_discovery=True)
+
+
+# --- Plain HTTP downloads (thumbnails) ---
+
+# Revalidation headers are left out of download keys, so a recording made
+# without a local copy still replays when the caller sends them
+_CONDITIONAL_HEADERS = ('if-none-match', 'if-modified-since')
+
+
+def get_url(url, session=None, **kwargs):
+    """
+    requests.get() that records to or replays from cassettes. The returned
+    object has the status_code, headers and content attributes callers use.
+
+    Args:
+        url: URL to download
+        session: Optional requests.Session to send the request with
+        **kwargs: Passed on to get() (headers, timeout, ...)
+    """
+    import requests
+
+    client = session or requests
+    mode = cassette_mode()
+    if mode == 'off':
+        return client.get(url, **kwargs)
+
+    headers = {name: value for name, value in (kwargs.get('headers') or {}).items() if name.lower() not in _CONDITIONAL_HEADERS}
+    key = f"GET {url} {json.dumps(headers, sort_keys=True)}"
+    if mode == 'replay':
+        entry = _find_entry('downloads', key)
+        _replay_delay(entry['latency_ms'])
+        return SimpleNamespace(status_code=entry['status_code'], headers=entry['headers'], content=_decode_content(entry['content']), url=url)
+
+    # Record full responses rather than 304s so every recording is replayable
+    kwargs['headers'] = headers
+    started_at = time.monotonic()
+    response = client.get(url, **kwargs)
+    _append_entry('downloads', key, {
+        'url': url,
+        'status_code': response.status_code,
+        'headers': dict(response.headers),
+        'content': _encode_content(response.content),
+        'latency_ms': round((time.monotonic() - started_at) * 1000, 1),
+        'recorded_at': datetime.now().isoformat()
+    })
+    return response
+
+
+# --- Gemini ---
+
+def _fingerprint(value):
+    """
+    Converts prompt contents (text, image dicts, PIL images, config objects)
+    into a stable JSON-serializable form for matching.
+    """
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return {'sha256': hashlib.sha256(value).hexdigest()}
+    if isinstance(value, dict):
+        return {str(name): _fingerprint(item) for name, item in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_fingerprint(item) for item in value]
+    if hasattr(value, 'tobytes') and hasattr(value, 'size'):
+        # PIL image
+        return {'image': list(value.size), 'sha256': hashlib.sha256(value.tobytes()).hexdigest()}
+    return repr(value)
+
+
+def _usage_namespace(usage):
+    return SimpleNamespace(**usage) if usage else None
+
+
+def _usage_dict(response):
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return None
+    return {
+        'prompt_token_count': getattr(usage, 'prompt_token_count', 0),
+        'candidates_token_count': getattr(usage, 'candidates_token_count', 0),
+        'total_token_count': getattr(usage, 'total_token_count', 0)
+    }
+
+
+def _response_text(response):
+    try:
+        return response.text
+    except Exception:
+        # Blocked or empty responses raise on .text
+        return ''
+
+
+class ReplayResponse:
+    """
+    Minimal stand-in for a GenerateContentResponse served from a cassette.
+    Streamed responses iterate over their recorded chunks.
+    """
+
+    def __init__(self, text, usage_metadata=None, chunks=None):
+        self.text = text
+        self.usage_metadata = _usage_namespace(usage_metadata)
+        self._chunks = chunks
+
+    def __iter__(self):
+        for chunk in self._chunks if self._chunks is not None else [self.text]:
+            yield ReplayResponse(chunk)
+
+    def resolve(self):
+        pass
+
+
+class CassetteModel:
+    """
+    Wraps a genai.GenerativeModel so generate_content calls are recorded to or
+    replayed from cassettes. Every other attribute is passed through.
+    """
+
+    def __init__(self, model, mode=None):
+        self._model = model
+        self.mode = mode or cassette_mode()
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+    def generate_content(self, contents, **kwargs):
+        model_name = getattr(self._model, 'model_name', 'unknown')
+        key = json.dumps([model_name, _fingerprint(contents), _fingerprint(kwargs)], sort_keys=True)
+
+        if self.mode == 'replay':
+            entry = _find_entry('gemini', key)
+            _replay_delay(entry['latency_ms'])
+            return ReplayResponse(entry['text'], entry.get('usage_metadata'), entry.get('chunks'))
+
+        started_at = time.monotonic()
+        response = self._model.generate_content(contents, **kwargs)
+
+        if kwargs.get('stream'):
+            return self._record_stream(key, model_name, response, started_at)
+
+        _append_entry('gemini', key, {
+            'model': model_name,
+            'text': _response_text(response),
+            'usage_metadata': _usage_dict(response),
+            'latency_ms': round((time.monotonic() - started_at) * 1000, 1),
+            'recorded_at': datetime.now().isoformat()
+        })
+        return response
+
+    def _record_stream(self, key, model_name, response, started_at):
+        """Passes streamed chunks through and records them once the stream ends."""
+        chunks = []
+        for chunk in response:
+            chunks.append(_response_text(chunk))
+            yield chunk
+
+        _append_entry('gemini', key, {
+            'model': model_name,
+            'text': ''.join(chunks),
+            'chunks': chunks,
+            'usage_metadata': _usage_dict(response),
+            'latency_ms': round((time.monotonic() - started_at) * 1000, 1),
+            'recorded_at': datetime.now().isoformat()
+        })
+
+
+def wrap_model(model):
+    """
+    Returns the model wrapped for recording/replay, or unchanged when
+    YT_CASSETTE_MODE is off.
+    """
+    return model if cassette_mode() == 'off' else CassetteModel(model)
@@ -1,11 +1,15 @@
 import json
-import os
-import hashlib
-import pandas as pd
-import google.generativeai as genai
 import argparse
 import time
-from sklearn.preprocessing import MinMaxScaler # For normalization
+
+from async_engine import apply_rate_limit_args, get_limiter
+from cassette import wrap_model
+from json_stream import JSONArrayStream
+from llm_cache import get_cache, input_hash, model_name
+from llm_metrics import generate_content, get_metrics, record_cache_hit, stream_content
+from output_sinks import is_dataset_path, load_video_dataset
+from topic_engine import TOPIC_METHODS, discover_topics, format_metrics, format_topics_for_prompt
+from video_scoring import DEFAULT_WEIGHTS, NORMALIZATION_METHODS, parse_weights, select_top
 
 # --- Configuration ---
 GEMINI_API_KEY = "YOUR_GEMINI_API_KEY_HERE"  # Replace with your actual key
@@ -30,13 +34,31 @@ The goal is not to appeal to everyone, but to create something that a specific g
 For YouTube, this means titles that are irresistible, thumbnails that demand clicks, and content that delivers on the promise in an unforgettable way.
 """
 
+# Video columns the planner reads from parquet/arrow datasets
+PLANNER_COLUMNS = ['video_id', 'title', 'description', 'tags', 'views', 'engagement_rate', 'retention_rate', 'shares']
+
+# Where the planner's topics come from: 'local' (topic_engine.py) or 'gemini' (one call per top video)
+TOPIC_SOURCES = ('local', 'gemini')
+
+# Number of best-performing local topics described to Gemini and in the plan
+PLAN_TOPICS = 5
+
+# Version of the topic extraction prompt in the LLM cache keys; bump it when the prompt changes
+TOPIC_PROMPT_VERSION = 'topic-v1'
+
 # --- Function Definitions ---
 
-def load_video_data(json_path="youtube_video_data.json"):
-    """Loads the video data from the specified JSON file."""
+def load_video_data(json_path="youtube_video_data.json", channel_id=None, columns=None):
+    """
+    Loads the video data from the specified JSON file or parquet/arrow dataset.
+    For datasets, only the requested video columns are read.
+    """
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if is_dataset_path(json_path):
+            data = load_video_dataset(json_path, channel_id=channel_id, columns=columns)
+        else:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
         print(f"Video data loaded successfully from {json_path}")
         return data
     except FileNotFoundError:
@@ -49,72 +71,44 @@ def load_video_data(json_path="youtube_video_data.json"):
         print(f"An unexpected error occurred while loading data: {e}")
         return None
 
-def select_top_videos(video_data_list, num_videos=10):
+def select_top_videos(video_data_list, num_videos=10, weights=None, method='minmax'):
     """
-    Selects top videos based on a scoring mechanism (retention and shares).
+    Selects top videos based on a weighted score of normalized metrics
+    (by default 0.6 x retention rate + 0.4 x shares, see video_scoring.py).
     """
     if not video_data_list:
         print("No video data provided to select_top_videos.")
         return []
 
-    # Create a DataFrame for easier manipulation
-    df = pd.DataFrame(video_data_list)
+    weights = weights or DEFAULT_WEIGHTS
 
     # Ensure required columns exist
-    if 'retention_rate' not in df.columns or 'shares' not in df.columns:
-        print("Warning: 'retention_rate' or 'shares' column missing. Returning empty list.")
+    missing_metrics = [metric for metric in weights if not any(metric in video for video in video_data_list)]
+    if missing_metrics:
+        print(f"Warning: {', '.join(repr(metric) for metric in missing_metrics)} column missing. Returning empty list.")
         return []
 
-    # Handle None values by filling with 0 for scoring purposes
-    df['retention_rate'] = pd.to_numeric(df['retention_rate'], errors='coerce').fillna(0)
-    df['shares'] = pd.to_numeric(df['shares'], errors='coerce').fillna(0)
-
-    # Normalize 'retention_rate' and 'shares' (Min-Max Scaling)
-    scaler = MinMaxScaler()
-    # Avoid scaling if all values are the same (e.g., all zeros)
-    if len(df['retention_rate'].unique()) > 1:
-        df['normalized_retention'] = scaler.fit_transform(df[['retention_rate']])
-    else:
-        df['normalized_retention'] = 0.0 if len(df) > 0 else df['retention_rate']
-
-
-    if len(df['shares'].unique()) > 1:
-        df['normalized_shares'] = scaler.fit_transform(df[['shares']])
-    else:
-        df['normalized_shares'] = 0.0 if len(df) > 0 else df['shares']
-
-    # Calculate score
-    df['score'] = (0.6 * df['normalized_retention']) + (0.4 * df['normalized_shares'])
-
-    # Sort by score and select top N
-    top_videos_df = df.sort_values(by='score', ascending=False).head(num_videos)
-
-    print(f"Selected {len(top_videos_df)} top videos based on retention and shares.")
-    return top_videos_df.to_dict('records')
+    top_videos = [dict(video, score=score) for video, score in select_top(video_data_list, num_videos, weights, method)]
 
+    print(f"Selected {len(top_videos)} top videos based on {', '.join(f'{metric} ({weight:g})' for metric, weight in weights.items())}.")
+    return top_videos
 
 def extract_topics_themes_with_gemini(video_title, video_description, gemini_model):
     """
     Extracts topics and themes from video title and description using Gemini.
-    Includes basic file-based caching.
+    Results are cached in the shared LLM cache (see llm_cache.py).
     """
-    cache_dir = "topic_cache"
-    os.makedirs(cache_dir, exist_ok=True)
-
-    # Create a unique cache key (hash of title and description)
-    # Using description as well to make it more unique for videos with similar titles
-    cache_input = f"{video_title}_{video_description}"
-    cache_key = hashlib.md5(cache_input.encode('utf-8')).hexdigest()
-    cache_file = os.path.join(cache_dir, f"{cache_key}.json")
+    cache = get_cache()
+    model = model_name(gemini_model)
+    # Description is part of the key to keep videos with similar titles apart
+    cache_key = input_hash(video_title, video_description or '')
 
     # Check cache
-    if os.path.exists(cache_file):
-        try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                print(f"Loading cached topic analysis for: {video_title[:50]}...")
-                return json.load(f)
-        except Exception as e:
-            print(f"Cache read error for {video_title[:50]}: {e}. Re-fetching.")
+    cached_analysis = cache.get(model, TOPIC_PROMPT_VERSION, cache_key)
+    if cached_analysis is not None:
+        record_cache_hit('extract_topics_themes_with_gemini', gemini_model)
+        print(f"Loading cached topic analysis for: {video_title[:50]}...")
+        return cached_analysis
 
     prompt = f'''
 Analyze the following YouTube video title and description to identify its core content.
@@ -138,7 +132,8 @@ Return ONLY the JSON object. Ensure the JSON is valid.
 
     try:
         print(f"Extracting topics for: {video_title[:50]}... (using Gemini)")
-        response = gemini_model.generate_content(prompt)
+        get_limiter('gemini').acquire()
+        response = generate_content('extract_topics_themes_with_gemini', gemini_model, prompt)
 
         # Clean response: remove potential markdown backticks and leading/trailing whitespace
         cleaned_response_text = response.text.strip().replace("```json", "").replace("```", "").strip()
@@ -146,8 +141,7 @@ Return ONLY the JSON object. Ensure the JSON is valid.
         analysis = json.loads(cleaned_response_text)
 
         # Save to cache
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(analysis, f, indent=2)
+        cache.set(model, TOPIC_PROMPT_VERSION, cache_key, analysis)
 
         return analysis
     except json.JSONDecodeError as e:
@@ -158,14 +152,10 @@ Return ONLY the JSON object. Ensure the JSON is valid.
         print(f"Error extracting topics for '{video_title[:50]}' with Gemini: {e}")
         return default_error_response
 
-def generate_content_plan_with_gemini(top_video_analyses, purple_cow_context, gemini_model, num_ideas=5):
+def summarize_video_analyses(top_video_analyses):
     """
-    Generates a content plan with new video ideas using Gemini, based on top video analysis and Purple Cow strategy.
+    Describes the channel's successful content from per-video Gemini topic analyses.
     """
-    if not top_video_analyses:
-        print("No top video analyses provided to generate content plan.")
-        return []
-
     # Summarize the successful content
     primary_topics = [analysis.get('primary_topic', 'N/A') for analysis in top_video_analyses if analysis and isinstance(analysis, dict)]
     categories = [analysis.get('content_category', 'N/A') for analysis in top_video_analyses if analysis and isinstance(analysis, dict)]
@@ -180,11 +170,26 @@ def generate_content_plan_with_gemini(top_video_analyses, purple_cow_context, ge
         example_titles_summary = f" achieving high engagement with content like \"{'; '.join(example_titles[:2])}\"."
 
 
-    channel_success_summary = (
+    return (
         f"This channel has found success with videos primarily about [{successful_topics_summary if successful_topics_summary else 'various topics'}] "
         f"in the [{successful_categories_summary if successful_categories_summary else 'diverse'}] category{example_titles_summary}"
     )
 
+def summarize_topics(topics, limit=5):
+    """
+    Describes the channel's successful content from locally discovered topics
+    (see topic_engine.py), best-performing topics first.
+    """
+    return (
+        f"The channel's videos fall into {len(topics)} topics. These are its best-performing topics "
+        f"(key terms, number of videos and average performance):\n"
+        f"{format_topics_for_prompt(topics, limit)}"
+    )
+
+def build_content_plan_prompt(channel_success_summary, purple_cow_context, num_ideas=5):
+    """
+    Builds the content plan prompt, which asks for a JSON list of ideas.
+    """
     prompt = f"""
 You are an expert YouTube content strategist specializing in creating viral 'Purple Cow' content.
 Your task is to generate {num_ideas} new, unique, and remarkable video ideas for a YouTube channel.
@@ -210,10 +215,23 @@ Example format:
 Ensure the JSON is valid. Focus on novelty and the Purple Cow principles.
 The ideas should be distinct from one another and push creative boundaries while remaining relevant to potential audience interests hinted at by past successes.
 """
+    return prompt
+
+def generate_content_plan_with_gemini(channel_success_summary, purple_cow_context, gemini_model, num_ideas=5):
+    """
+    Generates a content plan with new video ideas using Gemini, based on a summary of the
+    channel's successful content (see summarize_topics and summarize_video_analyses) and Purple Cow strategy.
+    """
+    if not channel_success_summary:
+        print("No summary of successful content provided to generate content plan.")
+        return []
+
+    prompt = build_content_plan_prompt(channel_success_summary, purple_cow_context, num_ideas)
 
     try:
         print(f"Generating {num_ideas} Purple Cow content ideas with Gemini...")
-        response = gemini_model.generate_content(prompt)
+        get_limiter('gemini').acquire()
+        response = generate_content('generate_content_plan_with_gemini', gemini_model, prompt)
 
         # Clean response: remove potential markdown backticks and leading/trailing whitespace
         cleaned_response_text = response.text.strip().replace("```json", "").replace("```", "").strip()
@@ -229,32 +247,59 @@ The ideas should be distinct from one another and push creative boundaries while
         print(f"Error generating content plan with Gemini: {e}")
         return []
 
-def save_plan_to_markdown(content_plan, top_analyzed_videos_summary, channel_id, filepath_prefix="content_plan"):
+def plan_filepath(channel_id, filepath_prefix="content_plan", extension="md"):
+    """Returns the path of a channel's content plan file."""
+    return f"{filepath_prefix}_{channel_id}.{extension}"
+
+def write_plan_header(f, top_analyzed_videos_summary, topics=None):
+    """
+    Writes the plan title, the inspiration section and the ideas heading.
+    The inspiration section lists the locally discovered topics when given,
+    otherwise the per-video Gemini analyses.
+    """
+    f.write("# YouTube Content Strategy: The Purple Cow Plan\n\n")
+
+    f.write("## Analysis of Top Performing Content (Inspiration)\n\n")
+    if topics:
+        for topic in topics[:PLAN_TOPICS]:
+            f.write(f"### Topic: {topic['label']}\n")
+            f.write(f"- **Key Terms:** {', '.join(topic['terms'])}\n")
+            f.write(f"- **Videos:** {topic['video_count']}\n")
+            metrics = format_metrics(topic['metrics'])
+            if metrics:
+                f.write(f"- **Performance:** {metrics}\n")
+            if topic['example_titles']:
+                f.write(f"- **Top Videos:** {'; '.join(topic['example_titles'])}\n")
+            f.write("\n")
+    elif top_analyzed_videos_summary:
+        for i, analysis in enumerate(top_analyzed_videos_summary):
+            original_title = analysis.get('original_title', 'Unknown Title')
+            primary_topic = analysis.get('primary_topic', 'N/A')
+            theme = analysis.get('overall_theme', 'N/A')
+            category = analysis.get('content_category', 'N/A')
+            f.write(f"### Top Video: \"{original_title}\"\n")
+            f.write(f"- **Primary Topic:** {primary_topic}\n")
+            f.write(f"- **Overall Theme:** {theme}\n")
+            f.write(f"- **Content Category:** {category}\n\n")
+    else:
+        f.write("No top video analyses were available to summarize.\n\n")
+
+    f.write("## Generated 'Purple Cow' Video Ideas\n\n")
+
+def write_plan_idea(f, number, idea):
+    """Writes one idea of the plan."""
+    f.write(f"### Idea {number}: {idea.get('title', 'No Title Provided')}\n")
+    f.write(f"{idea.get('description', 'No description provided.')}\n\n")
+
+def save_plan_to_markdown(content_plan, top_analyzed_videos_summary, channel_id, filepath_prefix="content_plan", topics=None):
     """Saves the generated content plan to a Markdown file, named with channel_id."""
-    filepath = f"{filepath_prefix}_{channel_id}.md"
+    filepath = plan_filepath(channel_id, filepath_prefix)
     try:
         with open(filepath, 'w', encoding='utf-8') as f:
-            f.write("# YouTube Content Strategy: The Purple Cow Plan\n\n")
-
-            f.write("## Analysis of Top Performing Content (Inspiration)\n\n")
-            if top_analyzed_videos_summary:
-                for i, analysis in enumerate(top_analyzed_videos_summary):
-                    original_title = analysis.get('original_title', 'Unknown Title')
-                    primary_topic = analysis.get('primary_topic', 'N/A')
-                    theme = analysis.get('overall_theme', 'N/A')
-                    category = analysis.get('content_category', 'N/A')
-                    f.write(f"### Top Video: \"{original_title}\"\n")
-                    f.write(f"- **Primary Topic:** {primary_topic}\n")
-                    f.write(f"- **Overall Theme:** {theme}\n")
-                    f.write(f"- **Content Category:** {category}\n\n")
-            else:
-                f.write("No top video analyses were available to summarize.\n\n")
-
-            f.write("## Generated 'Purple Cow' Video Ideas\n\n")
+            write_plan_header(f, top_analyzed_videos_summary, topics)
             if content_plan:
                 for i, idea in enumerate(content_plan):
-                    f.write(f"### Idea {i+1}: {idea.get('title', 'No Title Provided')}\n")
-                    f.write(f"{idea.get('description', 'No description provided.')}\n\n")
+                    write_plan_idea(f, i + 1, idea)
             else:
                 f.write("No content ideas were generated.\n")
 
@@ -262,71 +307,153 @@ def save_plan_to_markdown(content_plan, top_analyzed_videos_summary, channel_id,
     except Exception as e:
         print(f"Error saving content plan to Markdown: {e}")
 
+def stream_content_plan_with_gemini(channel_success_summary, purple_cow_context, gemini_model, top_analyzed_videos_summary,
+                                    channel_id, num_ideas=5, topics=None, filepath_prefix="content_plan"):
+    """
+    Generates the content plan with a streamed Gemini response and saves each idea as soon as
+    its JSON object is complete: to the Markdown plan and, one JSON object per line, to a
+    .jsonl sidecar. Ideas received before a truncated or malformed end of the response are kept.
+
+    Returns:
+        List of the ideas received
+    """
+    if not channel_success_summary:
+        print("No summary of successful content provided to generate content plan.")
+        return []
+
+    prompt = build_content_plan_prompt(channel_success_summary, purple_cow_context, num_ideas)
+    filepath = plan_filepath(channel_id, filepath_prefix)
+    sidecar_path = plan_filepath(channel_id, filepath_prefix, 'jsonl')
+    stream = JSONArrayStream()
+    content_ideas = []
+    try:
+        with open(filepath, 'w', encoding='utf-8') as f, open(sidecar_path, 'w', encoding='utf-8') as sidecar:
+            write_plan_header(f, top_analyzed_videos_summary, topics)
+            f.flush()
+
+            print(f"Streaming {num_ideas} Purple Cow content ideas from Gemini...")
+            get_limiter('gemini').acquire()
+            started_at = time.monotonic()
+            try:
+                for text in stream_content('generate_content_plan_with_gemini', gemini_model, prompt):
+                    for idea in stream.feed(text):
+                        if not isinstance(idea, dict):
+                            continue
+                        content_ideas.append(idea)
+                        write_plan_idea(f, len(content_ideas), idea)
+                        sidecar.write(json.dumps(idea, ensure_ascii=False) + "\n")
+                        f.flush()
+                        sidecar.flush()
+                        print(f"Idea {len(content_ideas)} received after {time.monotonic() - started_at:.1f}s: {idea.get('title', 'No Title Provided')}")
+            except Exception as e:
+                print(f"Error while streaming content plan from Gemini: {e}")
+
+            if stream.pending or not stream.done or stream.skipped:
+                print(f"Warning: The content plan response was incomplete or malformed; kept the {len(content_ideas)} complete ideas received.")
+            if not content_ideas:
+                f.write("No content ideas were generated.\n")
+
+        print(f"Content plan saved to {filepath} and {sidecar_path} ({len(content_ideas)} ideas)")
+    except Exception as e:
+        print(f"Error saving streamed content plan: {e}")
+    return content_ideas
+
 # --- Main Execution ---
 def main():
     """Main function to orchestrate the content planning process."""
     parser = argparse.ArgumentParser(description="Generate a YouTube content plan using AI and top video analysis.")
-    parser.add_argument("--data_file", type=str, required=True, help="Path to the input JSON data file (e.g., youtube_video_data_CHANNELID.json).")
+    parser.add_argument("--data_file", type=str, required=True, help="Path to the input JSON data file (e.g., youtube_video_data_CHANNELID.json) or parquet/arrow dataset directory (e.g., youtube_video_dataset).")
     parser.add_argument("--channel_id", type=str, required=True, help="Channel ID, used for naming the output plan file.")
+    parser.add_argument("--weights", type=str, default=None, help="Metric weights for selecting the top videos, e.g. 'retention_rate=0.6,shares=0.4' (the default). Any numeric video field can be used.")
+    parser.add_argument("--scoring", choices=NORMALIZATION_METHODS, default='minmax', help="How metrics are normalized before weighting: 'minmax' (default) or 'rank' (robust to outliers).")
+    parser.add_argument("--topics", choices=TOPIC_SOURCES, default='local', help="Where the channel's topics come from: 'local' (default) clusters all videos by title, tags and description with TF-IDF; 'gemini' asks Gemini for the topic of each top video.")
+    parser.add_argument("--num_topics", type=int, default=None, help="Number of local topics (default: about one per 20 videos).")
+    parser.add_argument("--topic_method", choices=TOPIC_METHODS, default='kmeans', help="Local topic clustering: 'kmeans' (default) or 'nmf'.")
+    parser.add_argument("--stream", action="store_true", help="Stream the plan from Gemini and save each idea to the Markdown plan and a .jsonl sidecar as soon as it arrives.")
+    parser.add_argument("--rate_limit", action="append", metavar="API=RPS", help="Override the token-bucket rate for Gemini requests, e.g. --rate_limit gemini=0.5.")
     args = parser.parse_args()
+    apply_rate_limit_args(args.rate_limit)
+    try:
+        weights = parse_weights(args.weights) if args.weights else DEFAULT_WEIGHTS
+    except ValueError as e:
+        print(f"Error: Invalid --weights: {e}")
+        return
 
     print(f"Starting content planner script for channel {args.channel_id} with data file: {args.data_file}")
 
     # Configure Gemini
     try:
+        import google.generativeai as genai
         genai.configure(api_key=GEMINI_API_KEY)
-        gemini_model = genai.GenerativeModel('gemini-pro')
+        gemini_model = wrap_model(genai.GenerativeModel('gemini-pro'))
         print("Gemini API configured successfully.")
     except Exception as e:
         print(f"Error configuring Gemini API: {e}. Please ensure GEMINI_API_KEY is set correctly.")
         return
 
     # 1. Load video data
-    video_data_container = load_video_data(json_path=args.data_file)
+    video_data_container = load_video_data(json_path=args.data_file, channel_id=args.channel_id, columns=list(dict.fromkeys(PLANNER_COLUMNS + list(weights))))
     if not video_data_container or 'videos' not in video_data_container:
         print(f"Failed to load video data from {args.data_file} or data is not in expected format. Exiting.")
         return
 
     all_videos = video_data_container['videos']
 
-    # 2. Select top videos
     # Ensure 'description' is carried over or default to empty string if not present
     for video in all_videos:
         if 'description' not in video: # Assuming description might be missing from raw data
             video['description'] = ""
-    top_videos = select_top_videos(all_videos, num_videos=5) # Analyze top 5 for now
 
-    if not top_videos:
-        print("No top videos selected. Cannot proceed with analysis. Exiting.")
-        return
-
-    # 3. Extract topics and themes from top videos
     top_video_analyses = []
-    print("\n--- Extracting Topics from Top Videos ---")
-    for i, video in enumerate(top_videos):
-        # Make sure description exists, default to empty if not
-        description = video.get('description', '')
-        analysis = extract_topics_themes_with_gemini(video['title'], description, gemini_model)
-        if isinstance(analysis, dict): # Ensure analysis is a dict before adding more keys
-            analysis['original_title'] = video['title'] # Keep original title for summary
-        top_video_analyses.append(analysis)
-
-        # Add delay only if it's not the last video, to avoid unnecessary wait at the end
-        if i < len(top_videos) - 1:
-            print(f"Processed video {i+1}/{len(top_videos)}. Adding 2 second delay before next API call...")
-            time.sleep(2)
-
+    topics = None
+    if args.topics == 'local':
+        # 2. Discover topics across all videos and rank them by performance
+        print("\n--- Discovering Topics ---")
+        topics = discover_topics(all_videos, n_topics=args.num_topics, method=args.topic_method, weights=weights, scoring=args.scoring)
+        if not topics:
+            print("No topics discovered. Cannot proceed with planning. Exiting.")
+            return
+        print(f"Discovered {len(topics)} topics in {len(all_videos)} videos. Best-performing topics:")
+        for topic in topics[:PLAN_TOPICS]:
+            print(f"- {topic['label']} ({topic['video_count']} videos, score {topic['mean_score']:.3f})")
+        channel_success_summary = summarize_topics(topics, PLAN_TOPICS)
+    else:
+        # 2. Select top videos
+        top_videos = select_top_videos(all_videos, num_videos=5, weights=weights, method=args.scoring) # Analyze top 5 for now
+
+        if not top_videos:
+            print("No top videos selected. Cannot proceed with analysis. Exiting.")
+            return
+
+        # 3. Extract topics and themes from top videos
+        print("\n--- Extracting Topics from Top Videos ---")
+        for i, video in enumerate(top_videos):
+            # Make sure description exists, default to empty if not
+            description = video.get('description', '')
+            analysis = extract_topics_themes_with_gemini(video['title'], description, gemini_model)
+            if isinstance(analysis, dict): # Ensure analysis is a dict before adding more keys
+                analysis['original_title'] = video['title'] # Keep original title for summary
+            top_video_analyses.append(analysis)
+            print(f"Processed video {i+1}/{len(top_videos)}.")
+        channel_success_summary = summarize_video_analyses(top_video_analyses)
 
     # 4. Generate content plan
     print("\n--- Generating Content Plan ---")
-    content_ideas = generate_content_plan_with_gemini(top_video_analyses, PURPLE_COW_CONTEXT, gemini_model, num_ideas=7)
-
-    # 5. Save plan to Markdown
-    if content_ideas:
-        save_plan_to_markdown(content_ideas, top_video_analyses, args.channel_id)
+    if args.stream:
+        # 5. Ideas are saved to Markdown (and JSONL) while they stream in
+        stream_content_plan_with_gemini(channel_success_summary, PURPLE_COW_CONTEXT, gemini_model, top_video_analyses,
+                                        args.channel_id, num_ideas=7, topics=topics)
     else:
-        print("No content ideas were generated, so no plan will be saved.")
+        content_ideas = generate_content_plan_with_gemini(channel_success_summary, PURPLE_COW_CONTEXT, gemini_model, num_ideas=7)
+
+        # 5. Save plan to Markdown
+        if content_ideas:
+            save_plan_to_markdown(content_ideas, top_video_analyses, args.channel_id, topics=topics)
+        else:
+            print("No content ideas were generated, so no plan will be saved.")
 
+    get_cache().print_stats()
+    get_metrics().finish()
     print("\nContent planner script finished.")
 
 if __name__ == "__main__":
@@ -2,23 +2,31 @@
 """
 YouTube Channel Analytics Extractor for LLM Analysis
 
-This script extracts comprehensive data from your latest 50 YouTube videos
-to help analyze patterns in topics, titles, thumbnails, and performance metrics.
+This script extracts comprehensive data from your latest YouTube videos
+(50 by default, or the full back catalog) to help analyze patterns in topics,
+titles, thumbnails, and performance metrics.
 The output is formatted for easy analysis with Large Language Models (LLMs).
 """
 
 import os
+import sys
+import threading
+import time
 import pandas as pd
 import json
 import re
 import argparse
-import time
-from datetime import datetime, timedelta
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from fastapi import HTTPException
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from datetime import datetime, timedelta, timezone
+
+from async_engine import FetchEngine, DEFAULT_MAX_CONCURRENCY, apply_rate_limit_args, execute_request
+from cassette import build_service, replaying
+from iso_duration import format_seconds, iso_duration_to_seconds, iso_durations_to_seconds
+from output_sinks import DEFAULT_OUTPUT_FORMAT, OUTPUT_FORMATS, load_previous_videos, write_video_data
+from quota_ledger import DEFAULT_DAILY_QUOTA, estimate_channel_cost, plan_channel_runs, print_quota_summary, units_used
+from title_features import format_title_feature_report
 
 # Authentication scopes needed for YouTube API access
 SCOPES = [
@@ -28,6 +36,13 @@ SCOPES = [
 CREDENTIALS_FILE = os.path.join(os.path.dirname(__file__), "credentials.json")
 TOKEN_FILE = os.path.join(os.path.dirname(__file__), "token.json")
 
+# Maximum number of video IDs packed into one Analytics `video==id1,id2,...` filter.
+# Reports broken down by video return at most 200 rows per query.
+ANALYTICS_VIDEO_BATCH_SIZE = 200
+
+# playlistItems().list and videos().list both return at most 50 items per call
+PLAYLIST_PAGE_SIZE = 50
+
 
 def analyze_video_performance(video_data):
     """
@@ -81,14 +96,8 @@ def analyze_video_performance(video_data):
     if videos_with_retention:
         report += f"Average retention rate: {avg_retention:.2f}%\n"
     
-    # Title length analysis
-    title_lengths = [len(video['title']) for video in video_data]
-    avg_title_length = sum(title_lengths) / len(title_lengths) if title_lengths else 0
-    
-    title_word_counts = [len(video['title'].split()) for video in video_data]
-    avg_title_words = sum(title_word_counts) / len(title_word_counts) if title_word_counts else 0
-    
-    report += f"\nAverage title length: {avg_title_length:.1f} characters, {avg_title_words:.1f} words\n"
+    # Title features (length, numerals, emotive words, listicles, ...) joined to performance
+    report += format_title_feature_report(video_data)
     
     # Duration analysis
     report += "\nNOTE: This is a basic analysis. For deeper insights, provide this data to an LLM along with specific questions about content strategy."
@@ -118,33 +127,56 @@ def format_duration_for_humans(seconds):
         return f"{minutes}:{seconds:02d}"
 
 
+def get_credentials():
+    """
+    Loads (and refreshes or creates, if needed) the OAuth 2.0 credentials used for
+    both the YouTube Data API and the YouTube Analytics API.
+    Returns None when replaying API calls from cassettes (see cassette.py).
+    """
+    if replaying():
+        return None
+    
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    
+    creds = None
+    if os.path.exists(TOKEN_FILE):
+        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+    
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
+            # Use a fixed port (8080) instead of dynamic port (0)
+            creds = flow.run_local_server(port=8080)
+        
+        with open(TOKEN_FILE, 'w') as token:
+            token.write(creds.to_json())
+    
+    return creds
+
+
+def build_services(creds):
+    """
+    Builds YouTube Data API and YouTube Analytics API service objects for the given credentials.
+    """
+    youtube = build_service('youtube', 'v3', creds)
+    youtube_analytics = build_service('youtubeAnalytics', 'v2', creds)
+    return youtube, youtube_analytics
+
+
 def get_authenticated_service():
     """
     Authenticates with YouTube API using OAuth 2.0 credentials.
     Returns authenticated YouTube API service object and YouTube Analytics API service object.
     """
     try:
-        creds = None
-        if os.path.exists(TOKEN_FILE):
-            creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-        
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
-                # Use a fixed port (8080) instead of dynamic port (0)
-                creds = flow.run_local_server(port=8080)
-            
-            with open(TOKEN_FILE, 'w') as token:
-                token.write(creds.to_json())
-        
         # Build both YouTube Data API and YouTube Analytics API service objects
-        youtube = build('youtube', 'v3', credentials=creds)
-        youtube_analytics = build('youtubeAnalytics', 'v2', credentials=creds)
-        
-        return youtube, youtube_analytics
+        return build_services(get_credentials())
     except Exception as e:
+        from fastapi import HTTPException
         raise HTTPException(
             status_code=500,
             detail=f"YouTube authentication failed: {str(e)}"
@@ -156,10 +188,10 @@ def get_channel_details(youtube, channel_id_to_fetch):
     Retrieves details (ID, snippet, statistics) for the specified channel ID.
     """
     request = youtube.channels().list(
-        part="id,snippet,statistics", # Ensure all necessary parts are fetched
+        part="id,snippet,statistics,contentDetails", # Ensure all necessary parts are fetched
         id=channel_id_to_fetch
     )
-    response = request.execute()
+    response = execute_request(request, api='data')
     
     if 'items' in response and len(response['items']) > 0:
         return response['items'][0] # Return the full channel item
@@ -167,6 +199,103 @@ def get_channel_details(youtube, channel_id_to_fetch):
         raise Exception(f"Could not retrieve details for channel ID: {channel_id_to_fetch}")
 
 
+def _hydrate_videos(youtube, video_ids, api=None):
+    """
+    Fetches detailed information for up to 50 videos with one videos().list call.
+    Returns the video items in the same order as video_ids.
+    """
+    # Get detailed video information - request more parts for detailed data
+    videos_request = youtube.videos().list(
+        part="snippet,statistics,contentDetails,status",
+        id=','.join(video_ids)
+    )
+    videos_response = execute_request(videos_request, api=api)
+    
+    # videos().list does not guarantee order, so restore the playlist order
+    videos_by_id = {video['id']: video for video in videos_response.get('items', [])}
+    return [videos_by_id[video_id] for video_id in video_ids if video_id in videos_by_id]
+
+
+def iter_channel_videos(youtube, channel_id, max_videos=None, since=None, uploads_playlist_id=None, engine=None):
+    """
+    Walks the channel's uploads playlist page by page and yields detailed video
+    items as each page is hydrated. Costs 2 quota units per 50 videos instead of
+    the 100 units of a single search().list call.
+    
+    Args:
+        youtube: Authenticated YouTube API service object
+        channel_id: YouTube channel ID
+        max_videos: Maximum number of videos to yield (default: None, the full catalog)
+        since: Only yield videos published on or after this date ('YYYY-MM-DD')
+        uploads_playlist_id: Uploads playlist ID, looked up from the channel if not given
+        engine: Optional FetchEngine; when given, pages are hydrated concurrently
+            while the playlist walk continues
+        
+    Yields:
+        Video items with detailed information, newest first
+    """
+    if uploads_playlist_id is None:
+        channel_request = youtube.channels().list(
+            part="contentDetails",
+            id=channel_id
+        )
+        channel_response = execute_request(channel_request, api='data')
+        if not channel_response.get('items'):
+            raise Exception(f"Could not retrieve uploads playlist for channel ID: {channel_id}")
+        uploads_playlist_id = channel_response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+    
+    requested = 0
+    next_page_token = None
+    pending_pages = deque()
+    
+    while True:
+        page_size = PLAYLIST_PAGE_SIZE
+        if max_videos:
+            page_size = min(page_size, max_videos - requested)
+        
+        playlist_request = youtube.playlistItems().list(
+            part="contentDetails",
+            playlistId=uploads_playlist_id,
+            maxResults=page_size,
+            pageToken=next_page_token
+        )
+        playlist_response = execute_request(playlist_request, api='data')
+        
+        # The uploads playlist is ordered newest first, so once a page reaches
+        # videos older than the cut-off there is nothing newer left to find
+        reached_cutoff = False
+        video_ids = []
+        for item in playlist_response.get('items', []):
+            published_at = item['contentDetails'].get('videoPublishedAt')
+            if since:
+                # Private, deleted and scheduled uploads have no publish date; they say
+                # nothing about where the cut-off is, so skip them without stopping
+                if not published_at:
+                    continue
+                if published_at[:10] < since:
+                    reached_cutoff = True
+                    continue
+            video_ids.append(item['contentDetails']['videoId'])
+        requested += len(video_ids)
+        
+        if video_ids:
+            if engine is None:
+                yield from _hydrate_videos(youtube, video_ids, api='data')
+            else:
+                pending_pages.append(engine.submit('data', _hydrate_videos, youtube, video_ids))
+        
+        # Yield hydrated pages in playlist order while keeping the engine busy
+        while pending_pages and (pending_pages[0].done() or len(pending_pages) >= engine.max_concurrency):
+            yield from pending_pages.popleft().result()
+        
+        next_page_token = playlist_response.get('nextPageToken')
+        if not next_page_token or reached_cutoff or (max_videos and requested >= max_videos):
+            break
+    
+    while pending_pages:
+        yield from pending_pages.popleft().result()
+
+
 def get_latest_videos(youtube, channel_id, max_results=50):
     """
     Retrieves the latest videos from the specified channel with detailed information.
@@ -179,28 +308,91 @@ def get_latest_videos(youtube, channel_id, max_results=50):
     Returns:
         List of video items with detailed information
     """
-    # First get the list of video IDs
-    request = youtube.search().list(
-        part="id",
-        channelId=channel_id,
-        maxResults=max_results,
-        order="date",
-        type="video"
-    )
-    response = request.execute()
+    return list(iter_channel_videos(youtube, channel_id, max_videos=max_results))
+
+
+def _batched(iterable, batch_size):
+    """
+    Groups items from an iterable into lists of at most batch_size items.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _empty_video_analytics():
+    """
+    Returns the analytics dictionary used when no data is available for a video.
+    """
+    return {
+        'avg_view_duration': None,
+        'shares': None,
+        'subscribers_gained': None,
+        'subscribers_lost': None
+    }
+
+
+def get_videos_analytics(youtube_analytics, published_at_by_id, target_channel_id):
+    """
+    Retrieves analytics data for many videos with one report query per batch.
+    Metrics: averageViewDuration, shares, subscribersGained, subscribersLost
+    Date range: From the earliest publish date in each batch to current date.
     
-    # Extract video IDs
-    video_ids = [item['id']['videoId'] for item in response.get('items', [])]
+    Args:
+        youtube_analytics: Authenticated YouTube Analytics API service object
+        published_at_by_id: Dictionary mapping video ID to its ISO 8601 publish date
+        target_channel_id: YouTube channel ID that owns the videos
+        
+    Returns:
+        Dictionary mapping video ID to its analytics dictionary
+    """
+    analytics_by_id = {video_id: _empty_video_analytics() for video_id in published_at_by_id}
+    video_ids = list(published_at_by_id)
+    end_date = datetime.now().strftime('%Y-%m-%d')
     
-    # Get detailed video information - request more parts for detailed data
-    if video_ids:
-        videos_request = youtube.videos().list(
-            part="snippet,statistics,contentDetails,status",
-            id=','.join(video_ids)
-        )
-        return videos_request.execute()['items']
+    for batch_start in range(0, len(video_ids), ANALYTICS_VIDEO_BATCH_SIZE):
+        batch_ids = video_ids[batch_start:batch_start + ANALYTICS_VIDEO_BATCH_SIZE]
+        try:
+            # Days before a video was published contribute nothing to its totals,
+            # so starting at the oldest publish date gives every video its full history
+            start_date = min(
+                datetime.fromisoformat(published_at_by_id[video_id].replace('Z', '+00:00')).strftime('%Y-%m-%d')
+                for video_id in batch_ids
+            )
+            
+            # Ensure start_date is not after end_date (can happen for very new videos or clock sync issues)
+            if start_date > end_date:
+                start_date = end_date
+            
+            report_request = youtube_analytics.reports().query(
+                ids=f"channel=={target_channel_id}",
+                startDate=start_date,
+                endDate=end_date,
+                metrics="averageViewDuration,shares,subscribersGained,subscribersLost",
+                dimensions="video",
+                filters=f"video=={','.join(batch_ids)}",
+                maxResults=len(batch_ids),
+                sort="-averageViewDuration"
+            )
+            response = execute_request(report_request)
+            
+            # Order of metrics in each row matches the query: video_id, avgViewDuration, shares, subsGained, subsLost
+            for row in response.get('rows', []):
+                if row[0] not in analytics_by_id:
+                    continue
+                analytics_by_id[row[0]] = {
+                    'avg_view_duration': row[1] if len(row) > 1 else None,
+                    'shares': row[2] if len(row) > 2 else None,
+                    'subscribers_gained': row[3] if len(row) > 3 else None,
+                    'subscribers_lost': row[4] if len(row) > 4 else None
+                }
+        except Exception as e:
+            print(f"Could not retrieve extended analytics for videos {batch_start+1}-{batch_start+len(batch_ids)}: {str(e)}")
     
-    return []
+    return analytics_by_id
 
 
 def get_video_analytics(youtube_analytics, video_id, published_at_str, target_channel_id):
@@ -209,55 +401,7 @@ def get_video_analytics(youtube_analytics, video_id, published_at_str, target_ch
     Metrics: averageViewDuration, shares, subscribersGained, subscribersLost
     Date range: From video publish date to current date.
     """
-    try:
-        # Parse published_at_str (ISO 8601 format, e.g., '2023-10-26T14:00:00Z')
-        # Convert to 'YYYY-MM-DD' format
-        start_date_dt = datetime.fromisoformat(published_at_str.replace('Z', '+00:00'))
-        start_date = start_date_dt.strftime('%Y-%m-%d')
-        end_date = datetime.now().strftime('%Y-%m-%d')
-
-        # Ensure start_date is not after end_date (can happen for very new videos or clock sync issues)
-        if start_date > end_date:
-            start_date = end_date
-
-        report_request = youtube_analytics.reports().query(
-            ids=f"channel=={target_channel_id}",
-            startDate=start_date,
-            endDate=end_date,
-            metrics="averageViewDuration,shares,subscribersGained,subscribersLost",
-            dimensions="video",
-            filters=f"video=={video_id}"
-        )
-        response = report_request.execute()
-        
-        avg_duration = None
-        shares = None
-        subscribers_gained = None
-        subscribers_lost = None
-        
-        if 'rows' in response and response['rows']:
-            row = response['rows'][0]
-            # Order of metrics in response matches the query: video_id, avgViewDuration, shares, subsGained, subsLost
-            # row[0] is video_id (dimension)
-            avg_duration = row[1] if len(row) > 1 else None
-            shares = row[2] if len(row) > 2 else None
-            subscribers_gained = row[3] if len(row) > 3 else None
-            subscribers_lost = row[4] if len(row) > 4 else None
-
-        return {
-            'avg_view_duration': avg_duration,
-            'shares': shares,
-            'subscribers_gained': subscribers_gained,
-            'subscribers_lost': subscribers_lost
-        }
-    except Exception as e:
-        print(f"Could not retrieve extended analytics for video {video_id}: {str(e)}")
-        return {
-            'avg_view_duration': None,
-            'shares': None,
-            'subscribers_gained': None,
-            'subscribers_lost': None
-        }
+    return get_videos_analytics(youtube_analytics, {video_id: published_at_str}, target_channel_id)[video_id]
 
 
 def parse_duration(duration_str):
@@ -265,32 +409,155 @@ def parse_duration(duration_str):
     Parse ISO 8601 duration string into human-readable format.
     Example: PT1H30M15S -> 1:30:15
     """
-    duration = duration_str.replace('PT', '')
-    hours = 0
-    minutes = 0
-    seconds = 0
+    return format_seconds(iso_duration_to_seconds(duration_str))
+
+
+def build_video_entry(video, analytics, duration_seconds=None):
+    """
+    Builds the exported data entry for a single video.
     
-    if 'H' in duration:
-        hours, duration = duration.split('H')
-        hours = int(hours)
+    Args:
+        video: Video item from the YouTube Data API
+        analytics: Analytics dictionary for the video (see get_videos_analytics)
+        duration_seconds: Video length in seconds, if already parsed (see iso_durations_to_seconds)
+        
+    Returns:
+        Dictionary with the video's metadata and performance metrics
+    """
+    video_id = video['id']
+    snippet = video['snippet']
+    statistics = video['statistics']
+    content_details = video.get('contentDetails', {})
     
-    if 'M' in duration:
-        minutes, duration = duration.split('M')
-        minutes = int(minutes)
+    # Get best thumbnail (highest resolution available)
+    thumbnails = snippet['thumbnails']
+    thumbnail_url = thumbnails.get('maxres', thumbnails.get('high', thumbnails.get('medium', thumbnails.get('default'))))['url']
     
-    if 'S' in duration:
-        seconds = int(duration.replace('S', ''))
+    # Format video duration
+    if duration_seconds is None:
+        duration_seconds = iso_duration_to_seconds(content_details.get('duration', 'PT0S'))
+    duration = format_seconds(duration_seconds)
     
-    if hours > 0:
-        return f"{hours}:{minutes:02d}:{seconds:02d}"
-    else:
-        return f"{minutes}:{seconds:02d}"
+    # Calculate engagement rates
+    view_count = int(statistics.get('viewCount', 0))
+    like_count = int(statistics.get('likeCount', 0))
+    comment_count = int(statistics.get('commentCount', 0))
+    
+    engagement_rate = 0
+    if view_count > 0:
+        engagement_rate = ((like_count + comment_count) / view_count) * 100
+    
+    # Convert averageViewDuration to human-readable format if available
+    avg_view_duration_seconds = analytics.get('avg_view_duration')
+    avg_view_duration_formatted = format_duration_for_humans(avg_view_duration_seconds)
+    
+    # Calculate viewer retention if both durations are available
+    retention_rate = None
+    if avg_view_duration_seconds is not None and isinstance(avg_view_duration_seconds, (int, float)):
+        if duration_seconds > 0:
+            retention_rate = (avg_view_duration_seconds / duration_seconds) * 100
+    
+    # Create video data entry with comprehensive information
+    video_entry = {
+        'title': snippet['title'],
+        'video_id': video_id,
+        'published_at': snippet['publishedAt'],
+        'thumbnail_url': thumbnail_url,
+        'duration': duration,
+        'duration_seconds': int(duration_seconds),
+        'views': view_count,
+        'likes': like_count,
+        'comments': comment_count,
+        'engagement_rate': round(engagement_rate, 2),
+        'avg_view_duration_seconds': avg_view_duration_seconds,
+        'avg_view_duration': avg_view_duration_formatted,
+        'retention_rate': round(retention_rate, 2) if retention_rate is not None else None,
+        'shares': analytics.get('shares', 0) if analytics.get('shares') is not None else 0,
+        'subscribers_gained': analytics.get('subscribers_gained', 0) if analytics.get('subscribers_gained') is not None else 0,
+        'subscribers_lost': analytics.get('subscribers_lost', 0) if analytics.get('subscribers_lost') is not None else 0
+    }
+    
+    return video_entry
+
+
+def load_video_state(target_channel_id):
+    """
+    Loads the per-video state store for a channel.
+    The store is keyed by video_id and records the last fetched statistics,
+    the Data API etag and the analytics timestamp of every video.
+    
+    Returns:
+        Dictionary mapping video ID to its stored state (empty if no store exists yet)
+    """
+    state_file = f'youtube_video_state_{target_channel_id}.json'
+    if not os.path.exists(state_file):
+        return {}
+    
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get('videos', {})
+    except Exception as e:
+        print(f"Could not read video state store {state_file}, starting fresh: {str(e)}")
+        return {}
+
+
+def save_video_state(target_channel_id, video_state):
+    """
+    Saves the per-video state store for a channel.
+    Writes to a temporary file first so an interrupted run never corrupts the store.
+    """
+    state_file = f'youtube_video_state_{target_channel_id}.json'
+    temp_file = state_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'channel_id': target_channel_id,
+            'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'videos': video_state
+        }, f, ensure_ascii=False)
+    os.replace(temp_file, state_file)
 
 
-def extract_video_data(youtube, youtube_analytics, target_channel_id):
+def needs_analytics_refresh(video, stored_state, recent_cutoff):
+    """
+    Decides whether a video's analytics have to be re-queried in incremental mode.
+    Videos are refreshed when they are new to the store, were published after
+    recent_cutoff, or their Data API etag changed since the last run.
+    """
+    if not stored_state or 'analytics' not in stored_state:
+        return True
+    if video['snippet']['publishedAt'] >= recent_cutoff:
+        return True
+    return video.get('etag') != stored_state.get('etag')
+
+
+def merge_video_data(existing_videos, new_videos):
+    """
+    Merges freshly extracted video entries into previously exported ones.
+    New entries replace old entries with the same video_id; the result is
+    ordered by publication date (newest first).
+    """
+    merged = {video['video_id']: video for video in existing_videos}
+    merged.update((video['video_id'], video) for video in new_videos)
+    return sorted(merged.values(), key=lambda video: video['published_at'], reverse=True)
+
+
+def extract_video_data(youtube, youtube_analytics, target_channel_id, max_videos=50, since=None, incremental=False, refresh_days=7, engine=None, output_format=DEFAULT_OUTPUT_FORMAT):
     """
     Main function to extract video data from the specified channel.
     Gathers comprehensive data suitable for LLM analysis of content patterns.
+    
+    Args:
+        youtube: Authenticated YouTube API service object
+        youtube_analytics: Authenticated YouTube Analytics API service object
+        target_channel_id: YouTube channel ID
+        max_videos: Maximum number of videos to extract (None or 0 for the full catalog)
+        since: Only extract videos published on or after this date ('YYYY-MM-DD')
+        incremental: Only re-query analytics for new, recently published or changed
+            videos and merge the results into the previous export
+        refresh_days: Videos published within this many days are always refreshed
+            in incremental mode
+        engine: FetchEngine used to run API calls concurrently (one is created if not given)
+        output_format: Output sink, one of OUTPUT_FORMATS ('csv_json', 'parquet' or 'arrow')
     """
     try:
         # Get channel info for the target_channel_id
@@ -304,90 +571,91 @@ def extract_video_data(youtube, youtube_analytics, target_channel_id):
         print(f"Fetching data for channel: {channel_name} (ID: {channel_id})")
         print(f"Subscribers: {subscriber_count}")
         
-        # Get latest videos for this channel_id
-        videos = get_latest_videos(youtube, channel_id)
-        print(f"Retrieved {len(videos)} videos")
+        # Stream the channel's uploads and fetch analytics one batch of videos at a
+        # time; analytics queries run on the engine while the playlist walk continues
+        owns_engine = engine is None
+        if owns_engine:
+            engine = FetchEngine()
         
-        # Extract and organize video data
-        video_data = []
+        # Load the per-video state store (statistics, etag and analytics of previous runs)
+        video_state = load_video_state(target_channel_id)
+        fetched_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        recent_cutoff = (datetime.now(timezone.utc) - timedelta(days=refresh_days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        refreshed_count = 0
         
-        for video_idx, video in enumerate(videos): # Added enumerate here
-            video_id = video['id']
-            snippet = video['snippet']
-            statistics = video['statistics']
-            content_details = video.get('contentDetails', {})
-            
-            # Get best thumbnail (highest resolution available)
-            thumbnails = snippet['thumbnails']
-            thumbnail_url = thumbnails.get('maxres', thumbnails.get('high', thumbnails.get('medium', thumbnails.get('default'))))['url']
+        try:
+            videos = iter_channel_videos(
+                youtube,
+                channel_id,
+                max_videos=max_videos,
+                since=since,
+                uploads_playlist_id=channel_info['contentDetails']['relatedPlaylists']['uploads'],
+                engine=engine
+            )
             
-            # Get analytics data
-            analytics = get_video_analytics(youtube_analytics, video_id, snippet['publishedAt'], target_channel_id)
-            
-            # Format video duration
-            iso_duration = content_details.get('duration', 'PT0S')
-            duration = parse_duration(iso_duration)
-            
-            # Calculate engagement rates
-            view_count = int(statistics.get('viewCount', 0))
-            like_count = int(statistics.get('likeCount', 0))
-            comment_count = int(statistics.get('commentCount', 0))
-            
-            engagement_rate = 0
-            if view_count > 0:
-                engagement_rate = ((like_count + comment_count) / view_count) * 100
-            
-            # Convert averageViewDuration to human-readable format if available
-            avg_view_duration_seconds = analytics.get('avg_view_duration')
-            avg_view_duration_formatted = format_duration_for_humans(avg_view_duration_seconds)
-            
-            # Calculate viewer retention if both durations are available
-            retention_rate = None
-            if avg_view_duration_seconds is not None and isinstance(avg_view_duration_seconds, (int, float)):
-                # Convert ISO duration to seconds
-                total_seconds = 0
-                duration_str = iso_duration.replace('PT', '')
-                
-                if 'H' in duration_str:
-                    hours, duration_str = duration_str.split('H')
-                    total_seconds += int(hours) * 3600
+            pending_batches = []
+            queued_count = 0
+            for batch in _batched(videos, ANALYTICS_VIDEO_BATCH_SIZE):
+                if incremental:
+                    stale_videos = [video for video in batch if needs_analytics_refresh(video, video_state.get(video['id']), recent_cutoff)]
+                else:
+                    stale_videos = batch
                 
-                if 'M' in duration_str:
-                    minutes, duration_str = duration_str.split('M')
-                    total_seconds += int(minutes) * 60
+                # One report query per batch of videos that need fresh analytics
+                analytics_future = None
+                if stale_videos:
+                    analytics_future = engine.submit(
+                        'analytics',
+                        get_videos_analytics,
+                        youtube_analytics,
+                        {video['id']: video['snippet']['publishedAt'] for video in stale_videos},
+                        target_channel_id
+                    )
+                    refreshed_count += len(stale_videos)
                 
-                if 'S' in duration_str:
-                    seconds = duration_str.replace('S', '')
-                    total_seconds += int(seconds)
-                
-                if total_seconds > 0:
-                    retention_rate = (avg_view_duration_seconds / total_seconds) * 100
+                pending_batches.append((batch, analytics_future))
+                queued_count += len(batch)
+                print(f"Retrieved {queued_count} videos so far")
             
-            # Create video data entry with comprehensive information
-            video_entry = {
-                'title': snippet['title'],
-                'video_id': video_id,
-                'published_at': snippet['publishedAt'],
-                'thumbnail_url': thumbnail_url,
-                'duration': duration,
-                'views': view_count,
-                'likes': like_count,
-                'comments': comment_count,
-                'engagement_rate': round(engagement_rate, 2),
-                'avg_view_duration_seconds': avg_view_duration_seconds,
-                'avg_view_duration': avg_view_duration_formatted,
-                'retention_rate': round(retention_rate, 2) if retention_rate is not None else None,
-                'shares': analytics.get('shares', 0) if analytics.get('shares') is not None else 0,
-                'subscribers_gained': analytics.get('subscribers_gained', 0) if analytics.get('subscribers_gained') is not None else 0,
-                'subscribers_lost': analytics.get('subscribers_lost', 0) if analytics.get('subscribers_lost') is not None else 0
-            }
+            # Extract and organize video data
+            video_data = []
             
-            video_data.append(video_entry)
-
-            # Add delay here, after processing each video's analytics
-            if video_idx < len(videos) - 1: # Avoid sleep after the last video
-                print(f"Fetched analytics for video {video_idx+1}/{len(videos)}. Waiting 1 second...")
-                time.sleep(1)
+            for batch, analytics_future in pending_batches:
+                analytics_by_id = analytics_future.result() if analytics_future else {}
+                duration_seconds = iso_durations_to_seconds([video.get('contentDetails', {}).get('duration', 'PT0S') for video in batch])
+                
+                for video, video_duration_seconds in zip(batch, duration_seconds):
+                    stored_state = video_state.get(video['id'], {})
+                    if video['id'] in analytics_by_id:
+                        analytics = analytics_by_id[video['id']]
+                        analytics_fetched_at = fetched_at
+                    else:
+                        analytics = stored_state['analytics']
+                        analytics_fetched_at = stored_state.get('analytics_fetched_at')
+                    
+                    video_data.append(build_video_entry(video, analytics, video_duration_seconds))
+                    video_state[video['id']] = {
+                        'etag': video.get('etag'),
+                        'published_at': video['snippet']['publishedAt'],
+                        'statistics': video['statistics'],
+                        'fetched_at': fetched_at,
+                        'analytics': analytics,
+                        'analytics_fetched_at': analytics_fetched_at
+                    }
+        finally:
+            if owns_engine:
+                engine.close()
+        
+        print(f"Fetched analytics for {refreshed_count} videos")
+        
+        if incremental:
+            print(f"Re-queried analytics for {refreshed_count} of {len(video_data)} videos; reused stored analytics for the rest")
+        
+        save_video_state(target_channel_id, video_state)
+        
+        # Merge into the previous export so videos outside this run's window are kept
+        if incremental:
+            video_data = merge_video_data(load_previous_videos(target_channel_id, output_format), video_data)
         
         # Create DataFrame for CSV export
         df = pd.DataFrame(video_data)
@@ -397,26 +665,21 @@ def extract_video_data(youtube, youtube_analytics, target_channel_id):
             df['published_at'] = pd.to_datetime(df['published_at']).dt.strftime('%Y-%m-%d %H:%M:%S')
         
         # Sort by publication date (newest first)
-        df = df.sort_values(by='published_at', ascending=False)
-        
-        # Save to CSV
-        output_file_csv = f'youtube_video_data_{target_channel_id}.csv'
-        df.to_csv(output_file_csv, index=False)
-        
-        # Save full data to JSON
-        output_file_json = f'youtube_video_data_{target_channel_id}.json'
-        with open(output_file_json, 'w', encoding='utf-8') as f:
-            json.dump({
-                'channel': {
-                    'name': channel_name,
-                    'id': channel_id,
-                    'subscribers': subscriber_count
-                },
-                'videos': video_data,
-                'extracted_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }, f, ensure_ascii=False, indent=2)
-        
-        print(f"Data successfully exported to {output_file_csv} and {output_file_json}")
+        if not df.empty:
+            df = df.sort_values(by='published_at', ascending=False)
+        
+        output_files = write_video_data(
+            {
+                'name': channel_name,
+                'id': channel_id,
+                'subscribers': subscriber_count
+            },
+            df,
+            video_data,
+            output_format
+        )
+        
+        print(f"Data successfully exported to {' and '.join(output_files)}")
         
         # Simple performance analysis
         performance_analysis = analyze_video_performance(video_data)
@@ -435,13 +698,212 @@ def extract_video_data(youtube, youtube_analytics, target_channel_id):
         raise
 
 
+def load_channel_ids(channel_ids_file):
+    """
+    Reads channel IDs from a text file, one per line.
+    Blank lines and lines starting with '#' are ignored.
+    """
+    channel_ids = []
+    with open(channel_ids_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            channel_id = line.split('#', 1)[0].strip()
+            if channel_id and channel_id not in channel_ids:
+                channel_ids.append(channel_id)
+    return channel_ids
+
+
+def get_channel_video_counts(youtube, channel_ids):
+    """
+    Looks up the public video count of many channels, 50 channels per call.
+    
+    Returns:
+        Dictionary mapping channel ID to its video count (0 if unavailable)
+    """
+    video_counts = {channel_id: 0 for channel_id in channel_ids}
+    for batch in _batched(channel_ids, PLAYLIST_PAGE_SIZE):
+        request = youtube.channels().list(part="statistics", id=",".join(batch), maxResults=PLAYLIST_PAGE_SIZE)
+        response = execute_request(request, api='data')
+        for item in response.get('items', []):
+            video_counts[item['id']] = int(item['statistics'].get('videoCount', 0))
+    return video_counts
+
+
+def plan_fleet_run(youtube, channel_ids, daily_quota, max_videos=None):
+    """
+    Estimates the quota cost of each channel and picks the channels that fit in
+    what is left of today's Data API quota.
+    
+    Args:
+        youtube: Authenticated YouTube API service object
+        channel_ids: List of YouTube channel IDs
+        daily_quota: Data API units available per day
+        max_videos: Maximum number of videos extracted per channel (None for all)
+        
+    Returns:
+        Tuple of (scheduled channel IDs, deferred channel IDs)
+    """
+    video_counts = get_channel_video_counts(youtube, channel_ids)
+    channel_costs = {channel_id: estimate_channel_cost(video_counts[channel_id], max_videos) for channel_id in channel_ids}
+    
+    remaining = daily_quota - units_used()
+    scheduled, deferred = plan_channel_runs(channel_costs, remaining)
+    
+    print(f"Quota plan: {remaining} units left today; {len(scheduled)} channels scheduled "
+          f"(~{sum(channel_costs[channel_id] for channel_id in scheduled)} units), {len(deferred)} deferred")
+    return scheduled, deferred
+
+
+def extract_channel_fleet(channel_ids, creds, workers=4, engine=None, **extract_options):
+    """
+    Extracts data for many channels concurrently in a thread pool.
+    All workers share one set of credentials and one FetchEngine (so rate limits
+    apply fleet-wide); each worker thread builds its API clients once and reuses
+    them for every channel it processes. Each channel's outputs are written as
+    soon as that channel finishes.
+    
+    Args:
+        channel_ids: List of YouTube channel IDs
+        creds: OAuth 2.0 credentials (see get_credentials)
+        workers: Number of channels processed at once
+        engine: FetchEngine shared by all workers (one is created if not given)
+        extract_options: Extra keyword arguments for extract_video_data
+        
+    Returns:
+        List of per-channel result dictionaries (channel_id, status, videos, seconds, error)
+    """
+    worker_state = threading.local()
+    
+    def extract_channel(channel_id):
+        started_at = time.monotonic()
+        try:
+            if not hasattr(worker_state, 'services'):
+                worker_state.services = build_services(creds)
+            youtube, youtube_analytics = worker_state.services
+            
+            video_data_df, _ = extract_video_data(youtube, youtube_analytics, channel_id, engine=engine, **extract_options)
+            return {
+                'channel_id': channel_id,
+                'status': 'ok',
+                'videos': len(video_data_df),
+                'seconds': time.monotonic() - started_at,
+                'error': None
+            }
+        except Exception as e:
+            return {
+                'channel_id': channel_id,
+                'status': 'failed',
+                'videos': 0,
+                'seconds': time.monotonic() - started_at,
+                'error': str(e)
+            }
+    
+    owns_engine = engine is None
+    if owns_engine:
+        engine = FetchEngine()
+    
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='channel') as executor:
+            futures = [executor.submit(extract_channel, channel_id) for channel_id in channel_ids]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                print(f"[{len(results)}/{len(channel_ids)}] {result['channel_id']}: {result['status']} "
+                      f"({result['videos']} videos, {result['seconds']:.1f}s)")
+    finally:
+        if owns_engine:
+            engine.close()
+    
+    # Report in the order the channels were given
+    order = {channel_id: index for index, channel_id in enumerate(channel_ids)}
+    return sorted(results, key=lambda result: order[result['channel_id']])
+
+
+def print_fleet_summary(results, elapsed_seconds, output_format=DEFAULT_OUTPUT_FORMAT):
+    """
+    Prints an aggregate summary of a fleet extraction run.
+    """
+    succeeded = [result for result in results if result['status'] == 'ok']
+    failed = [result for result in results if result['status'] != 'ok']
+    
+    print("\nFLEET SUMMARY:")
+    print(f"Channels processed: {len(results)} ({len(succeeded)} succeeded, {len(failed)} failed)")
+    print(f"Total videos extracted: {sum(result['videos'] for result in succeeded)}")
+    print(f"Total time: {elapsed_seconds:.1f}s")
+    
+    for result in results:
+        line = f"- {result['channel_id']}: {result['status']}, {result['videos']} videos in {result['seconds']:.1f}s"
+        if result['error']:
+            line += f" ({result['error']})"
+        print(line)
+    
+    if output_format == 'csv_json':
+        print("\nFiles created per channel: youtube_video_data_<CHANNEL_ID>.csv, youtube_video_data_<CHANNEL_ID>.json, video_performance_analysis_<CHANNEL_ID>.txt")
+    else:
+        print("\nFiles created per channel: youtube_video_dataset/channel_id=<CHANNEL_ID>/extracted_date=<YYYY-MM-DD>/, video_performance_analysis_<CHANNEL_ID>.txt")
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Extract YouTube channel data for analysis.")
-    parser.add_argument("--channel_id", type=str, required=True, help="The YouTube Channel ID (starts with UC) to fetch data for.")
+    channel_group = parser.add_mutually_exclusive_group(required=True)
+    channel_group.add_argument("--channel_id", type=str, help="The YouTube Channel ID (starts with UC) to fetch data for.")
+    channel_group.add_argument("--channel_ids_file", "--channel-ids-file", type=str, help="Fleet mode: path to a text file with one channel ID per line. Channels are processed concurrently.")
+    parser.add_argument("--workers", type=int, default=4, help="Fleet mode: number of channels processed at once (default: 4).")
+    parser.add_argument("--max_videos", "--max-videos", type=int, default=50, help="Maximum number of latest videos to extract (default: 50). Use 0 to walk the full back catalog.")
+    parser.add_argument("--since", type=str, default=None, help="Only extract videos published on or after this date (YYYY-MM-DD).")
+    parser.add_argument("--incremental", action="store_true", help="Only re-query analytics for new, recently published or changed videos and merge them into the existing outputs.")
+    parser.add_argument("--refresh_days", type=int, default=7, help="In incremental mode, always refresh videos published within this many days (default: 7).")
+    parser.add_argument("--max_concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help=f"Maximum number of API requests in flight at once (default: {DEFAULT_MAX_CONCURRENCY}).")
+    parser.add_argument("--rate_limit", action="append", metavar="API=RPS", help="Override the token-bucket rate for an API (data, analytics or gemini), e.g. --rate_limit analytics=2. Can be repeated.")
+    parser.add_argument("--output_format", choices=OUTPUT_FORMATS, default=DEFAULT_OUTPUT_FORMAT, help="Output sink: csv_json (CSV and JSON files, the default), or parquet/arrow (a youtube_video_dataset/ directory partitioned by channel_id and extracted_date). parquet and arrow need pyarrow.")
+    parser.add_argument("--daily_quota", type=int, default=None, help=f"Fleet mode: YouTube Data API units available per day (the default project quota is {DEFAULT_DAILY_QUOTA}). Channels that would exceed what is left of today's quota are deferred to deferred_channel_ids.txt.")
     args = parser.parse_args()
+    apply_rate_limit_args(args.rate_limit)
+
+    if args.channel_ids_file:
+        channel_ids = load_channel_ids(args.channel_ids_file)
+        creds = get_credentials()
+        
+        if args.daily_quota is not None:
+            channel_ids, deferred_channel_ids = plan_fleet_run(build_services(creds)[0], channel_ids, args.daily_quota, args.max_videos or None)
+            if deferred_channel_ids:
+                with open('deferred_channel_ids.txt', 'w', encoding='utf-8') as f:
+                    f.write("\n".join(deferred_channel_ids) + "\n")
+                print(f"Deferred {len(deferred_channel_ids)} channels to deferred_channel_ids.txt; run them after the quota resets (midnight Pacific Time).")
+        
+        print(f"Fleet mode: extracting {len(channel_ids)} channels with {args.workers} workers")
+        
+        fleet_started_at = time.monotonic()
+        with FetchEngine(max_concurrency=args.max_concurrency) as engine:
+            fleet_results = extract_channel_fleet(
+                channel_ids,
+                creds,
+                workers=args.workers,
+                engine=engine,
+                max_videos=args.max_videos or None,
+                since=args.since,
+                incremental=args.incremental,
+                refresh_days=args.refresh_days,
+                output_format=args.output_format
+            )
+        
+        print_fleet_summary(fleet_results, time.monotonic() - fleet_started_at, args.output_format)
+        print_quota_summary(args.daily_quota or DEFAULT_DAILY_QUOTA)
+        sys.exit(0 if all(result['status'] == 'ok' for result in fleet_results) else 1)
 
     youtube, youtube_analytics = get_authenticated_service()
-    video_data_df, video_data_full = extract_video_data(youtube, youtube_analytics, args.channel_id)
+    with FetchEngine(max_concurrency=args.max_concurrency) as engine:
+        video_data_df, video_data_full = extract_video_data(
+            youtube,
+            youtube_analytics,
+            args.channel_id,
+            max_videos=args.max_videos or None,
+            since=args.since,
+            incremental=args.incremental,
+            refresh_days=args.refresh_days,
+            engine=engine,
+            output_format=args.output_format
+        )
     
     # Display summary
     print("\nSUMMARY:")
@@ -461,10 +923,16 @@ if __name__ == "__main__":
             print(f"Most engaging video: {video_data_df.loc[video_data_df['engagement_rate'].idxmax()]['title']}")
     
     print("\nFiles created:")
-    print(f"1. CSV data file (e.g., youtube_video_data_{args.channel_id}.csv)")
-    print(f"2. JSON data file (e.g., youtube_video_data_{args.channel_id}.json)")
+    if args.output_format == 'csv_json':
+        print(f"1. CSV data file (e.g., youtube_video_data_{args.channel_id}.csv)")
+        print(f"2. JSON data file (e.g., youtube_video_data_{args.channel_id}.json)")
+    else:
+        print(f"1. {args.output_format.capitalize()} dataset partition (youtube_video_dataset/channel_id={args.channel_id}/extracted_date=<YYYY-MM-DD>/)")
+        print("2. (Pass the youtube_video_dataset directory as --data_file to the analysis scripts)")
     print(f"3. Text analysis file (e.g., video_performance_analysis_{args.channel_id}.txt)")
     
+    print_quota_summary(args.daily_quota or DEFAULT_DAILY_QUOTA)
+    
     print("\nNEXT STEPS:")
     print("1. Upload these files to an LLM conversation")
     print("2. Ask the LLM specific questions about your content strategy")
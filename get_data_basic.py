@@ -9,11 +9,8 @@ including title, thumbnail, views, publish date, likes, CTR, and view duration.
 import os
 import pandas as pd
 from datetime import datetime, timedelta
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from fastapi import HTTPException
+
+from iso_duration import format_seconds, iso_duration_to_seconds, iso_durations_to_seconds
 
 # Authentication scopes needed for YouTube API access
 SCOPES = [
@@ -23,6 +20,10 @@ SCOPES = [
 CREDENTIALS_FILE = os.path.join(os.path.dirname(__file__), "credentials.json")
 TOKEN_FILE = os.path.join(os.path.dirname(__file__), "token.json")
 
+# Maximum number of video IDs packed into one Analytics `video==id1,id2,...` filter.
+# Reports broken down by video return at most 200 rows per query.
+ANALYTICS_VIDEO_BATCH_SIZE = 200
+
 
 def get_authenticated_service():
     """
@@ -30,6 +31,11 @@ def get_authenticated_service():
     Returns authenticated YouTube API service object and YouTube Analytics API service object.
     """
     try:
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from googleapiclient.discovery import build
+        
         creds = None
         if os.path.exists(TOKEN_FILE):
             creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
@@ -51,6 +57,7 @@ def get_authenticated_service():
         
         return youtube, youtube_analytics
     except Exception as e:
+        from fastapi import HTTPException
         raise HTTPException(
             status_code=500,
             detail=f"YouTube authentication failed: {str(e)}"
@@ -108,44 +115,62 @@ def get_latest_videos(youtube, channel_id, max_results=50):
     return []
 
 
+def get_videos_analytics(youtube_analytics, video_ids):
+    """
+    Retrieves analytics data (average view duration) for many videos with one
+    report query per batch of videos.
+    
+    Note: YouTube Analytics API has limitations on how far back you can retrieve data.
+    
+    Args:
+        youtube_analytics: Authenticated YouTube Analytics API service object
+        video_ids: List of YouTube video IDs
+        
+    Returns:
+        Dictionary mapping video ID to its analytics dictionary
+    """
+    analytics_by_id = {video_id: {'avg_view_duration': None} for video_id in video_ids}
+    
+    # Get the current date and a date 30 days ago
+    end_date = datetime.now().strftime('%Y-%m-%d')
+    start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+    
+    for batch_start in range(0, len(video_ids), ANALYTICS_VIDEO_BATCH_SIZE):
+        batch_ids = video_ids[batch_start:batch_start + ANALYTICS_VIDEO_BATCH_SIZE]
+        try:
+            # Get view duration (average watch time) for the whole batch
+            duration_request = youtube_analytics.reports().query(
+                ids=f"channel==MINE",
+                startDate=start_date,
+                endDate=end_date,
+                metrics="averageViewDuration",
+                dimensions="video",
+                filters=f"video=={','.join(batch_ids)}",
+                maxResults=len(batch_ids),
+                sort="-averageViewDuration"
+            )
+            duration_response = duration_request.execute()
+            
+            # Each row is: video_id, averageViewDuration
+            for row in duration_response.get('rows', []):
+                if row[0] in analytics_by_id:
+                    analytics_by_id[row[0]] = {
+                        'avg_view_duration': row[1]
+                    }
+        except Exception as e:
+            # Keep default values and continue with the script instead of failing
+            print(f"Could not retrieve analytics for videos {batch_start+1}-{batch_start+len(batch_ids)}: {str(e)}")
+    
+    return analytics_by_id
+
+
 def get_video_analytics(youtube_analytics, video_id):
     """
     Retrieves analytics data (average view duration) for a specific video.
     
     Note: YouTube Analytics API has limitations on how far back you can retrieve data.
     """
-    try:
-        # Get the current date and a date 30 days ago
-        end_date = datetime.now().strftime('%Y-%m-%d')
-        start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-        
-        # Get view duration (average watch time)
-        duration_request = youtube_analytics.reports().query(
-            ids=f"channel==MINE",
-            startDate=start_date,
-            endDate=end_date,
-            metrics="averageViewDuration",
-            dimensions="video",
-            filters=f"video=={video_id}"
-        )
-        duration_response = duration_request.execute()
-        
-        # Extract value
-        avg_duration = None
-        
-        if 'rows' in duration_response and duration_response['rows']:
-            avg_duration = duration_response['rows'][0][1]
-        
-        return {
-            'avg_view_duration': avg_duration
-        }
-    except Exception as e:
-        # Return default values if analytics cannot be retrieved
-        print(f"Could not retrieve analytics for video {video_id}: {str(e)}")
-        # Return default values and continue with the script instead of failing
-        return {
-            'avg_view_duration': None
-        }
+    return get_videos_analytics(youtube_analytics, [video_id])[video_id]
 
 
 def parse_duration(duration_str):
@@ -153,26 +178,7 @@ def parse_duration(duration_str):
     Parse ISO 8601 duration string into human-readable format.
     Example: PT1H30M15S -> 1:30:15
     """
-    duration = duration_str.replace('PT', '')
-    hours = 0
-    minutes = 0
-    seconds = 0
-    
-    if 'H' in duration:
-        hours, duration = duration.split('H')
-        hours = int(hours)
-    
-    if 'M' in duration:
-        minutes, duration = duration.split('M')
-        minutes = int(minutes)
-    
-    if 'S' in duration:
-        seconds = int(duration.replace('S', ''))
-    
-    if hours > 0:
-        return f"{hours}:{minutes:02d}:{seconds:02d}"
-    else:
-        return f"{minutes}:{seconds:02d}"
+    return format_seconds(iso_duration_to_seconds(duration_str))
 
 
 def extract_video_data(youtube, youtube_analytics):
@@ -188,10 +194,16 @@ def extract_video_data(youtube, youtube_analytics):
         videos = get_latest_videos(youtube, channel_id)
         print(f"Retrieved {len(videos)} videos")
         
+        # Get analytics for all videos up front (one report query per batch of videos)
+        analytics_by_id = get_videos_analytics(youtube_analytics, [video['id'] for video in videos])
+        
+        # Parse all video durations in one pass
+        duration_seconds = iso_durations_to_seconds([video.get('contentDetails', {}).get('duration', 'PT0S') for video in videos])
+        
         # Extract and organize video data
         video_data = []
         
-        for video in videos:
+        for video, video_duration_seconds in zip(videos, duration_seconds):
             video_id = video['id']
             snippet = video['snippet']
             statistics = video['statistics']
@@ -201,11 +213,10 @@ def extract_video_data(youtube, youtube_analytics):
             thumbnail_url = thumbnails.get('maxres', thumbnails.get('high', thumbnails.get('medium', thumbnails.get('default'))))['url']
             
             # Get analytics data
-            analytics = get_video_analytics(youtube_analytics, video_id)
+            analytics = analytics_by_id[video_id]
             
             # Format video duration
-            content_details = video.get('contentDetails', {})
-            duration = parse_duration(content_details.get('duration', 'PT0S'))
+            duration = format_seconds(video_duration_seconds)
             
             # Create video data entry
             video_entry = {
@@ -82,14 +82,8 @@ def analyze_video_performance(video_data):
     for topic, count in top_topics:
         report += f"- {topic}: appears in {count} videos\n"
     
-    # Title length analysis
-    title_lengths = [len(video['title']) for video in video_data]
-    avg_title_length = sum(title_lengths) / len(title_lengths) if title_lengths else 0
-    
-    title_word_counts = [len(video['title'].split()) for video in video_data]
-    avg_title_words = sum(title_word_counts) / len(title_word_counts) if title_word_counts else 0
-    
-    report += f"\nAverage title length: {avg_title_length:.1f} characters, {avg_title_words:.1f} words\n"
+    # Title features (length, numerals, emotive words, listicles, ...) joined to performance
+    report += format_title_feature_report(video_data)
     
     # Duration analysis
     report += "\nNOTE: This is a basic analysis. For deeper insights, provide this data to an LLM along with specific questions about content strategy."
@@ -97,6 +91,23 @@ def analyze_video_performance(video_data):
     return report
 
 
+def _parse_comment_threads(response):
+    """
+    Extracts the top-level comments from a commentThreads().list response.
+    """
+    comments = []
+    for item in response.get('items', []):
+        comment = item['snippet']['topLevelComment']['snippet']
+        comments.append({
+            'text': comment['textDisplay'],
+            'like_count': comment['likeCount'],
+            'author': comment['authorDisplayName'],
+            'published_at': comment['publishedAt']
+        })
+    
+    return comments
+
+
 def get_video_comments(youtube, video_id, max_comments=10):
     """
     Retrieves top comments for a video.
@@ -116,24 +127,59 @@ def get_video_comments(youtube, video_id, max_comments=10):
             maxResults=max_comments,
             order="relevance"
         )
-        response = request.execute()
-        
-        comments = []
-        for item in response.get('items', []):
-            comment = item['snippet']['topLevelComment']['snippet']
-            comments.append({
-                'text': comment['textDisplay'],
-                'like_count': comment['likeCount'],
-                'author': comment['authorDisplayName'],
-                'published_at': comment['publishedAt']
-            })
-        
-        return comments
+        response = execute_metered(request)
+        
+        return _parse_comment_threads(response)
     except Exception as e:
         print(f"Could not retrieve comments for video {video_id}: {str(e)}")
         return []
 
 
+def get_videos_comments(youtube, video_ids, max_comments=10):
+    """
+    Retrieves top comments for many videos, packing up to COMMENTS_BATCH_SIZE
+    commentThreads().list calls into each HTTP batch request.
+    
+    Args:
+        youtube: Authenticated YouTube API service object
+        video_ids: List of YouTube video IDs
+        max_comments: Maximum number of comments to retrieve per video
+        
+    Returns:
+        Dictionary mapping video ID to its list of comments
+    """
+    comments_by_id = {video_id: [] for video_id in video_ids}
+    
+    def handle_response(request_id, response, exception):
+        # request_id is the video ID the request was added with
+        if exception is not None:
+            print(f"Could not retrieve comments for video {request_id}: {str(exception)}")
+            return
+        comments_by_id[request_id] = _parse_comment_threads(response)
+    
+    for batch_start in range(0, len(video_ids), COMMENTS_BATCH_SIZE):
+        batch_ids = video_ids[batch_start:batch_start + COMMENTS_BATCH_SIZE]
+        batch = new_metered_batch(youtube, handle_response)
+        
+        for video_id in batch_ids:
+            batch.add(
+                youtube.commentThreads().list(
+                    part="snippet",
+                    videoId=video_id,
+                    maxResults=max_comments,
+                    order="relevance"
+                ),
+                request_id=video_id
+            )
+        
+        try:
+            batch.execute()
+        except Exception as e:
+            print(f"Could not retrieve comments for videos {batch_start+1}-{batch_start+len(batch_ids)}: {str(e)}")
+    
+    return comments_by_id
+
+
 def extract_topics_from_title(title):
     """
     Simple function to extract potential topics from video titles.
@@ -199,11 +245,9 @@ import pandas as pd
 import json
 import re
 from datetime import datetime, timedelta
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from fastapi import HTTPException
+from iso_duration import format_seconds, iso_duration_to_seconds, iso_durations_to_seconds
+from quota_ledger import execute_metered, new_metered_batch, print_quota_summary
+from title_features import format_title_feature_report
 
 # Authentication scopes needed for YouTube API access
 SCOPES = [
@@ -213,6 +257,13 @@ SCOPES = [
 CREDENTIALS_FILE = os.path.join(os.path.dirname(__file__), "credentials.json")
 TOKEN_FILE = os.path.join(os.path.dirname(__file__), "token.json")
 
+# Maximum number of video IDs packed into one Analytics `video==id1,id2,...` filter.
+# Reports broken down by video return at most 200 rows per query.
+ANALYTICS_VIDEO_BATCH_SIZE = 200
+
+# Maximum number of commentThreads().list calls packed into one HTTP batch request
+COMMENTS_BATCH_SIZE = 50
+
 
 def get_authenticated_service():
     """
@@ -220,6 +271,11 @@ def get_authenticated_service():
     Returns authenticated YouTube API service object and YouTube Analytics API service object.
     """
     try:
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from googleapiclient.discovery import build
+        
         creds = None
         if os.path.exists(TOKEN_FILE):
             creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
@@ -241,6 +297,7 @@ def get_authenticated_service():
         
         return youtube, youtube_analytics
     except Exception as e:
+        from fastapi import HTTPException
         raise HTTPException(
             status_code=500,
             detail=f"YouTube authentication failed: {str(e)}"
@@ -255,7 +312,7 @@ def get_channel_id(youtube):
         part="id",
         mine=True
     )
-    response = request.execute()
+    response = execute_metered(request)
     
     if 'items' in response and len(response['items']) > 0:
         return response['items'][0]['id']
@@ -283,7 +340,7 @@ def get_latest_videos(youtube, channel_id, max_results=50):
         order="date",
         type="video"
     )
-    response = request.execute()
+    response = execute_metered(request)
     
     # Extract video IDs
     video_ids = [item['id']['videoId'] for item in response.get('items', [])]
@@ -294,49 +351,67 @@ def get_latest_videos(youtube, channel_id, max_results=50):
             part="snippet,statistics,contentDetails,topicDetails,status",
             id=','.join(video_ids)
         )
-        return videos_request.execute()['items']
+        return execute_metered(videos_request)['items']
     
     return []
 
 
+def get_videos_analytics(youtube_analytics, video_ids):
+    """
+    Retrieves analytics data (average view duration) for many videos with one
+    report query per batch of videos.
+    
+    Note: YouTube Analytics API has limitations on how far back you can retrieve data.
+    
+    Args:
+        youtube_analytics: Authenticated YouTube Analytics API service object
+        video_ids: List of YouTube video IDs
+        
+    Returns:
+        Dictionary mapping video ID to its analytics dictionary
+    """
+    analytics_by_id = {video_id: {'avg_view_duration': None} for video_id in video_ids}
+    
+    # Get the current date and a date 30 days ago
+    end_date = datetime.now().strftime('%Y-%m-%d')
+    start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+    
+    for batch_start in range(0, len(video_ids), ANALYTICS_VIDEO_BATCH_SIZE):
+        batch_ids = video_ids[batch_start:batch_start + ANALYTICS_VIDEO_BATCH_SIZE]
+        try:
+            # Get view duration (average watch time) for the whole batch
+            duration_request = youtube_analytics.reports().query(
+                ids=f"channel==MINE",
+                startDate=start_date,
+                endDate=end_date,
+                metrics="averageViewDuration",
+                dimensions="video",
+                filters=f"video=={','.join(batch_ids)}",
+                maxResults=len(batch_ids),
+                sort="-averageViewDuration"
+            )
+            duration_response = execute_metered(duration_request)
+            
+            # Each row is: video_id, averageViewDuration
+            for row in duration_response.get('rows', []):
+                if row[0] in analytics_by_id:
+                    analytics_by_id[row[0]] = {
+                        'avg_view_duration': row[1]
+                    }
+        except Exception as e:
+            # Keep default values and continue with the script instead of failing
+            print(f"Could not retrieve analytics for videos {batch_start+1}-{batch_start+len(batch_ids)}: {str(e)}")
+    
+    return analytics_by_id
+
+
 def get_video_analytics(youtube_analytics, video_id):
     """
     Retrieves analytics data (average view duration) for a specific video.
     
     Note: YouTube Analytics API has limitations on how far back you can retrieve data.
     """
-    try:
-        # Get the current date and a date 30 days ago
-        end_date = datetime.now().strftime('%Y-%m-%d')
-        start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-        
-        # Get view duration (average watch time)
-        duration_request = youtube_analytics.reports().query(
-            ids=f"channel==MINE",
-            startDate=start_date,
-            endDate=end_date,
-            metrics="averageViewDuration",
-            dimensions="video",
-            filters=f"video=={video_id}"
-        )
-        duration_response = duration_request.execute()
-        
-        # Extract value
-        avg_duration = None
-        
-        if 'rows' in duration_response and duration_response['rows']:
-            avg_duration = duration_response['rows'][0][1]
-        
-        return {
-            'avg_view_duration': avg_duration
-        }
-    except Exception as e:
-        # Return default values if analytics cannot be retrieved
-        print(f"Could not retrieve analytics for video {video_id}: {str(e)}")
-        # Return default values and continue with the script instead of failing
-        return {
-            'avg_view_duration': None
-        }
+    return get_videos_analytics(youtube_analytics, [video_id])[video_id]
 
 
 def parse_duration(duration_str):
@@ -344,26 +419,7 @@ def parse_duration(duration_str):
     Parse ISO 8601 duration string into human-readable format.
     Example: PT1H30M15S -> 1:30:15
     """
-    duration = duration_str.replace('PT', '')
-    hours = 0
-    minutes = 0
-    seconds = 0
-    
-    if 'H' in duration:
-        hours, duration = duration.split('H')
-        hours = int(hours)
-    
-    if 'M' in duration:
-        minutes, duration = duration.split('M')
-        minutes = int(minutes)
-    
-    if 'S' in duration:
-        seconds = int(duration.replace('S', ''))
-    
-    if hours > 0:
-        return f"{hours}:{minutes:02d}:{seconds:02d}"
-    else:
-        return f"{minutes}:{seconds:02d}"
+    return format_seconds(iso_duration_to_seconds(duration_str))
 
 
 def extract_video_data(youtube, youtube_analytics):
@@ -381,7 +437,7 @@ def extract_video_data(youtube, youtube_analytics):
             part="snippet,statistics",
             id=channel_id
         )
-        channel_response = channel_request.execute()
+        channel_response = execute_metered(channel_request)
         channel_info = channel_response['items'][0]
         channel_name = channel_info['snippet']['title']
         subscriber_count = channel_info['statistics']['subscriberCount']
@@ -393,14 +449,22 @@ def extract_video_data(youtube, youtube_analytics):
         videos = get_latest_videos(youtube, channel_id)
         print(f"Retrieved {len(videos)} videos")
         
+        # Get analytics for all videos up front (one report query per batch of videos)
+        analytics_by_id = get_videos_analytics(youtube_analytics, [video['id'] for video in videos])
+        
+        # Get top comments for all videos up front (one HTTP batch request per 50 videos)
+        comments_by_id = get_videos_comments(youtube, [video['id'] for video in videos])
+        
+        # Parse all video durations in one pass
+        duration_seconds = iso_durations_to_seconds([video.get('contentDetails', {}).get('duration', 'PT0S') for video in videos])
+        
         # Extract and organize video data
         video_data = []
         
-        for video in videos:
+        for video, video_duration_seconds in zip(videos, duration_seconds):
             video_id = video['id']
             snippet = video['snippet']
             statistics = video['statistics']
-            content_details = video.get('contentDetails', {})
             
             # Get best thumbnail (highest resolution available)
             thumbnails = snippet['thumbnails']
@@ -420,14 +484,13 @@ def extract_video_data(youtube, youtube_analytics):
             title_topics = extract_topics_from_title(snippet['title'])
             
             # Get analytics data
-            analytics = get_video_analytics(youtube_analytics, video_id)
+            analytics = analytics_by_id[video_id]
             
             # Format video duration
-            iso_duration = content_details.get('duration', 'PT0S')
-            duration = parse_duration(iso_duration)
+            duration = format_seconds(video_duration_seconds)
             
             # Get top comments
-            comments = get_video_comments(youtube, video_id)
+            comments = comments_by_id[video_id]
             
             # Calculate engagement rates
             view_count = int(statistics.get('viewCount', 0))
@@ -445,24 +508,8 @@ def extract_video_data(youtube, youtube_analytics):
             # Calculate viewer retention if both durations are available
             retention_rate = None
             if avg_view_duration_seconds is not None and isinstance(avg_view_duration_seconds, (int, float)):
-                # Convert ISO duration to seconds
-                total_seconds = 0
-                duration_str = iso_duration.replace('PT', '')
-                
-                if 'H' in duration_str:
-                    hours, duration_str = duration_str.split('H')
-                    total_seconds += int(hours) * 3600
-                
-                if 'M' in duration_str:
-                    minutes, duration_str = duration_str.split('M')
-                    total_seconds += int(minutes) * 60
-                
-                if 'S' in duration_str:
-                    seconds = duration_str.replace('S', '')
-                    total_seconds += int(seconds)
-                
-                if total_seconds > 0:
-                    retention_rate = (avg_view_duration_seconds / total_seconds) * 100
+                if video_duration_seconds > 0:
+                    retention_rate = (avg_view_duration_seconds / video_duration_seconds) * 100
             
             # Create video data entry with comprehensive information
             video_entry = {
@@ -477,6 +524,7 @@ def extract_video_data(youtube, youtube_analytics):
                 'topic_categories': topics,
                 'extracted_topics': title_topics,
                 'duration': duration,
+                'duration_seconds': int(video_duration_seconds),
                 'views': view_count,
                 'likes': like_count,
                 'comments': comment_count,
@@ -561,6 +609,8 @@ if __name__ == "__main__":
     print("2. youtube_video_data.json - Comprehensive video data including comments in JSON format")
     print("3. video_performance_analysis.txt - Basic performance analysis")
     
+    print_quota_summary()
+    
     print("\nNEXT STEPS:")
     print("1. Upload these files to an LLM conversation")
     print("2. Ask the LLM specific questions about your content strategy")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+ISO 8601 Duration Parsing
+
+Converts the ISO 8601 durations returned by the YouTube Data API
+(contentDetails.duration, e.g. PT1H5S or P1DT2H) into seconds, one value at a
+time or for a whole column at once.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# P[n]W[n]DT[n]H[n]M[n]S; every component is optional. YouTube returns P0D for
+# live streams and uses days for streams longer than 24 hours.
+ISO_DURATION_RE = re.compile(
+    r'^P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?'
+    r'(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+(?:\.\d+)?)S)?)?$'
+)
+
+# Seconds per duration component
+_COMPONENT_SECONDS = {
+    'weeks': 604800,
+    'days': 86400,
+    'hours': 3600,
+    'minutes': 60,
+    'seconds': 1
+}
+
+
+def iso_duration_to_seconds(duration_str):
+    """
+    Converts an ISO 8601 duration into total seconds.
+    Example: PT1H30M15S -> 5415, P1DT2H -> 93600
+
+    Args:
+        duration_str: ISO 8601 duration string
+
+    Returns:
+        Total seconds as an int (0 for missing or malformed durations)
+    """
+    if not isinstance(duration_str, str):
+        return 0
+
+    match = ISO_DURATION_RE.match(duration_str.strip())
+    if not match:
+        return 0
+
+    total_seconds = 0.0
+    for component, value in match.groupdict().items():
+        if value:
+            total_seconds += float(value) * _COMPONENT_SECONDS[component]
+    return int(round(total_seconds))
+
+
+def iso_durations_to_seconds(durations):
+    """
+    Vectorized iso_duration_to_seconds for a whole column of durations.
+
+    Args:
+        durations: pandas Series, NumPy array or any iterable of ISO 8601 strings
+
+    Returns:
+        pandas Series of int64 seconds (0 for missing or malformed durations),
+        keeping the input's index when a Series is given
+    """
+    if not isinstance(durations, pd.Series):
+        durations = pd.Series(list(durations), dtype=object)
+
+    # Catalogs repeat the same durations many times, so parse each distinct
+    # value once and broadcast the results back with one indexing step
+    codes, uniques = pd.factorize(durations.to_numpy(dtype=object))
+    unique_seconds = np.fromiter((iso_duration_to_seconds(value) for value in uniques), dtype=np.int64, count=len(uniques))
+    # Missing values are coded -1; map them to an extra trailing 0
+    unique_seconds = np.append(unique_seconds, 0)
+    return pd.Series(unique_seconds[codes], index=durations.index)
+
+
+def format_seconds(total_seconds):
+    """
+    Formats a number of seconds as H:MM:SS, or M:SS when under an hour.
+    Example: 5415 -> 1:30:15
+    """
+    total_seconds = int(total_seconds)
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+
+    if hours > 0:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    else:
+        return f"{minutes}:{seconds:02d}"
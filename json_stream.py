@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Incremental JSON Array Parsing
+
+Gemini returns lists of ideas as one JSON array, often wrapped in a markdown
+code block. JSONArrayStream is fed the response text chunk by chunk while it
+streams and returns each top-level object of the array as soon as its
+closing brace arrives, so callers can use the first items long before the
+response ends, and keep every complete item when it is cut off or malformed
+near the end.
+"""
+
+import json
+
+
+class JSONArrayStream:
+    """
+    Extracts the objects of a top-level JSON array from text fed in pieces.
+    Text before the opening '[' (such as a ```json fence) is skipped, and so
+    are objects that fail to parse.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+        self.done = False
+        self.skipped = 0
+
+    def feed(self, text):
+        """
+        Adds text to the stream.
+
+        Args:
+            text: Next piece of the response
+
+        Returns:
+            List of the objects completed by this piece, in order
+        """
+        self._buffer += text
+        objects = []
+        buffer = self._buffer
+        position = self._position
+        while position < len(buffer) and not self.done:
+            char = buffer[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                if self._depth > 0:
+                    self._in_string = True
+            elif char in '[{':
+                if self._depth == 1 and char == '{':
+                    self._object_start = position
+                self._depth += 1
+            elif char in ']}' and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 1 and char == '}' and self._object_start is not None:
+                    try:
+                        objects.append(json.loads(buffer[self._object_start:position + 1]))
+                    except json.JSONDecodeError:
+                        self.skipped += 1
+                    self._object_start = None
+                elif self._depth == 0:
+                    self.done = True
+            position += 1
+
+        # Keep only the text of the object still being received
+        if self._object_start is not None:
+            self._buffer = buffer[self._object_start:]
+            self._position = position - self._object_start
+            self._object_start = 0
+        else:
+            self._buffer = ''
+            self._position = 0
+        return objects
+
+    @property
+    def pending(self):
+        """Whether an object was started but not completed."""
+        return self._object_start is not None
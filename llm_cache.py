@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+LLM Result Cache
+
+One SQLite database (in WAL mode) caching Gemini results for every analysis
+script. Entries are keyed by model name, prompt-template version and a hash
+of the prompt inputs, so changing a prompt or model only invalidates the
+entries it produced. Old entries are evicted by age (TTL), by count and by
+total size (least recently used first).
+
+Configured with environment variables:
+- LLM_CACHE_PATH: database file (default: llm_cache.sqlite3)
+- LLM_CACHE_TTL_DAYS: drop entries older than this many days (default: 90, 0 = never)
+- LLM_CACHE_MAX_ENTRIES: maximum number of entries kept (default: 100000)
+- LLM_CACHE_MAX_MB: maximum total size of cached values in MB (default: 500)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.environ.get('LLM_CACHE_PATH', 'llm_cache.sqlite3')
+DEFAULT_TTL_DAYS = float(os.environ.get('LLM_CACHE_TTL_DAYS', 90))
+DEFAULT_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 100000))
+DEFAULT_MAX_MB = float(os.environ.get('LLM_CACHE_MAX_MB', 500))
+
+# Eviction runs once every this many writes rather than on every write
+EVICTION_INTERVAL = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_accessed REAL NOT NULL,
+    PRIMARY KEY (model, prompt_version, input_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS llm_cache_last_accessed ON llm_cache (last_accessed);
+CREATE INDEX IF NOT EXISTS llm_cache_created_at ON llm_cache (created_at);
+"""
+
+
+def input_hash(*parts):
+    """
+    Hashes prompt inputs (strings, bytes or JSON-serializable values) into a cache key.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        elif not isinstance(part, (bytes, bytearray)):
+            part = json.dumps(part, sort_keys=True, default=str).encode('utf-8')
+        digest.update(len(part).to_bytes(8, 'big'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite-backed cache of LLM results. Safe to share between threads: each
+    thread gets its own connection, and WAL mode lets readers run while a
+    writer commits.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_days=DEFAULT_TTL_DAYS, max_entries=DEFAULT_MAX_ENTRIES, max_mb=DEFAULT_MAX_MB):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400 if ttl_days else None
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb else None
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, model, prompt_version, key):
+        """
+        Returns the cached value for a model, prompt version and input hash
+        (see input_hash), or None on a miss. Expired entries count as misses.
+        """
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT value, created_at FROM llm_cache WHERE model = ? AND prompt_version = ? AND input_hash = ?",
+            (model, prompt_version, key)
+        ).fetchone()
+
+        now = time.time()
+        if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+            with self._stats_lock:
+                self.misses += 1
+            return None
+
+        with connection:
+            connection.execute(
+                "UPDATE llm_cache SET last_accessed = ? WHERE model = ? AND prompt_version = ? AND input_hash = ?",
+                (now, model, prompt_version, key)
+            )
+        with self._stats_lock:
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, model, prompt_version, key, value):
+        """
+        Stores a JSON-serializable value (usually the response text).
+        """
+        encoded = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO llm_cache (model, prompt_version, input_hash, value, size, created_at, last_accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (model, prompt_version, key, encoded, len(encoded.encode('utf-8')), now, now)
+            )
+
+        with self._stats_lock:
+            self._writes += 1
+            run_eviction = self._writes % EVICTION_INTERVAL == 0
+        if run_eviction:
+            self.evict()
+
+    def evict(self):
+        """
+        Deletes expired entries, then the least recently used entries until the
+        cache is within its entry count and size limits.
+
+        Returns:
+            Number of entries deleted
+        """
+        connection = self._connection()
+        deleted = 0
+        with connection:
+            if self.ttl_seconds:
+                deleted += connection.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)).rowcount
+
+            count = connection.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            if self.max_entries and count > self.max_entries:
+                deleted += connection.execute(
+                    "DELETE FROM llm_cache WHERE (model, prompt_version, input_hash) IN "
+                    "(SELECT model, prompt_version, input_hash FROM llm_cache ORDER BY last_accessed LIMIT ?)",
+                    (count - self.max_entries,)
+                ).rowcount
+
+            if self.max_bytes:
+                total_size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+                if total_size > self.max_bytes:
+                    # Walk entries from least recently used and drop them until under the limit
+                    excess = total_size - self.max_bytes
+                    victims = []
+                    for model, prompt_version, key, size in connection.execute(
+                            "SELECT model, prompt_version, input_hash, size FROM llm_cache ORDER BY last_accessed"):
+                        victims.append((model, prompt_version, key))
+                        excess -= size
+                        if excess <= 0:
+                            break
+                    connection.executemany("DELETE FROM llm_cache WHERE model = ? AND prompt_version = ? AND input_hash = ?", victims)
+                    deleted += len(victims)
+        return deleted
+
+    def stats(self):
+        """
+        Returns hit/miss counters for this process and the cache's size.
+        """
+        count, total_size = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'entries': count,
+                'size_mb': round(total_size / (1024 * 1024), 2)
+            }
+
+    def print_stats(self):
+        """Prints a one-line cache summary."""
+        stats = self.stats()
+        print(f"LLM cache ({self.path}): {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries, {stats['size_mb']} MB")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Returns the process-wide cache at LLM_CACHE_PATH, opening it on first use.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
+
+
+def model_name(model):
+    """
+    Returns a model's name for cache keys (e.g. 'gemini-pro').
+    """
+    return (getattr(model, 'model_name', None) or str(model)).split('/')[-1]
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+LLM Call Metrics
+
+Records every Gemini call made by the analysis scripts: call site, model,
+input and output tokens, latency (and time to the first chunk of streamed
+responses), and whether the result came from the LLM cache. Token counts come from the response's usage metadata; when it is
+missing (e.g. replayed cassettes without usage), they are estimated locally.
+
+At the end of a run the scripts print a per-call-site summary with latency
+and token percentiles and write the full report, including every call, to
+LLM_METRICS_DIR/llm_metrics_<timestamp>.json (default directory: llm_metrics/).
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+LLM_METRICS_DIR = os.environ.get('LLM_METRICS_DIR', 'llm_metrics')
+
+# Rough average for English text; good enough to size prompts without a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Gemini bills an image as a fixed number of tokens
+IMAGE_TOKENS = 258
+
+PERCENTILES = (50, 90, 99)
+
+
+def estimate_tokens(contents):
+    """
+    Estimates the number of tokens in a text or in prompt contents (lists of
+    text and image parts).
+    """
+    if isinstance(contents, str):
+        return (len(contents) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    if isinstance(contents, (list, tuple)):
+        return sum(estimate_tokens(part) for part in contents)
+    if isinstance(contents, dict) and 'text' in contents:
+        return estimate_tokens(contents['text'])
+    # Image dicts ({"mime_type", "data"}) and PIL images
+    return IMAGE_TOKENS
+
+
+def percentile(values, pct):
+    """
+    Returns the nearest-rank percentile of a list of numbers (None if empty).
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-pct * len(ordered) // 100))
+    return ordered[rank - 1]
+
+
+def _usage_tokens(response):
+    usage = getattr(response, 'usage_metadata', None)
+    prompt_tokens = getattr(usage, 'prompt_token_count', None) if usage is not None else None
+    output_tokens = getattr(usage, 'candidates_token_count', None) if usage is not None else None
+    return prompt_tokens or None, output_tokens or None
+
+
+def _response_text(response):
+    try:
+        return response.text
+    except Exception:
+        return ''
+
+
+class LLMMetrics:
+    """
+    Thread-safe collector of LLM call records for one run.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self.records = []
+        self._lock = threading.Lock()
+
+    def record(self, site, model, input_tokens=None, output_tokens=None, latency_ms=0.0,
+               cache_hit=False, estimated=False, error=None, first_chunk_ms=None):
+        """
+        Adds one call record.
+
+        Args:
+            site: Call site name (e.g. 'analyze_title_with_llm')
+            model: Model name
+            input_tokens: Prompt tokens
+            output_tokens: Response tokens
+            latency_ms: Wall time of the call in milliseconds
+            cache_hit: Whether the result was served from the LLM cache
+            estimated: Whether the token counts were estimated locally
+            error: Error message if the call failed
+            first_chunk_ms: Time to the first chunk of a streamed response in milliseconds
+        """
+        with self._lock:
+            self.records.append({
+                'site': site,
+                'model': model,
+                'input_tokens': input_tokens,
+                'output_tokens': output_tokens,
+                'latency_ms': round(latency_ms, 1),
+                'cache_hit': cache_hit,
+                'estimated': estimated,
+                'error': error,
+                'first_chunk_ms': round(first_chunk_ms, 1) if first_chunk_ms is not None else None,
+                'at': time.time()
+            })
+
+    def summary(self):
+        """
+        Returns per-call-site statistics: call, cache hit and error counts,
+        token totals and latency/token percentiles over the calls that reached Gemini.
+        """
+        with self._lock:
+            records = list(self.records)
+
+        sites = {}
+        for record in records:
+            sites.setdefault(record['site'], []).append(record)
+
+        summary = {}
+        for site, site_records in sites.items():
+            calls = [r for r in site_records if not r['cache_hit'] and not r['error']]
+            input_tokens = [r['input_tokens'] for r in calls if r['input_tokens'] is not None]
+            output_tokens = [r['output_tokens'] for r in calls if r['output_tokens'] is not None]
+            latencies = [r['latency_ms'] for r in calls]
+            first_chunks = [r['first_chunk_ms'] for r in calls if r.get('first_chunk_ms') is not None]
+            summary[site] = {
+                'requests': len(site_records),
+                'calls': len(calls),
+                'cache_hits': sum(1 for r in site_records if r['cache_hit']),
+                'errors': sum(1 for r in site_records if r['error']),
+                'input_tokens': sum(input_tokens),
+                'output_tokens': sum(output_tokens),
+                'max_input_tokens': max(input_tokens, default=None),
+                **{f'latency_ms_p{pct}': percentile(latencies, pct) for pct in PERCENTILES},
+                **{f'first_chunk_ms_p{pct}': percentile(first_chunks, pct) for pct in PERCENTILES},
+                **{f'input_tokens_p{pct}': percentile(input_tokens, pct) for pct in PERCENTILES},
+                **{f'output_tokens_p{pct}': percentile(output_tokens, pct) for pct in PERCENTILES}
+            }
+        return summary
+
+    def print_report(self):
+        """Prints one line per call site."""
+        summary = self.summary()
+        if not summary:
+            return
+        print("LLM calls (latency p50/p90/p99 ms, input tokens p50/p90/max):")
+        for site, stats in sorted(summary.items()):
+            print(f"  {site}: {stats['calls']} calls, {stats['cache_hits']} cache hits, {stats['errors']} errors, "
+                  f"{stats['input_tokens']} in / {stats['output_tokens']} out tokens, "
+                  f"latency {stats['latency_ms_p50']}/{stats['latency_ms_p90']}/{stats['latency_ms_p99']}, "
+                  f"input {stats['input_tokens_p50']}/{stats['input_tokens_p90']}/{stats['max_input_tokens']}"
+                  + (f", first chunk p50 {stats['first_chunk_ms_p50']} ms" if stats['first_chunk_ms_p50'] is not None else ""))
+
+    def write_report(self, directory=LLM_METRICS_DIR):
+        """
+        Writes the summary and every call record to a JSON file for this run.
+
+        Returns:
+            Path of the report, or None if no calls were recorded
+        """
+        with self._lock:
+            records = list(self.records)
+        if not records:
+            return None
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"llm_metrics_{self.started_at.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(path, 'w') as f:
+            json.dump({
+                'started_at': self.started_at.isoformat(),
+                'finished_at': datetime.now().isoformat(),
+                'summary': self.summary(),
+                'calls': records
+            }, f, indent=2)
+        print(f"LLM call metrics saved to '{path}'")
+        return path
+
+    def finish(self):
+        """Prints the report and writes it to LLM_METRICS_DIR."""
+        self.print_report()
+        self.write_report()
+
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    Returns the process-wide metrics collector.
+    """
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = LLMMetrics()
+        return _default_metrics
+
+
+def _model_name(model):
+    return (getattr(model, 'model_name', None) or str(model)).split('/')[-1]
+
+
+def generate_content(site, model, contents, **kwargs):
+    """
+    Calls model.generate_content(contents, **kwargs) and records its tokens and latency.
+    Exceptions are recorded and re-raised.
+
+    Args:
+        site: Call site name for the report
+        model: Gemini model
+        contents: Prompt contents
+
+    Returns:
+        The model's response
+    """
+    started_at = time.monotonic()
+    try:
+        response = model.generate_content(contents, **kwargs)
+    except Exception as e:
+        get_metrics().record(site, _model_name(model), estimate_tokens(contents),
+                             latency_ms=(time.monotonic() - started_at) * 1000,
+                             estimated=True, error=str(e))
+        raise
+    latency_ms = (time.monotonic() - started_at) * 1000
+
+    input_tokens, output_tokens = _usage_tokens(response)
+    estimated = input_tokens is None or output_tokens is None
+    if input_tokens is None:
+        input_tokens = estimate_tokens(contents)
+    if output_tokens is None:
+        output_tokens = estimate_tokens(_response_text(response))
+    get_metrics().record(site, _model_name(model), input_tokens, output_tokens, latency_ms, estimated=estimated)
+    return response
+
+
+def stream_content(site, model, contents, **kwargs):
+    """
+    Calls model.generate_content(contents, stream=True, **kwargs) and yields
+    the text of each chunk as it arrives. The call is recorded, with its time
+    to first chunk, once the stream ends; exceptions (including ones raised
+    mid-stream) are recorded and re-raised.
+
+    Args:
+        site: Call site name for the report
+        model: Gemini model
+        contents: Prompt contents
+
+    Yields:
+        Text of each response chunk
+    """
+    started_at = time.monotonic()
+    first_chunk_ms = None
+    texts = []
+    last_chunk = None
+    try:
+        response = model.generate_content(contents, stream=True, **kwargs)
+        for chunk in response:
+            if first_chunk_ms is None:
+                first_chunk_ms = (time.monotonic() - started_at) * 1000
+            last_chunk = chunk
+            text = _response_text(chunk)
+            texts.append(text)
+            yield text
+    except Exception as e:
+        get_metrics().record(site, _model_name(model), estimate_tokens(contents),
+                             estimate_tokens(''.join(texts)) if texts else None,
+                             latency_ms=(time.monotonic() - started_at) * 1000,
+                             estimated=True, error=str(e), first_chunk_ms=first_chunk_ms)
+        raise
+    latency_ms = (time.monotonic() - started_at) * 1000
+
+    # The last chunk carries the usage of the whole response
+    input_tokens, output_tokens = _usage_tokens(last_chunk)
+    estimated = input_tokens is None or output_tokens is None
+    if input_tokens is None:
+        input_tokens = estimate_tokens(contents)
+    if output_tokens is None:
+        output_tokens = estimate_tokens(''.join(texts))
+    get_metrics().record(site, _model_name(model), input_tokens, output_tokens, latency_ms,
+                         estimated=estimated, first_chunk_ms=first_chunk_ms)
+
+
+def record_cache_hit(site, model):
+    """
+    Records a call served from the LLM cache instead of Gemini.
+    """
+    get_metrics().record(site, _model_name(model), cache_hit=True)
@@ -11,11 +11,12 @@ import os
 import json
 import pandas as pd
 import argparse
-from datetime import datetime, timedelta
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
+from datetime import datetime
+
+from analytics_reports import collect_reports, submit_reports, totals_section
+from async_engine import FetchEngine, DEFAULT_MAX_CONCURRENCY, apply_rate_limit_args, execute_request
+from cassette import build_service, replaying
+from iso_duration import iso_durations_to_seconds
 
 # Authentication scopes needed for YouTube API access
 SCOPES = [
@@ -33,11 +34,15 @@ def get_authenticated_service():
     Returns authenticated YouTube API and YouTube Analytics API service objects.
     """
     try:
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        
         creds = None
-        if os.path.exists(TOKEN_FILE):
+        if not replaying() and os.path.exists(TOKEN_FILE):
             creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
         
-        if not creds or not creds.valid:
+        if not replaying() and (not creds or not creds.valid):
             if creds and creds.expired and creds.refresh_token:
                 creds.refresh(Request())
             else:
@@ -49,8 +54,9 @@ def get_authenticated_service():
                 token.write(creds.to_json())
         
         # Build both YouTube Data API and YouTube Analytics API service objects
-        youtube = build('youtube', 'v3', credentials=creds)
-        youtube_analytics = build('youtubeAnalytics', 'v2', credentials=creds)
+        # (recorded to or replayed from cassettes when YT_CASSETTE_MODE is set)
+        youtube = build_service('youtube', 'v3', creds)
+        youtube_analytics = build_service('youtubeAnalytics', 'v2', creds)
         
         return youtube, youtube_analytics
     except Exception as e:
@@ -67,7 +73,7 @@ def get_channel_info(youtube, target_channel_id):
             part="id,snippet,statistics,brandingSettings,contentDetails,topicDetails",
             id=target_channel_id
         )
-        channel_response = channels_request.execute()
+        channel_response = execute_request(channels_request, api='data')
         
         if 'items' not in channel_response or len(channel_response['items']) == 0:
             raise Exception(f"No channel found with ID: {target_channel_id}")
@@ -96,66 +102,21 @@ def get_channel_info(youtube, target_channel_id):
         raise
 
 
-def get_channel_demographics(youtube_analytics, target_channel_id): # Add target_channel_id here
+# Analytics report sections emitted in the media kit (see ANALYTICS_REPORTS in analytics_reports.py)
+AUDIENCE_REPORTS = ['ageGender', 'countries', 'devices']
+PERFORMANCE_REPORTS = ['last30Days', 'averageViewPercentage']
+MEDIA_KIT_REPORTS = AUDIENCE_REPORTS + PERFORMANCE_REPORTS
+
+
+def get_channel_demographics(responses):
     """
-    Retrieves demographic information about the channel's audience.
+    Builds demographic information about the channel's audience from the
+    age/gender, country and device reports.
     """
     try:
-        # Get the current date and a date 90 days ago
-        end_date = datetime.now().strftime('%Y-%m-%d')
-        start_date = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
-        
-        # Initialize response variables
-        demographics_response = {"rows": []}
-        geography_response = {"rows": []}
-        device_response = {"rows": []}
-        
-        try:
-            # Get viewer demographics by age and gender
-            demographics_request = youtube_analytics.reports().query(
-                ids=f"channel=={target_channel_id}",
-                startDate=start_date,
-                endDate=end_date,
-                metrics="viewerPercentage",
-                dimensions="ageGroup,gender",
-                sort="gender,ageGroup"
-            )
-            demographics_response = demographics_request.execute()
-            print("Successfully retrieved age and gender demographics")
-        except Exception as e:
-            print(f"Could not retrieve age and gender demographics: {str(e)}")
-        
-        try:
-            # Get viewer demographics by geography (countries)
-            # Using views instead of viewerPercentage for better compatibility
-            geography_request = youtube_analytics.reports().query(
-                ids=f"channel=={target_channel_id}",
-                startDate=start_date,
-                endDate=end_date,
-                metrics="views",
-                dimensions="country",
-                sort="-views",
-                maxResults=25
-            )
-            geography_response = geography_request.execute()
-            print("Successfully retrieved country demographics")
-        except Exception as e:
-            print(f"Could not retrieve country demographics: {str(e)}")
-        
-        try:
-            # Get viewer demographics by device type
-            device_request = youtube_analytics.reports().query(
-                ids=f"channel=={target_channel_id}",
-                startDate=start_date,
-                endDate=end_date,
-                metrics="views",
-                dimensions="deviceType",
-                sort="-views"
-            )
-            device_response = device_request.execute()
-            print("Successfully retrieved device demographics")
-        except Exception as e:
-            print(f"Could not retrieve device demographics: {str(e)}")
+        demographics_response = responses['ageGender']
+        geography_response = responses['countries']
+        device_response = responses['devices']
         
         # Process and format the demographic data
         demographics = {
@@ -211,125 +172,20 @@ def get_channel_demographics(youtube_analytics, target_channel_id): # Add target
         }
 
 
-def get_performance_metrics(youtube_analytics, target_channel_id):
+def get_performance_metrics(responses):
     """
-    Retrieves overall channel performance metrics for the specified channel ID.
+    Builds overall channel performance metrics from the 30-day totals and
+    average view percentage reports.
     """
     try:
-        # Get current date and format properly
-        now = datetime.now()
-        end_date = now.strftime('%Y-%m-%d')
-        
-        # For monthly dimension, start date must be the first day of a month
-        first_day_current_month = datetime(now.year, now.month, 1)
-        start_date_30d = (now - timedelta(days=30)).strftime('%Y-%m-%d')
-        start_date_90d = (now - timedelta(days=90)).strftime('%Y-%m-%d')
-        
-        # For year to date, use January 1st of current year
-        start_date_ytd = datetime(now.year, 1, 1).strftime('%Y-%m-%d')
-        
-        # For monthly data, go back 12 months but align to first day of month
-        twelve_months_ago = first_day_current_month.replace(year=first_day_current_month.year - 1)
-        start_date_monthly = twelve_months_ago.strftime('%Y-%m-%d')
-        
-        print(f"Performance date ranges: 30d({start_date_30d}), 90d({start_date_90d}), YTD({start_date_ytd}), Monthly({start_date_monthly})")
-        
-        # Initialize response variables with default empty data
-        metrics_30d_response = {"rows": [[0, 0, 0, 0, 0, 0, 0]]}
-        metrics_90d_response = {"rows": [[0, 0, 0, 0, 0, 0, 0]]}
-        metrics_ytd_response = {"rows": [[0, 0, 0, 0, 0, 0, 0]]}
-        monthly_data_response = {"rows": []}
-        watch_percentage_response = {"rows": [[0]]}
-        
-        try:
-            # Get 30-day metrics
-            metrics_30d_request = youtube_analytics.reports().query(
-                ids=f"channel=={target_channel_id}",
-                startDate=start_date_30d,
-                endDate=end_date,
-                metrics="views,estimatedMinutesWatched,averageViewDuration,subscribersGained,likes,comments,shares"
-            )
-            metrics_30d_response = metrics_30d_request.execute()
-            print("Successfully retrieved 30-day metrics")
-        except Exception as e:
-            print(f"Could not retrieve 30-day metrics: {str(e)}")
-        
-        try:
-            # Get 90-day metrics
-            metrics_90d_request = youtube_analytics.reports().query(
-                ids=f"channel=={target_channel_id}",
-                startDate=start_date_90d,
-                endDate=end_date,
-                metrics="views,estimatedMinutesWatched,averageViewDuration,subscribersGained,likes,comments,shares"
-            )
-            metrics_90d_response = metrics_90d_request.execute()
-            print("Successfully retrieved 90-day metrics")
-        except Exception as e:
-            print(f"Could not retrieve 90-day metrics: {str(e)}")
-        
-        try:
-            # Get year-to-date metrics
-            metrics_ytd_request = youtube_analytics.reports().query(
-                ids=f"channel=={target_channel_id}",
-                startDate=start_date_ytd,
-                endDate=end_date,
-                metrics="views,estimatedMinutesWatched,averageViewDuration,subscribersGained,likes,comments,shares"
-            )
-            metrics_ytd_response = metrics_ytd_request.execute()
-            print("Successfully retrieved year-to-date metrics")
-        except Exception as e:
-            print(f"Could not retrieve year-to-date metrics: {str(e)}")
-        
-        try:
-            # Get monthly data for growth chart - ensuring dates align with month boundaries
-            monthly_data_request = youtube_analytics.reports().query(
-                ids=f"channel=={target_channel_id}",
-                startDate=start_date_monthly,
-                endDate=end_date,
-                metrics="views,subscribersGained",
-                dimensions="month",
-                sort="month"
-            )
-            monthly_data_response = monthly_data_request.execute()
-            print("Successfully retrieved monthly growth data")
-        except Exception as e:
-            print(f"Could not retrieve monthly growth data: {str(e)}")
-        
-        try:
-            # Get average watch percentage
-            watch_percentage_request = youtube_analytics.reports().query(
-                ids=f"channel=={target_channel_id}",
-                startDate=start_date_90d,
-                endDate=end_date,
-                metrics="averageViewPercentage"
-            )
-            watch_percentage_response = watch_percentage_request.execute()
-            print("Successfully retrieved average view percentage")
-        except Exception as e:
-            watch_percentage_response = {"rows": [[0]]}
-            print(f"Could not retrieve average view percentage: {str(e)}")
+        watch_percentage_response = responses['averageViewPercentage']
         
         # Process the metrics data
         performance = {
-            'last30Days': {},
+            'last30Days': totals_section(responses['last30Days']),
             'averages': {}
         }
         
-        # Extract values from the 30-day metrics
-        if 'rows' in metrics_30d_response and metrics_30d_response['rows']:
-            row = metrics_30d_response['rows'][0]
-            performance['last30Days'] = {
-                'views': row[0],
-                'watchTimeMinutes': row[1],
-                'avgViewDuration': row[2],
-                'subscribersGained': row[3],
-                'likes': row[4],
-                'comments': row[5],
-                'shares': row[6]
-            }
-        
-        # We're removing the 90-day metrics, year-to-date metrics, and monthly growth data as requested
-        
         # Calculate average watch percentage
         if 'rows' in watch_percentage_response and watch_percentage_response['rows']:
             performance['averages']['averageViewPercentage'] = watch_percentage_response['rows'][0][0]
@@ -351,9 +207,6 @@ def get_performance_metrics(youtube_analytics, target_channel_id):
         # Return empty performance metrics if there's an error
         return {
             'last30Days': {},
-            'last90Days': {},
-            'lastYear': {},
-            'monthlyGrowth': [],
             'averages': {}
         }
 
@@ -368,7 +221,7 @@ def get_top_videos(youtube, channel_info):
             part="contentDetails",
             id=channel_info['id']
         )
-        channel_response = channels_request.execute()
+        channel_response = execute_request(channels_request, api='data')
         uploads_playlist_id = channel_response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
         
         # Get all videos from the uploads playlist
@@ -387,7 +240,7 @@ def get_top_videos(youtube, channel_info):
                 maxResults=max_results_per_request,
                 pageToken=next_page_token
             )
-            playlist_items_response = playlist_items_request.execute()
+            playlist_items_response = execute_request(playlist_items_request, api='data')
             
             # Extract video IDs
             video_ids = [item['contentDetails']['videoId'] for item in playlist_items_response.get('items', [])]
@@ -398,10 +251,12 @@ def get_top_videos(youtube, channel_info):
                     part="snippet,statistics,contentDetails",
                     id=','.join(video_ids)
                 )
-                videos_response = videos_request.execute()
+                videos_response = execute_request(videos_request, api='data')
+                video_items = videos_response.get('items', [])
+                duration_seconds = iso_durations_to_seconds([video['contentDetails']['duration'] for video in video_items])
                 
                 # Add videos to our list
-                for video in videos_response.get('items', []):
+                for video, video_duration_seconds in zip(video_items, duration_seconds):
                     video_data = {
                         'id': video['id'],
                         'title': video['snippet']['title'],
@@ -410,7 +265,8 @@ def get_top_videos(youtube, channel_info):
                         'viewCount': int(video['statistics'].get('viewCount', 0)),
                         'likeCount': int(video['statistics'].get('likeCount', 0)),
                         'commentCount': int(video['statistics'].get('commentCount', 0)),
-                        'duration': video['contentDetails']['duration']
+                        'duration': video['contentDetails']['duration'],
+                        'durationSeconds': int(video_duration_seconds)
                     }
                     videos.append(video_data)
             
@@ -442,10 +298,11 @@ def get_top_videos(youtube, channel_info):
         }
 
 
-def create_media_kit(target_channel_id, output_json_filename, output_summary_filename):
+def create_media_kit(target_channel_id, output_json_filename, output_summary_filename, engine=None):
     """
     Creates a comprehensive media kit for the specified channel ID.
     Saves the kit to the provided filenames.
+    API calls run concurrently on `engine` (a FetchEngine is created if not given).
     """
     try:
         print(f"Authenticating with YouTube API for channel: {target_channel_id}...")
@@ -470,40 +327,47 @@ def create_media_kit(target_channel_id, output_json_filename, output_summary_fil
             }
         }
         
-        try:
-            print(f"Retrieving channel information for {target_channel_id}...")
-            channel_info = get_channel_info(youtube, target_channel_id)
-            media_kit['channelInfo'] = channel_info
-        except Exception as e:
-            print(f"Error retrieving channel info for {target_channel_id}: {str(e)}")
+        # Channel info and every Analytics report query are independent, so
+        # fetch them concurrently; each section still fails on its own
+        owns_engine = engine is None
+        if owns_engine:
+            engine = FetchEngine()
         
         try:
-            print(f"Retrieving audience demographics for {target_channel_id}...")
-            demographics = get_channel_demographics(youtube_analytics, target_channel_id)
-            media_kit['audience'] = demographics
-        except Exception as e:
-            print(f"Error retrieving demographics for {target_channel_id}: {str(e)}")
-        
-        try:
-            print(f"Retrieving performance metrics for {target_channel_id}...")
-            performance = get_performance_metrics(youtube_analytics, target_channel_id)
-            media_kit['performance'] = performance
-        except Exception as e:
-            print(f"Error retrieving performance metrics for {target_channel_id}: {str(e)}")
-        
-        try:
-            print("Retrieving top videos...")
+            print(f"Retrieving channel information, audience demographics and performance metrics for {target_channel_id}...")
+            channel_info_future = engine.submit(None, get_channel_info, youtube, target_channel_id)
+            report_futures = submit_reports(engine, youtube_analytics, f"channel=={target_channel_id}", MEDIA_KIT_REPORTS)
+            
+            try:
+                media_kit['channelInfo'] = channel_info_future.result()
+            except Exception as e:
+                print(f"Error retrieving channel info for {target_channel_id}: {str(e)}")
+            
+            # Top videos need the channel info; start them while the analytics queries are still running
+            top_videos_future = None
             if 'channelInfo' in media_kit and media_kit['channelInfo']:
-                videos_data = get_top_videos(youtube, media_kit['channelInfo'])
-                media_kit['topContent'] = videos_data
-                
-                # Update average views per video in performance metrics
-                if 'averages' in media_kit['performance']:
-                    media_kit['performance']['averages']['viewsPerVideo'] = videos_data['averageViews']
+                print("Retrieving top videos...")
+                top_videos_future = engine.submit(None, get_top_videos, youtube, media_kit['channelInfo'])
             else:
                 print("Skipping top videos retrieval as channel info is not available")
-        except Exception as e:
-            print(f"Error retrieving top videos: {str(e)}")
+            
+            responses = collect_reports(report_futures)
+            media_kit['audience'] = get_channel_demographics(responses)
+            media_kit['performance'] = get_performance_metrics(responses)
+            
+            try:
+                if top_videos_future is not None:
+                    videos_data = top_videos_future.result()
+                    media_kit['topContent'] = videos_data
+                    
+                    # Update average views per video in performance metrics
+                    if 'averages' in media_kit['performance']:
+                        media_kit['performance']['averages']['viewsPerVideo'] = videos_data['averageViews']
+            except Exception as e:
+                print(f"Error retrieving top videos: {str(e)}")
+        finally:
+            if owns_engine:
+                engine.close()
         
         # Save to JSON file
         # Save to JSON file
@@ -658,7 +522,10 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate a YouTube Media Kit.")
     parser.add_argument("--channel_id", type=str, required=True, help="The YouTube Channel ID for which to generate the media kit.")
     parser.add_argument("--data_file", type=str, required=True, help="Path to the input JSON data file (e.g., youtube_video_data_CHANNELID.json). Note: This script currently fetches most data live; this argument is for consistency but primarily uses channel_id for API calls.")
+    parser.add_argument("--max_concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help=f"Maximum number of API requests in flight at once (default: {DEFAULT_MAX_CONCURRENCY}).")
+    parser.add_argument("--rate_limit", action="append", metavar="API=RPS", help="Override the token-bucket rate for an API (data, analytics or gemini), e.g. --rate_limit analytics=2. Can be repeated.")
     args = parser.parse_args()
+    apply_rate_limit_args(args.rate_limit)
 
     print("YouTube Media Kit Generator")
     print("===========================")
@@ -677,11 +544,13 @@ if __name__ == "__main__":
     # The create_media_kit function will be modified to accept channel_id for API calls
     # and use these filenames.
 
-    media_kit_data = create_media_kit(
-        target_channel_id=args.channel_id,
-        output_json_filename=output_json_file,
-        output_summary_filename=output_summary_file
-    ) # This function signature will need to be updated
+    with FetchEngine(max_concurrency=args.max_concurrency) as engine:
+        media_kit_data = create_media_kit(
+            target_channel_id=args.channel_id,
+            output_json_filename=output_json_file,
+            output_summary_filename=output_summary_file,
+            engine=engine
+        )
     
     if media_kit_data:
         print("\nMedia Kit Creation Complete!")
@@ -10,11 +10,11 @@ and advertisers typically look for.
 import os
 import json
 import pandas as pd
-from datetime import datetime, timedelta
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
+from datetime import datetime
+
+from analytics_reports import collect_reports, submit_reports, totals_section
+from async_engine import FetchEngine
+from iso_duration import iso_durations_to_seconds
 
 # Authentication scopes needed for YouTube API access
 SCOPES = [
@@ -32,6 +32,11 @@ def get_authenticated_service():
     Returns authenticated YouTube API and YouTube Analytics API service objects.
     """
     try:
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from googleapiclient.discovery import build
+        
         creds = None
         if os.path.exists(TOKEN_FILE):
             creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
@@ -100,66 +105,21 @@ def get_channel_info(youtube):
         raise
 
 
-def get_channel_demographics(youtube_analytics):
+# Analytics report sections emitted in the media kit (see ANALYTICS_REPORTS in analytics_reports.py)
+AUDIENCE_REPORTS = ['ageGender', 'countries', 'devices']
+PERFORMANCE_REPORTS = ['last30Days', 'last90Days', 'yearToDate', 'monthlyGrowth', 'averageViewPercentage']
+MEDIA_KIT_REPORTS = AUDIENCE_REPORTS + PERFORMANCE_REPORTS
+
+
+def get_channel_demographics(responses):
     """
-    Retrieves demographic information about the channel's audience.
+    Builds demographic information about the channel's audience from the
+    age/gender, country and device reports.
     """
     try:
-        # Get the current date and a date 90 days ago
-        end_date = datetime.now().strftime('%Y-%m-%d')
-        start_date = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
-        
-        # Initialize response variables
-        demographics_response = {"rows": []}
-        geography_response = {"rows": []}
-        device_response = {"rows": []}
-        
-        try:
-            # Get viewer demographics by age and gender
-            demographics_request = youtube_analytics.reports().query(
-                ids="channel==MINE",
-                startDate=start_date,
-                endDate=end_date,
-                metrics="viewerPercentage",
-                dimensions="ageGroup,gender",
-                sort="gender,ageGroup"
-            )
-            demographics_response = demographics_request.execute()
-            print("Successfully retrieved age and gender demographics")
-        except Exception as e:
-            print(f"Could not retrieve age and gender demographics: {str(e)}")
-        
-        try:
-            # Get viewer demographics by geography (countries)
-            # Using views instead of viewerPercentage for better compatibility
-            geography_request = youtube_analytics.reports().query(
-                ids="channel==MINE",
-                startDate=start_date,
-                endDate=end_date,
-                metrics="views",
-                dimensions="country",
-                sort="-views",
-                maxResults=25
-            )
-            geography_response = geography_request.execute()
-            print("Successfully retrieved country demographics")
-        except Exception as e:
-            print(f"Could not retrieve country demographics: {str(e)}")
-        
-        try:
-            # Get viewer demographics by device type
-            device_request = youtube_analytics.reports().query(
-                ids="channel==MINE",
-                startDate=start_date,
-                endDate=end_date,
-                metrics="views",
-                dimensions="deviceType",
-                sort="-views"
-            )
-            device_response = device_request.execute()
-            print("Successfully retrieved device demographics")
-        except Exception as e:
-            print(f"Could not retrieve device demographics: {str(e)}")
+        demographics_response = responses['ageGender']
+        geography_response = responses['countries']
+        device_response = responses['devices']
         
         # Process and format the demographic data
         demographics = {
@@ -215,152 +175,24 @@ def get_channel_demographics(youtube_analytics):
         }
 
 
-def get_performance_metrics(youtube_analytics):
+def get_performance_metrics(responses):
     """
-    Retrieves overall channel performance metrics.
+    Builds overall channel performance metrics from the 30-day, 90-day and
+    year-to-date totals, monthly growth and average view percentage reports.
     """
     try:
-        # Get current date and format properly
-        now = datetime.now()
-        end_date = now.strftime('%Y-%m-%d')
-        
-        # For monthly dimension, start date must be the first day of a month
-        first_day_current_month = datetime(now.year, now.month, 1)
-        start_date_30d = (now - timedelta(days=30)).strftime('%Y-%m-%d')
-        start_date_90d = (now - timedelta(days=90)).strftime('%Y-%m-%d')
-        
-        # For year to date, use January 1st of current year
-        start_date_ytd = datetime(now.year, 1, 1).strftime('%Y-%m-%d')
-        
-        # For monthly data, go back 12 months but align to first day of month
-        twelve_months_ago = first_day_current_month.replace(year=first_day_current_month.year - 1)
-        start_date_monthly = twelve_months_ago.strftime('%Y-%m-%d')
-        
-        print(f"Performance date ranges: 30d({start_date_30d}), 90d({start_date_90d}), YTD({start_date_ytd}), Monthly({start_date_monthly})")
-        
-        # Initialize response variables with default empty data
-        metrics_30d_response = {"rows": [[0, 0, 0, 0, 0, 0, 0]]}
-        metrics_90d_response = {"rows": [[0, 0, 0, 0, 0, 0, 0]]}
-        metrics_ytd_response = {"rows": [[0, 0, 0, 0, 0, 0, 0]]}
-        monthly_data_response = {"rows": []}
-        watch_percentage_response = {"rows": [[0]]}
-        
-        try:
-            # Get 30-day metrics
-            metrics_30d_request = youtube_analytics.reports().query(
-                ids="channel==MINE",
-                startDate=start_date_30d,
-                endDate=end_date,
-                metrics="views,estimatedMinutesWatched,averageViewDuration,subscribersGained,likes,comments,shares"
-            )
-            metrics_30d_response = metrics_30d_request.execute()
-            print("Successfully retrieved 30-day metrics")
-        except Exception as e:
-            print(f"Could not retrieve 30-day metrics: {str(e)}")
-        
-        try:
-            # Get 90-day metrics
-            metrics_90d_request = youtube_analytics.reports().query(
-                ids="channel==MINE",
-                startDate=start_date_90d,
-                endDate=end_date,
-                metrics="views,estimatedMinutesWatched,averageViewDuration,subscribersGained,likes,comments,shares"
-            )
-            metrics_90d_response = metrics_90d_request.execute()
-            print("Successfully retrieved 90-day metrics")
-        except Exception as e:
-            print(f"Could not retrieve 90-day metrics: {str(e)}")
-        
-        try:
-            # Get year-to-date metrics
-            metrics_ytd_request = youtube_analytics.reports().query(
-                ids="channel==MINE",
-                startDate=start_date_ytd,
-                endDate=end_date,
-                metrics="views,estimatedMinutesWatched,averageViewDuration,subscribersGained,likes,comments,shares"
-            )
-            metrics_ytd_response = metrics_ytd_request.execute()
-            print("Successfully retrieved year-to-date metrics")
-        except Exception as e:
-            print(f"Could not retrieve year-to-date metrics: {str(e)}")
-        
-        try:
-            # Get monthly data for growth chart - ensuring dates align with month boundaries
-            monthly_data_request = youtube_analytics.reports().query(
-                ids="channel==MINE",
-                startDate=start_date_monthly,
-                endDate=end_date,
-                metrics="views,subscribersGained",
-                dimensions="month",
-                sort="month"
-            )
-            monthly_data_response = monthly_data_request.execute()
-            print("Successfully retrieved monthly growth data")
-        except Exception as e:
-            print(f"Could not retrieve monthly growth data: {str(e)}")
-        
-        try:
-            # Get average watch percentage
-            watch_percentage_request = youtube_analytics.reports().query(
-                ids="channel==MINE",
-                startDate=start_date_90d,
-                endDate=end_date,
-                metrics="averageViewPercentage"
-            )
-            watch_percentage_response = watch_percentage_request.execute()
-            print("Successfully retrieved average view percentage")
-        except Exception as e:
-            watch_percentage_response = {"rows": [[0]]}
-            print(f"Could not retrieve average view percentage: {str(e)}")
+        monthly_data_response = responses['monthlyGrowth']
+        watch_percentage_response = responses['averageViewPercentage']
         
         # Process the metrics data
         performance = {
-            'last30Days': {},
-            'last90Days': {},
-            'yearToDate': {},  # Changed from lastYear to yearToDate for accuracy
+            'last30Days': totals_section(responses['last30Days']),
+            'last90Days': totals_section(responses['last90Days']),
+            'yearToDate': totals_section(responses['yearToDate']),  # Changed from lastYear to yearToDate for accuracy
             'monthlyGrowth': [],
             'averages': {}
         }
         
-        # Extract values from the 30-day metrics
-        if 'rows' in metrics_30d_response and metrics_30d_response['rows']:
-            row = metrics_30d_response['rows'][0]
-            performance['last30Days'] = {
-                'views': row[0],
-                'watchTimeMinutes': row[1],
-                'avgViewDuration': row[2],
-                'subscribersGained': row[3],
-                'likes': row[4],
-                'comments': row[5],
-                'shares': row[6]
-            }
-        
-        # Extract values from the 90-day metrics
-        if 'rows' in metrics_90d_response and metrics_90d_response['rows']:
-            row = metrics_90d_response['rows'][0]
-            performance['last90Days'] = {
-                'views': row[0],
-                'watchTimeMinutes': row[1],
-                'avgViewDuration': row[2],
-                'subscribersGained': row[3],
-                'likes': row[4],
-                'comments': row[5],
-                'shares': row[6]
-            }
-        
-        # Extract values from the year-to-date metrics
-        if 'rows' in metrics_ytd_response and metrics_ytd_response['rows']:
-            row = metrics_ytd_response['rows'][0]
-            performance['yearToDate'] = {
-                'views': row[0],
-                'watchTimeMinutes': row[1],
-                'avgViewDuration': row[2],
-                'subscribersGained': row[3],
-                'likes': row[4],
-                'comments': row[5],
-                'shares': row[6]
-            }
-        
         # Process monthly growth data
         if 'rows' in monthly_data_response:
             for row in monthly_data_response['rows']:
@@ -443,9 +275,11 @@ def get_top_videos(youtube, channel_info):
                     id=','.join(video_ids)
                 )
                 videos_response = videos_request.execute()
+                video_items = videos_response.get('items', [])
+                duration_seconds = iso_durations_to_seconds([video['contentDetails']['duration'] for video in video_items])
                 
                 # Add videos to our list
-                for video in videos_response.get('items', []):
+                for video, video_duration_seconds in zip(video_items, duration_seconds):
                     video_data = {
                         'id': video['id'],
                         'title': video['snippet']['title'],
@@ -454,7 +288,8 @@ def get_top_videos(youtube, channel_info):
                         'viewCount': int(video['statistics'].get('viewCount', 0)),
                         'likeCount': int(video['statistics'].get('likeCount', 0)),
                         'commentCount': int(video['statistics'].get('commentCount', 0)),
-                        'duration': video['contentDetails']['duration']
+                        'duration': video['contentDetails']['duration'],
+                        'durationSeconds': int(video_duration_seconds)
                     }
                     videos.append(video_data)
             
@@ -488,9 +323,11 @@ def get_top_videos(youtube, channel_info):
         }
 
 
-def create_media_kit():
+def create_media_kit(engine=None):
     """
     Creates a comprehensive media kit with all channel statistics.
+    The Analytics report queries run concurrently on `engine` (a FetchEngine
+    is created if not given) while the channel info and top videos are fetched.
     """
     try:
         print("Authenticating with YouTube API...")
@@ -520,41 +357,44 @@ def create_media_kit():
             }
         }
         
-        # Try to get each section independently so if one fails, the others still work
-        try:
-            print("Retrieving channel information...")
-            channel_info = get_channel_info(youtube)
-            media_kit['channelInfo'] = channel_info
-        except Exception as e:
-            print(f"Error retrieving channel info: {str(e)}")
-        
-        try:
-            print("Retrieving audience demographics...")
-            demographics = get_channel_demographics(youtube_analytics)
-            media_kit['audience'] = demographics
-        except Exception as e:
-            print(f"Error retrieving demographics: {str(e)}")
+        # Start all Analytics report queries first, then fetch the channel info and
+        # top videos while they run; each section still fails on its own
+        owns_engine = engine is None
+        if owns_engine:
+            engine = FetchEngine()
         
         try:
-            print("Retrieving performance metrics...")
-            performance = get_performance_metrics(youtube_analytics)
-            media_kit['performance'] = performance
-        except Exception as e:
-            print(f"Error retrieving performance metrics: {str(e)}")
-        
-        try:
-            print("Retrieving top videos...")
-            if 'channelInfo' in media_kit and media_kit['channelInfo']:
-                videos_data = get_top_videos(youtube, media_kit['channelInfo'])
-                media_kit['topContent'] = videos_data
-                
-                # Update average views per video in performance metrics
-                if videos_data['totalVideos'] > 0 and 'averages' in media_kit['performance']:
-                    media_kit['performance']['averages']['viewsPerVideo'] = videos_data['averageViews']
-            else:
-                print("Skipping top videos retrieval as channel info is not available")
-        except Exception as e:
-            print(f"Error retrieving top videos: {str(e)}")
+            print("Retrieving audience demographics and performance metrics...")
+            report_futures = submit_reports(engine, youtube_analytics, "channel==MINE", MEDIA_KIT_REPORTS)
+            
+            try:
+                print("Retrieving channel information...")
+                channel_info = get_channel_info(youtube)
+                media_kit['channelInfo'] = channel_info
+            except Exception as e:
+                print(f"Error retrieving channel info: {str(e)}")
+            
+            videos_data = None
+            try:
+                print("Retrieving top videos...")
+                if 'channelInfo' in media_kit and media_kit['channelInfo']:
+                    videos_data = get_top_videos(youtube, media_kit['channelInfo'])
+                    media_kit['topContent'] = videos_data
+                else:
+                    print("Skipping top videos retrieval as channel info is not available")
+            except Exception as e:
+                print(f"Error retrieving top videos: {str(e)}")
+            
+            responses = collect_reports(report_futures)
+            media_kit['audience'] = get_channel_demographics(responses)
+            media_kit['performance'] = get_performance_metrics(responses)
+            
+            # Update average views per video in performance metrics
+            if videos_data and videos_data['totalVideos'] > 0 and 'averages' in media_kit['performance']:
+                media_kit['performance']['averages']['viewsPerVideo'] = videos_data['averageViews']
+        finally:
+            if owns_engine:
+                engine.close()
         
         # Save to JSON file
         output_file = 'youtube_media_kit.json'
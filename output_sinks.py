@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Video Data Output Sinks
+
+Writes extracted video data in one of several formats:
+- csv_json: youtube_video_data_<CHANNEL_ID>.csv and .json, overwritten every run
+- parquet / arrow: a columnar dataset partitioned by channel and extraction date,
+  youtube_video_dataset/channel_id=<CHANNEL_ID>/extracted_date=<YYYY-MM-DD>/videos.<ext>,
+  so every day's snapshot is kept and readers can load single columns or partitions
+
+pyarrow is only needed for the parquet and arrow formats and is imported on use.
+"""
+
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+OUTPUT_FORMATS = ('csv_json', 'parquet', 'arrow')
+DEFAULT_OUTPUT_FORMAT = 'csv_json'
+
+# Root directory of the partitioned parquet/arrow dataset
+DATASET_DIR = 'youtube_video_dataset'
+
+# File name and extension of each dataset format
+DATASET_FILES = {
+    'parquet': 'videos.parquet',
+    'arrow': 'videos.arrow'
+}
+
+# Column types used in the parquet/arrow datasets (pyarrow type names).
+# Columns not listed keep the type pandas infers for them.
+VIDEO_COLUMN_TYPES = {
+    'video_id': 'string',
+    'title': 'string',
+    'published_at': 'timestamp',
+    'thumbnail_url': 'string',
+    'duration': 'string',
+    'duration_seconds': 'int64',
+    'views': 'int64',
+    'likes': 'int64',
+    'comments': 'int64',
+    'engagement_rate': 'float64',
+    'avg_view_duration_seconds': 'float64',
+    'avg_view_duration': 'string',
+    'retention_rate': 'float64',
+    'shares': 'int64',
+    'subscribers_gained': 'int64',
+    'subscribers_lost': 'int64'
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("The parquet and arrow output formats need pyarrow. Install it with: pip install pyarrow")
+    return pyarrow
+
+
+def _partition_dir(channel_id, extracted_date, dataset_dir=DATASET_DIR):
+    return os.path.join(dataset_dir, f"channel_id={channel_id}", f"extracted_date={extracted_date}")
+
+
+def _videos_table(video_data, channel, extracted_at):
+    """
+    Builds a typed pyarrow Table from the exported video entries, with the
+    channel details and extraction time stored in the schema metadata.
+    """
+    pa = _require_pyarrow()
+
+    df = pd.DataFrame(video_data)
+    fields = []
+    for column in df.columns:
+        type_name = VIDEO_COLUMN_TYPES.get(column)
+        if type_name == 'timestamp':
+            df[column] = pd.to_datetime(df[column], utc=True)
+            fields.append(pa.field(column, pa.timestamp('ms', tz='UTC')))
+        elif type_name in ('int64', 'float64'):
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+            if type_name == 'int64':
+                # Nullable so videos without analytics stay null instead of 0
+                df[column] = df[column].round().astype('Int64')
+            fields.append(pa.field(column, getattr(pa, type_name)()))
+        elif type_name == 'string':
+            fields.append(pa.field(column, pa.string()))
+        else:
+            fields.append(pa.field(column, pa.Schema.from_pandas(df[[column]], preserve_index=False).field(column).type))
+
+    schema = pa.schema(fields, metadata={
+        'channel': json.dumps(channel, ensure_ascii=False),
+        'extracted_at': extracted_at
+    })
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def write_csv_json(channel, df, video_data, extracted_at):
+    """
+    Writes youtube_video_data_<CHANNEL_ID>.csv and .json (the original export format).
+
+    Returns:
+        List of files written
+    """
+    output_file_csv = f"youtube_video_data_{channel['id']}.csv"
+    output_file_json = f"youtube_video_data_{channel['id']}.json"
+
+    # Save to CSV
+    df.to_csv(output_file_csv, index=False)
+
+    # Save full data to JSON
+    with open(output_file_json, 'w', encoding='utf-8') as f:
+        json.dump({
+            'channel': channel,
+            'videos': video_data,
+            'extracted_at': extracted_at
+        }, f, ensure_ascii=False, indent=2)
+
+    return [output_file_csv, output_file_json]
+
+
+def write_dataset(channel, video_data, extracted_at, output_format='parquet', dataset_dir=DATASET_DIR):
+    """
+    Writes the videos into the channel's partition for the extraction date.
+    A second run on the same day replaces that day's snapshot; earlier days are kept.
+
+    Args:
+        channel: Channel dictionary (name, id, subscribers)
+        video_data: List of exported video entries
+        extracted_at: Extraction timestamp ('%Y-%m-%d %H:%M:%S')
+        output_format: 'parquet' or 'arrow' (Arrow IPC / Feather v2)
+        dataset_dir: Root directory of the dataset
+
+    Returns:
+        List of files written
+    """
+    _require_pyarrow()
+
+    table = _videos_table(video_data, channel, extracted_at)
+    partition_dir = _partition_dir(channel['id'], extracted_at[:10], dataset_dir)
+    os.makedirs(partition_dir, exist_ok=True)
+
+    output_file = os.path.join(partition_dir, DATASET_FILES[output_format])
+    temp_file = output_file + '.tmp'
+    if output_format == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, temp_file, compression='zstd')
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(table, temp_file, compression='zstd')
+    os.replace(temp_file, output_file)
+
+    return [output_file]
+
+
+def write_video_data(channel, df, video_data, output_format=DEFAULT_OUTPUT_FORMAT, extracted_at=None):
+    """
+    Writes the extracted video data with the chosen output sink.
+
+    Args:
+        channel: Channel dictionary (name, id, subscribers)
+        df: DataFrame of the videos (used for the CSV export)
+        video_data: List of exported video entries
+        output_format: One of OUTPUT_FORMATS
+        extracted_at: Extraction timestamp (default: now)
+
+    Returns:
+        List of files written
+    """
+    extracted_at = extracted_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    if output_format == 'csv_json':
+        return write_csv_json(channel, df, video_data, extracted_at)
+    if output_format in DATASET_FILES:
+        return write_dataset(channel, video_data, extracted_at, output_format)
+    raise ValueError(f"Unknown output format '{output_format}'. Expected one of: {', '.join(OUTPUT_FORMATS)}.")
+
+
+def _partition_values(path):
+    """
+    Reads the key=value partition directories in a path.
+    """
+    values = {}
+    for part in os.path.normpath(path).split(os.sep):
+        key, sep, value = part.partition('=')
+        if sep:
+            values[key] = value
+    return values
+
+
+def find_dataset_files(path, channel_id=None, extracted_date=None):
+    """
+    Finds the dataset files under a dataset root, channel partition, date
+    partition or single file. Without an extracted_date, only each channel's
+    latest snapshot is returned.
+
+    Returns:
+        List of (file path, partition values) tuples
+    """
+    if os.path.isfile(path):
+        candidates = [path]
+    else:
+        candidates = []
+        for root, _, files in os.walk(path):
+            candidates.extend(os.path.join(root, name) for name in files if name in DATASET_FILES.values())
+
+    latest = {}
+    for file_path in sorted(candidates):
+        values = _partition_values(os.path.dirname(os.path.abspath(file_path)))
+        if channel_id and values.get('channel_id') != channel_id:
+            continue
+        if extracted_date and values.get('extracted_date') != extracted_date:
+            continue
+        key = values.get('channel_id')
+        if key not in latest or values.get('extracted_date', '') > latest[key][1].get('extracted_date', ''):
+            latest[key] = (file_path, values)
+
+    return list(latest.values())
+
+
+def is_dataset_path(path):
+    """
+    Returns True if a path points at a parquet/arrow dataset rather than a JSON export.
+    """
+    return os.path.isdir(path) or path.endswith(('.parquet', '.arrow'))
+
+
+def load_video_dataset(path=DATASET_DIR, channel_id=None, extracted_date=None, columns=None):
+    """
+    Loads one channel's snapshot from a parquet/arrow dataset.
+
+    Args:
+        path: Dataset root, channel or date partition directory, or a single file
+        channel_id: Channel to load (needed when the dataset holds several channels)
+        extracted_date: Snapshot date (YYYY-MM-DD); default is the latest one
+        columns: Only read these video columns (default: all)
+
+    Returns:
+        Dictionary shaped like the JSON export: {'channel', 'videos', 'extracted_at'}
+    """
+    _require_pyarrow()
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    matches = find_dataset_files(path, channel_id, extracted_date)
+    if not matches:
+        raise FileNotFoundError(f"No video dataset files found under {path}")
+    if len(matches) > 1:
+        channels = ', '.join(sorted(values.get('channel_id', '?') for _, values in matches))
+        raise ValueError(f"{path} holds several channels ({channels}); pass a channel ID or a channel partition directory.")
+
+    file_path, values = matches[0]
+    if file_path.endswith('.parquet'):
+        schema = pq.read_schema(file_path)
+        read_table = pq.read_table
+    else:
+        schema = feather.read_table(file_path, memory_map=True).schema
+        read_table = feather.read_table
+    # Older snapshots may lack newer columns; skip them instead of failing
+    if columns is not None:
+        columns = [column for column in columns if column in schema.names]
+    table = read_table(file_path, columns=columns)
+
+    metadata = table.schema.metadata or {}
+    channel = json.loads(metadata.get(b'channel', b'{}'))
+    channel.setdefault('id', values.get('channel_id'))
+
+    df = table.to_pandas()
+    # Keep timestamps in the same ISO 8601 form as the JSON export
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+    df = df.astype(object).where(df.notna(), None)
+
+    return {
+        'channel': channel,
+        'videos': df.to_dict('records'),
+        'extracted_at': metadata.get(b'extracted_at', b'').decode('utf-8') or None
+    }
+
+
+def load_previous_videos(channel_id, output_format=DEFAULT_OUTPUT_FORMAT):
+    """
+    Loads the video entries of a channel's last export in the given format,
+    or an empty list if there is none.
+    """
+    try:
+        if output_format == 'csv_json':
+            with open(f"youtube_video_data_{channel_id}.json", 'r', encoding='utf-8') as f:
+                return json.load(f).get('videos', [])
+        return load_video_dataset(os.path.join(DATASET_DIR, f"channel_id={channel_id}"))['videos']
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        print(f"Could not read previous export for {channel_id}: {str(e)}")
+        return []
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Map-Reduce Patterns Input
+
+The patterns report used to send every per-video analysis to Gemini in one
+prompt, which only works for a handful of videos. condense_analyses() keeps
+that prompt within a token budget: when the analyses do not fit, they are
+packed into chunks that do, each chunk is summarized concurrently (map), and
+the summaries are joined for the patterns report (reduce). If the summaries
+still do not fit, they are chunked and summarized again, so any number of
+videos is handled with a bounded prompt size and latency per call.
+
+Chunk summaries are cached in the LLM cache by chunk content, so re-running
+after adding a few videos only summarizes the chunks that changed.
+
+Configured with environment variables:
+- PATTERNS_TOKEN_BUDGET: estimated prompt tokens per Gemini call (default: 16000)
+"""
+
+import os
+
+from async_engine import DEFAULT_MAX_CONCURRENCY, FetchEngine, model_api
+from llm_cache import get_cache, input_hash, model_name
+from llm_metrics import CHARS_PER_TOKEN, estimate_tokens, generate_content, record_cache_hit
+
+PATTERNS_TOKEN_BUDGET = int(os.environ.get('PATTERNS_TOKEN_BUDGET', 16000))
+CHUNK_SUMMARY_PROMPT_VERSION = 'chunk-summary-v1'
+
+# Upper bound on each chunk summary, so every reduce level shrinks the input
+SUMMARY_MAX_OUTPUT_TOKENS = 1024
+
+# Summarize at most this many times before truncating what is left
+MAX_REDUCE_LEVELS = 4
+
+CHUNK_SUMMARY_PROMPT = (
+    "You are an expert in YouTube content strategy. Below are analyses of several top-performing "
+    "YouTube videos. Summarize the patterns and success factors they share in their titles and "
+    "thumbnails, noting how many videos show each pattern and keeping specific examples (titles, "
+    "metrics) that support it. Also note any standout exceptions. Be concise.\n\n"
+)
+
+
+def join_analyses(analyses):
+    """
+    Joins analyses into one patterns prompt input, separated by blank lines.
+    """
+    return "".join(analysis + "\n\n" for analysis in analyses)
+
+
+def chunk_analyses(analyses, token_budget=PATTERNS_TOKEN_BUDGET):
+    """
+    Packs analyses, in order, into chunks whose joined text fits the token budget.
+    An analysis larger than the budget on its own is truncated to fit.
+
+    Returns:
+        List of chunks, each a list of analysis texts
+    """
+    max_chars = token_budget * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    current_chars = 0
+    for analysis in analyses:
+        analysis = analysis[:max_chars - 2]
+        size = len(analysis) + 2
+        if current and current_chars + size > max_chars:
+            chunks.append(current)
+            current = []
+            current_chars = 0
+        current.append(analysis)
+        current_chars += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def summarize_chunk(model, chunk_text):
+    """
+    Summarizes one chunk of analyses with Gemini, using the cached summary when
+    the same chunk was summarized before.
+
+    Returns:
+        Summary text, or None on errors
+    """
+    cache = get_cache()
+    name = model_name(model)
+    cache_key = input_hash(chunk_text)
+
+    cached_summary = cache.get(name, CHUNK_SUMMARY_PROMPT_VERSION, cache_key)
+    if cached_summary is not None:
+        record_cache_hit('summarize_chunk', model)
+        return cached_summary
+
+    try:
+        response = generate_content(
+            'summarize_chunk',
+            model,
+            CHUNK_SUMMARY_PROMPT + chunk_text,
+            generation_config={'max_output_tokens': SUMMARY_MAX_OUTPUT_TOKENS}
+        )
+        summary = response.text
+        cache.set(name, CHUNK_SUMMARY_PROMPT_VERSION, cache_key, summary)
+        return summary
+    except Exception as e:
+        print(f"Error summarizing analyses chunk: {e}")
+        return None
+
+
+def condense_analyses(analyses, model, token_budget=PATTERNS_TOKEN_BUDGET, max_in_flight=DEFAULT_MAX_CONCURRENCY):
+    """
+    Returns the patterns report input for a list of analyses, summarized
+    chunk by chunk until it fits the token budget. Analyses that already fit
+    are joined unchanged.
+
+    Args:
+        analyses: List of per-video analysis texts
+        model: Gemini model used for the chunk summaries
+        token_budget: Estimated prompt tokens allowed per call
+        max_in_flight: Maximum number of chunk summaries running at once
+
+    Returns:
+        Text to pass to the patterns report prompt
+    """
+    texts = list(analyses)
+    joined = join_analyses(texts)
+    if estimate_tokens(joined) <= token_budget:
+        return joined
+
+    with FetchEngine(max_concurrency=max_in_flight) as engine:
+        for level in range(1, MAX_REDUCE_LEVELS + 1):
+            chunks = [join_analyses(chunk) for chunk in chunk_analyses(texts, token_budget)]
+            print(f"Summarizing {len(texts)} analyses in {len(chunks)} chunks (level {level}, ~{estimate_tokens(joined)} tokens)...")
+            summaries = engine.map(model_api(model), lambda chunk: summarize_chunk(model, chunk), chunks)
+            # Keep a failed chunk's text rather than losing its videos
+            texts = [summary if summary else chunk for summary, chunk in zip(summaries, chunks)]
+            joined = join_analyses(texts)
+            if estimate_tokens(joined) <= token_budget:
+                return joined
+
+    print(f"Analyses still exceed the token budget after {MAX_REDUCE_LEVELS} levels; truncating")
+    return joined[:token_budget * CHARS_PER_TOKEN]
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+YouTube API Quota Ledger
+
+Records every executed YouTube API request (endpoint, quota unit cost and
+latency) in a persistent daily ledger, and plans multi-channel runs so the
+YouTube Data API daily quota is never exceeded.
+
+The Data API quota resets at midnight Pacific Time, so ledger days follow that
+clock. YouTube Analytics API calls are logged for latency but cost no Data API
+units.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from cassette import replaying
+
+# Default YouTube Data API quota granted to a project per day
+DEFAULT_DAILY_QUOTA = 10000
+
+# Quota units charged per call, keyed by googleapiclient method ID.
+# Any other YouTube Data API method costs DEFAULT_DATA_API_COST.
+QUOTA_COSTS = {
+    'youtube.search.list': 100,
+    'youtube.videos.insert': 1600,
+    'youtube.videos.update': 50,
+    'youtube.videos.rate': 50,
+    'youtube.videos.delete': 50,
+    'youtube.thumbnails.set': 50,
+    'youtube.commentThreads.insert': 50,
+    'youtube.comments.insert': 50,
+    'youtube.playlists.insert': 50,
+    'youtube.playlistItems.insert': 50
+}
+DEFAULT_DATA_API_COST = 1
+
+# Directory holding one ledger file per quota day (quota_ledger_YYYY-MM-DD.jsonl)
+QUOTA_LEDGER_DIR = os.environ.get('YT_QUOTA_LEDGER_DIR', 'quota_ledger')
+
+QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+
+# Page size used by playlistItems().list and videos().list when walking a channel
+PAGE_SIZE = 50
+
+_ledger_lock = threading.Lock()
+
+
+def quota_day(now=None):
+    """
+    Returns the current quota day (YYYY-MM-DD in Pacific Time).
+    """
+    return (now or datetime.now(QUOTA_TIMEZONE)).astimezone(QUOTA_TIMEZONE).strftime('%Y-%m-%d')
+
+
+def ledger_path(day=None):
+    """
+    Returns the ledger file path for a quota day (default: today).
+    """
+    return os.path.join(QUOTA_LEDGER_DIR, f"quota_ledger_{day or quota_day()}.jsonl")
+
+
+def quota_cost(endpoint):
+    """
+    Returns the Data API quota units charged for one call to an endpoint.
+
+    Args:
+        endpoint: googleapiclient method ID (e.g. 'youtube.search.list')
+    """
+    if endpoint in QUOTA_COSTS:
+        return QUOTA_COSTS[endpoint]
+    if endpoint.startswith('youtube.'):
+        return DEFAULT_DATA_API_COST
+    # YouTube Analytics (youtubeAnalytics.*) has its own, separate quota
+    return 0
+
+
+def record_call(endpoint, latency_seconds, status='ok', cost=None):
+    """
+    Appends one API call to today's ledger.
+
+    Args:
+        endpoint: googleapiclient method ID
+        latency_seconds: Wall time of the call
+        status: 'ok' or an error description (failed calls still cost quota)
+        cost: Quota units charged (default: looked up in QUOTA_COSTS)
+    """
+    entry = {
+        'timestamp': datetime.now(QUOTA_TIMEZONE).isoformat(),
+        'endpoint': endpoint,
+        'cost': quota_cost(endpoint) if cost is None else cost,
+        'latency_ms': round(latency_seconds * 1000, 1),
+        'status': status
+    }
+
+    with _ledger_lock:
+        os.makedirs(QUOTA_LEDGER_DIR, exist_ok=True)
+        with open(ledger_path(), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+
+
+def _error_status(error):
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    return f"error {status}" if status else f"error {type(error).__name__}"
+
+
+def execute_metered(request, http=None):
+    """
+    Executes a googleapiclient request and records it in the ledger.
+
+    Args:
+        request: googleapiclient HttpRequest
+        http: Optional HTTP client to execute the request with
+
+    Returns:
+        The parsed API response
+    """
+    if replaying():
+        # Replayed calls spend no quota
+        return request.execute(http=http) if http is not None else request.execute()
+
+    endpoint = getattr(request, 'methodId', None) or 'unknown'
+    started_at = time.monotonic()
+    try:
+        response = request.execute(http=http) if http is not None else request.execute()
+    except Exception as e:
+        record_call(endpoint, time.monotonic() - started_at, status=_error_status(e))
+        raise
+    record_call(endpoint, time.monotonic() - started_at)
+    return response
+
+
+class MeteredBatch:
+    """
+    BatchHttpRequest wrapper that records each request it carries in the
+    ledger with its own status: failures of single requests (e.g. a 403 on a
+    video with comments disabled) reach the batch callback rather than
+    execute(), so they are taken from there. Every request in a batch is
+    charged as if it were sent on its own; the batch's latency is split
+    evenly between them. Create it with new_metered_batch().
+    """
+
+    def __init__(self, service, callback=None):
+        self._callback = callback
+        self._batch = service.new_batch_http_request(callback=self._handle_response)
+        self._endpoints = {}
+        self._statuses = {}
+
+    def add(self, request, callback=None, request_id=None):
+        """
+        Adds a request to the batch, like BatchHttpRequest.add(). Requests
+        added without a request_id get one, so their response can be matched.
+        """
+        if request_id is None:
+            request_id = f"metered-{len(self._endpoints) + 1}"
+        self._batch.add(request, callback=callback, request_id=request_id)
+        self._endpoints[request_id] = getattr(request, 'methodId', None) or 'unknown'
+
+    def _handle_response(self, request_id, response, exception):
+        self._statuses[request_id] = 'ok' if exception is None else _error_status(exception)
+        if self._callback is not None:
+            self._callback(request_id, response, exception)
+
+    def execute(self):
+        """
+        Executes the batch. If the whole batch fails, its requests that got
+        no response are recorded with the batch's error.
+        """
+        if replaying():
+            # Replayed calls spend no quota
+            self._batch.execute()
+            return
+
+        started_at = time.monotonic()
+        batch_status = 'ok'
+        try:
+            self._batch.execute()
+        except Exception as e:
+            batch_status = _error_status(e)
+            raise
+        finally:
+            latency = (time.monotonic() - started_at) / max(1, len(self._endpoints))
+            for request_id, endpoint in self._endpoints.items():
+                record_call(endpoint, latency, status=self._statuses.get(request_id, batch_status))
+
+
+def new_metered_batch(service, callback=None):
+    """
+    Creates a batch request whose requests are recorded in the ledger.
+
+    Args:
+        service: googleapiclient service object
+        callback: Optional callback(request_id, response, exception) called
+            for every response, as with service.new_batch_http_request()
+
+    Returns:
+        MeteredBatch to add() requests to and execute()
+    """
+    return MeteredBatch(service, callback)
+
+
+def load_ledger(day=None):
+    """
+    Reads all ledger entries for a quota day (default: today).
+    """
+    path = ledger_path(day)
+    if not os.path.exists(path):
+        return []
+
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A run killed mid-write can leave a truncated last line
+                    continue
+    return entries
+
+
+def units_used(day=None):
+    """
+    Returns the quota units spent on a quota day (default: today).
+    """
+    return sum(entry.get('cost', 0) for entry in load_ledger(day))
+
+
+def summarize_ledger(day=None):
+    """
+    Aggregates a day's ledger by endpoint.
+
+    Returns:
+        Dictionary mapping endpoint to calls, units, errors and average/max latency (ms)
+    """
+    summary = {}
+    for entry in load_ledger(day):
+        stats = summary.setdefault(entry['endpoint'], {'calls': 0, 'units': 0, 'errors': 0, 'total_latency_ms': 0.0, 'max_latency_ms': 0.0})
+        stats['calls'] += 1
+        stats['units'] += entry.get('cost', 0)
+        stats['errors'] += entry.get('status') != 'ok'
+        stats['total_latency_ms'] += entry.get('latency_ms', 0)
+        stats['max_latency_ms'] = max(stats['max_latency_ms'], entry.get('latency_ms', 0))
+
+    for stats in summary.values():
+        stats['avg_latency_ms'] = round(stats.pop('total_latency_ms') / stats['calls'], 1)
+    return summary
+
+
+def print_quota_summary(daily_quota=DEFAULT_DAILY_QUOTA, day=None):
+    """
+    Prints today's quota usage per endpoint and the remaining budget.
+    """
+    summary = summarize_ledger(day)
+    used = sum(stats['units'] for stats in summary.values())
+
+    print(f"\nQUOTA USAGE ({day or quota_day()}, Pacific Time):")
+    print(f"Units used: {used} of {daily_quota} ({max(0, daily_quota - used)} remaining)")
+    for endpoint, stats in sorted(summary.items(), key=lambda item: -item[1]['units']):
+        print(f"- {endpoint}: {stats['calls']} calls, {stats['units']} units, "
+              f"{stats['errors']} errors, avg {stats['avg_latency_ms']}ms, max {stats['max_latency_ms']}ms")
+
+
+def estimate_channel_cost(video_count, max_videos=None, include_comments=False):
+    """
+    Estimates the Data API units needed to extract one channel.
+
+    A channel extraction costs one channels().list call, then one
+    playlistItems().list and one videos().list call per page of 50 videos
+    (plus one commentThreads().list per video when comments are fetched).
+    Analytics queries are free in Data API terms.
+
+    Args:
+        video_count: Number of videos the channel has
+        max_videos: Maximum number of videos the run will extract (None for all)
+        include_comments: Whether comments are fetched for every video
+
+    Returns:
+        Estimated quota units
+    """
+    videos = video_count if max_videos is None else min(video_count, max_videos)
+    pages = max(1, math.ceil(videos / PAGE_SIZE))
+    cost = quota_cost('youtube.channels.list') + pages * (quota_cost('youtube.playlistItems.list') + quota_cost('youtube.videos.list'))
+    if include_comments:
+        cost += videos * quota_cost('youtube.commentThreads.list')
+    return cost
+
+
+def plan_channel_runs(channel_costs, budget):
+    """
+    Chooses which channels to refresh within a quota budget.
+    Cheapest channels are scheduled first, which fits the largest number of
+    channel refreshes into the budget; channels that no longer fit are deferred.
+
+    Args:
+        channel_costs: Dictionary mapping channel ID to estimated quota units
+        budget: Quota units available for this run
+
+    Returns:
+        Tuple of (scheduled channel IDs in run order, deferred channel IDs)
+    """
+    scheduled, deferred = [], []
+    remaining = budget
+    for channel_id, cost in sorted(channel_costs.items(), key=lambda item: item[1]):
+        if cost <= remaining:
+            scheduled.append(channel_id)
+            remaining -= cost
+        else:
+            deferred.append(channel_id)
+    return scheduled, deferred
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Thumbnail Store
+
+Downloads video thumbnails through one pooled requests.Session (with
+timeouts and retries), keeps them in a local content-addressed image store,
+and downscales them to the size the vision model needs before upload.
+
+Stored thumbnails are reused without any network traffic while they are
+fresh (THUMBNAIL_MAX_AGE_HOURS); after that they are revalidated with
+If-None-Match / If-Modified-Since, so an unchanged thumbnail costs a 304
+instead of a full download.
+
+Layout of THUMBNAIL_STORE_DIR (default: thumbnail_store/):
+- objects/<sha256[:2]>/<sha256>: original image bytes, stored once per distinct image
+- resized/<sha256>_<size>.jpg: downscaled copies sent to the vision model
+- index.json: URL -> sha256, ETag, Last-Modified and fetch time
+- index.log.jsonl: index updates since index.json was written, one JSON line
+  each; the first index load of every run compacts them into index.json, so
+  a run appends one line per thumbnail instead of rewriting the whole index
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from io import BytesIO
+
+from cassette import get_url
+
+THUMBNAIL_STORE_DIR = os.environ.get('THUMBNAIL_STORE_DIR', 'thumbnail_store')
+
+# Stored thumbnails younger than this are used without revalidating
+THUMBNAIL_MAX_AGE_HOURS = float(os.environ.get('THUMBNAIL_MAX_AGE_HOURS', 24 * 7))
+
+# Longest edge, in pixels, of the images sent to the vision model. Larger
+# images are scaled down on the vision side anyway, so uploading more only
+# adds bandwidth and latency.
+VISION_MAX_SIZE = 768
+VISION_JPEG_QUALITY = 85
+
+# (connect, read) timeout in seconds
+REQUEST_TIMEOUT = (5, 20)
+MAX_RETRIES = 3
+POOL_SIZE = 16
+
+_session = None
+_session_lock = threading.Lock()
+_index_lock = threading.Lock()
+_index = None
+
+
+def get_session():
+    """
+    Returns the shared requests.Session used for thumbnail downloads, with a
+    connection pool sized for concurrent analysis and retries on connection
+    errors, 429 and 5xx responses.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            retry = Retry(
+                total=MAX_RETRIES,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['GET'])
+            )
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def _index_path():
+    return os.path.join(THUMBNAIL_STORE_DIR, 'index.json')
+
+
+def _object_path(digest):
+    return os.path.join(THUMBNAIL_STORE_DIR, 'objects', digest[:2], digest)
+
+
+def _resized_path(digest, max_size):
+    return os.path.join(THUMBNAIL_STORE_DIR, 'resized', f"{digest}_{max_size}.jpg")
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def _index_log_path():
+    return os.path.join(THUMBNAIL_STORE_DIR, 'index.log.jsonl')
+
+
+def _apply_index_log(path, index):
+    """Applies the updates in an index log to index, skipping truncated lines."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                update = json.loads(line)
+                index[update['url']] = update['entry']
+            except (ValueError, KeyError, TypeError):
+                continue
+
+
+def _load_index():
+    global _index
+    if _index is None:
+        try:
+            with open(_index_path(), 'r', encoding='utf-8') as f:
+                _index = json.load(f)
+        except FileNotFoundError:
+            _index = {}
+        except Exception as e:
+            print(f"Could not read thumbnail index, starting a new one: {str(e)}")
+            _index = {}
+
+        # Compact the updates logged by earlier runs. The log is moved aside
+        # first, so a concurrent run's later appends start a new log.
+        compacting_path = f"{_index_log_path()}.{os.getpid()}.compacting"
+        try:
+            os.replace(_index_log_path(), compacting_path)
+        except FileNotFoundError:
+            pass
+        else:
+            _apply_index_log(compacting_path, _index)
+            _write_atomic(_index_path(), json.dumps(_index, indent=2).encode('utf-8'))
+            os.remove(compacting_path)
+    return _index
+
+
+def _update_index(url, entry):
+    line = json.dumps({'url': url, 'entry': entry}) + '\n'
+    with _index_lock:
+        _load_index()[url] = entry
+        os.makedirs(THUMBNAIL_STORE_DIR, exist_ok=True)
+        with open(_index_log_path(), 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+def _read_object(digest):
+    try:
+        with open(_object_path(digest), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def store_image(image_bytes):
+    """
+    Adds image bytes to the content-addressed store.
+
+    Returns:
+        The image's sha256 hex digest
+    """
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    if not os.path.exists(_object_path(digest)):
+        _write_atomic(_object_path(digest), image_bytes)
+    return digest
+
+
+def fetch_thumbnail(url, max_age_hours=THUMBNAIL_MAX_AGE_HOURS):
+    """
+    Returns a thumbnail's image bytes, from the store when possible.
+
+    Args:
+        url: Thumbnail URL
+        max_age_hours: Use a stored copy without revalidating if it is younger than this
+
+    Returns:
+        Tuple of (sha256 digest, image bytes), or (None, None) if the image could not be retrieved
+    """
+    with _index_lock:
+        entry = dict(_load_index().get(url) or {})
+    stored = _read_object(entry['sha256']) if entry.get('sha256') else None
+
+    if stored is not None and time.time() - entry.get('fetched_at', 0) < max_age_hours * 3600:
+        return entry['sha256'], stored
+
+    headers = {}
+    if stored is not None:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    try:
+        response = get_url(url, session=get_session(), headers=headers, timeout=REQUEST_TIMEOUT)
+    except Exception as e:
+        if stored is not None:
+            print(f"Could not revalidate thumbnail {url} ({str(e)}); using stored copy")
+            return entry['sha256'], stored
+        print(f"Error downloading thumbnail {url}: {str(e)}")
+        return None, None
+
+    if response.status_code == 304 and stored is not None:
+        entry['fetched_at'] = time.time()
+        _update_index(url, entry)
+        return entry['sha256'], stored
+
+    if response.status_code != 200:
+        if stored is not None:
+            return entry['sha256'], stored
+        return None, None
+
+    digest = store_image(response.content)
+    _update_index(url, {
+        'sha256': digest,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'content_type': response.headers.get('Content-Type'),
+        'fetched_at': time.time()
+    })
+    return digest, response.content
+
+
+# Leading bytes of the image formats thumbnails come in
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif')
+]
+
+
+def image_mime_type(image_bytes, default='image/jpeg'):
+    """
+    Returns the MIME type of image bytes from their signature.
+    """
+    if image_bytes[:4] == b'RIFF' and image_bytes[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if image_bytes.startswith(signature):
+            return mime_type
+    return default
+
+
+def downscale_image(image_bytes, max_size=VISION_MAX_SIZE):
+    """
+    Scales an image down so its longest edge is at most max_size pixels and
+    re-encodes it as JPEG. Images that are already small enough are only
+    re-encoded if they are not JPEGs.
+
+    Returns:
+        JPEG bytes
+    """
+    from PIL import Image
+
+    with Image.open(BytesIO(image_bytes)) as image:
+        if max(image.size) <= max_size and image.format == 'JPEG':
+            return image_bytes
+        image = image.convert('RGB')
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        output = BytesIO()
+        image.save(output, format='JPEG', quality=VISION_JPEG_QUALITY, optimize=True)
+        return output.getvalue()
+
+
+def get_vision_image(url, max_size=VISION_MAX_SIZE):
+    """
+    Returns a thumbnail as a Gemini image part, downscaled for the vision model.
+    Downscaled copies are stored too, so re-runs skip both the download and the resize.
+    If resizing fails, the original image is sent with its own MIME type and
+    nothing is stored, so the next run tries again.
+
+    Args:
+        url: Thumbnail URL
+        max_size: Longest edge of the uploaded image, in pixels
+
+    Returns:
+        {"mime_type": ..., "data": bytes}, or None if the image could not be retrieved
+    """
+    digest, image_bytes = fetch_thumbnail(url)
+    if image_bytes is None:
+        return None
+
+    resized_path = _resized_path(digest, max_size)
+    try:
+        with open(resized_path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        try:
+            data = downscale_image(image_bytes, max_size)
+        except Exception as e:
+            print(f"Could not resize thumbnail {url} ({str(e)}); sending original")
+            return {
+                "mime_type": image_mime_type(image_bytes),
+                "data": image_bytes
+            }
+        _write_atomic(resized_path, data)
+
+    return {
+        "mime_type": "image/jpeg",
+        "data": data
+    }
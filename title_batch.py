@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Batched Title Analysis
+
+Analyzing one title per Gemini request spends most of every round trip on
+fixed overhead and the repeated instructions. analyze_titles_batched() packs
+up to TITLE_BATCH_SIZE uncached titles into one request that asks for a JSON
+list with one analysis per title, and stores every analysis in the LLM cache
+as its own entry, exactly where the single-title analysis looks for it.
+Titles missing from a batch response (or a batch that fails to parse) fall
+back to single-title calls.
+
+Configured with environment variables:
+- TITLE_BATCH_SIZE: titles per request (default: 20, 1 disables batching)
+"""
+
+import json
+import os
+
+from async_engine import model_api
+from llm_cache import get_cache, input_hash, model_name
+from llm_metrics import generate_content, record_cache_hit
+
+TITLE_BATCH_SIZE = int(os.environ.get('TITLE_BATCH_SIZE', 20))
+
+BATCH_TITLE_PROMPT = (
+    "You are an expert in YouTube content strategy and SEO. For each numbered YouTube title below, "
+    "identify the key patterns and elements that make it effective, focusing on psychological triggers, "
+    "keywords, structure, emotion, and clarity, and explain why it's effective.\n\n"
+    "Return ONLY a JSON list with one object per title, in the same order, each with the keys "
+    "\"id\" (the title's number) and \"analysis\" (the analysis as a string).\n\n"
+)
+
+
+def parse_batch_response(text, count):
+    """
+    Parses a batched title response into analyses by position.
+
+    Args:
+        text: Response text (a JSON list, possibly wrapped in a markdown code block)
+        count: Number of titles in the batch
+
+    Returns:
+        Dictionary mapping title index (0-based) to analysis text; titles
+        missing from the response are left out
+    """
+    cleaned = text.strip().replace("```json", "").replace("```", "").strip()
+    try:
+        items = json.loads(cleaned)
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(items, list):
+        return {}
+
+    analyses = {}
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get('analysis'), str) or not item['analysis'].strip():
+            continue
+        try:
+            index = int(item.get('id')) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < count:
+            analyses[index] = item['analysis']
+    return analyses
+
+
+def analyze_title_batch(titles, model, prompt_version):
+    """
+    Analyzes a batch of titles in one Gemini request and caches each analysis.
+
+    Returns:
+        Dictionary mapping title to analysis for the titles the response covered
+    """
+    prompt = BATCH_TITLE_PROMPT + "\n".join(f"{index}. \"{title}\"" for index, title in enumerate(titles, 1))
+    try:
+        response = generate_content('analyze_title_batch', model, prompt)
+        analyses = parse_batch_response(response.text, len(titles))
+    except Exception as e:
+        print(f"Error analyzing batch of {len(titles)} titles: {e}")
+        return {}
+
+    cache = get_cache()
+    name = model_name(model)
+    results = {}
+    for index, analysis in analyses.items():
+        cache.set(name, prompt_version, input_hash(titles[index]), analysis)
+        results[titles[index]] = analysis
+    return results
+
+
+def analyze_titles_batched(engine, titles, model, prompt_version, single_fn, batch_size=TITLE_BATCH_SIZE):
+    """
+    Analyzes many titles with as few Gemini requests as possible. Cached titles
+    are returned directly, the rest are analyzed batch_size at a time, and
+    titles a batch did not cover are analyzed one by one with single_fn.
+
+    Args:
+        engine: FetchEngine to run the requests on
+        titles: Titles to analyze
+        model: Gemini model for the batched requests
+        prompt_version: Prompt version of the single-title cache entries to fill
+        single_fn: Callable(title) analyzing one title, used as fallback
+        batch_size: Maximum number of titles per request
+
+    Returns:
+        Dictionary mapping each title to its analysis
+    """
+    cache = get_cache()
+    name = model_name(model)
+    results = {}
+    pending = []
+    for title in dict.fromkeys(titles):
+        cached_analysis = cache.get(name, prompt_version, input_hash(title))
+        if cached_analysis is not None:
+            record_cache_hit('analyze_title_batch', model)
+            results[title] = cached_analysis
+        else:
+            pending.append(title)
+
+    if not pending:
+        return results
+
+    batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+    print(f"Analyzing {len(pending)} titles in {len(batches)} batched requests...")
+    futures = [engine.submit(model_api(model), analyze_title_batch, batch, model, prompt_version) for batch in batches]
+    for future in futures:
+        results.update(future.result())
+
+    missing = [title for title in pending if title not in results]
+    if missing:
+        print(f"Falling back to single requests for {len(missing)} titles")
+        futures = {title: engine.submit(model_api(model), single_fn, title) for title in missing}
+        for title, future in futures.items():
+            results[title] = future.result()
+    return results
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Title Features
+
+Local, heuristic title features computed for a whole catalog in one
+vectorized pandas pass: length, numerals, brackets, caps ratio, question and
+exclamation marks, emotive and power words, and "how to" / listicle
+patterns. Joined to each video's views, engagement and retention, they give
+instant title insight for thousands of videos without a Gemini round trip,
+leaving the LLM analysis for the few videos that need deep commentary.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+EMOTIVE_WORDS = [
+    'amazing', 'awesome', 'best', 'crazy', 'epic', 'shocking', 'insane', 'incredible', 'unbelievable',
+    'love', 'hate', 'worst', 'surprising', 'terrifying', 'heartbreaking', 'hilarious', 'beautiful',
+    'scary', 'funny', 'sad', 'angry', 'happy', 'emotional', 'perfect', 'ultimate', 'wow'
+]
+
+POWER_WORDS = [
+    'secret', 'secrets', 'proven', 'easy', 'free', 'fast', 'quick', 'simple', 'complete', 'guide',
+    'essential', 'never', 'always', 'instantly', 'new', 'exclusive', 'mistake', 'mistakes', 'hack',
+    'hacks', 'tips', 'tricks', 'why', 'truth', 'everything', 'beginner', 'beginners', 'vs'
+]
+
+EMOTIVE_RE = r'\b(?:' + '|'.join(map(re.escape, EMOTIVE_WORDS)) + r')\b'
+POWER_RE = r'\b(?:' + '|'.join(map(re.escape, POWER_WORDS)) + r')\b'
+HOW_TO_RE = r'\bhow (?:to|i|we|you)\b'
+# "7 Ways...", "Top 10...", "5 Things You..."
+LISTICLE_RE = r'^\s*(?:top\s+)?\d+\s+\w+|\btop\s+\d+\b|\b\d+\s+(?:ways|things|tips|reasons|tricks|mistakes|ideas|steps|facts|secrets|hacks)\b'
+
+# Boolean features compared in the report, with their display names
+REPORT_FEATURES = [
+    ('has_numeral', 'Contains a number'),
+    ('has_brackets', 'Uses brackets/parentheses'),
+    ('has_question', 'Asks a question'),
+    ('has_exclamation', 'Uses an exclamation mark'),
+    ('has_all_caps_word', 'Has an ALL-CAPS word'),
+    ('has_emotive_word', 'Uses emotive words'),
+    ('has_power_word', 'Uses power words'),
+    ('is_how_to', '"How to" title'),
+    ('is_listicle', 'Listicle ("7 ways...", "Top 10...")'),
+    ('has_separator', 'Uses a separator (| - :)')
+]
+
+
+def extract_title_features(titles):
+    """
+    Computes heuristic features for many titles at once.
+
+    Args:
+        titles: Sequence or Series of video titles
+
+    Returns:
+        DataFrame with one row per title (same index as a given Series)
+    """
+    titles = pd.Series(titles, dtype=object).fillna('').astype(str)
+    lower = titles.str.lower()
+
+    letters = titles.str.count(r'[^\W\d_]')
+    uppercase = titles.str.count(r'[A-Z]')
+    numerals = titles.str.count(r'\d+')
+    all_caps_words = titles.str.count(r'\b[A-Z]{2,}\b')
+
+    features = pd.DataFrame({
+        'title_length': titles.str.len(),
+        'word_count': titles.str.split().str.len().fillna(0).astype(int),
+        'numeral_count': numerals,
+        'has_numeral': numerals > 0,
+        'has_brackets': titles.str.contains(r'[\(\[\{]', regex=True),
+        'caps_ratio': np.round(np.where(letters > 0, uppercase / letters.where(letters > 0, 1), 0.0), 3),
+        'all_caps_words': all_caps_words,
+        'has_all_caps_word': all_caps_words > 0,
+        'has_question': titles.str.contains('?', regex=False),
+        'has_exclamation': titles.str.contains('!', regex=False),
+        'emotive_words': lower.str.count(EMOTIVE_RE),
+        'power_words': lower.str.count(POWER_RE),
+        'is_how_to': lower.str.contains(HOW_TO_RE, regex=True),
+        'is_listicle': lower.str.contains(LISTICLE_RE, regex=True),
+        'has_separator': titles.str.contains(r'\s[|\-:]\s|:\s', regex=True)
+    }, index=titles.index)
+    features['has_emotive_word'] = features['emotive_words'] > 0
+    features['has_power_word'] = features['power_words'] > 0
+    return features
+
+
+def title_performance_frame(video_data):
+    """
+    Joins title features to video performance.
+
+    Args:
+        video_data: List of video data dictionaries (or a DataFrame) with
+            'title', 'views', 'engagement_rate' and optionally 'retention_rate'
+
+    Returns:
+        DataFrame of performance columns followed by the title features
+    """
+    videos = video_data if isinstance(video_data, pd.DataFrame) else pd.DataFrame(video_data)
+    columns = [column for column in ['video_id', 'title', 'views', 'engagement_rate', 'retention_rate'] if column in videos.columns]
+    performance = videos[columns].reset_index(drop=True)
+    for column in ['views', 'engagement_rate', 'retention_rate']:
+        if column in performance.columns:
+            performance[column] = pd.to_numeric(performance[column], errors='coerce')
+    return performance.join(extract_title_features(performance['title']))
+
+
+def summarize_title_features(frame):
+    """
+    Compares the performance of videos with and without each title feature.
+
+    Args:
+        frame: DataFrame from title_performance_frame()
+
+    Returns:
+        List of dictionaries (feature, name, share of videos, median views and
+        mean engagement with and without it, views lift), most common feature first
+    """
+    summary = []
+    for feature, name in REPORT_FEATURES:
+        mask = frame[feature].to_numpy(dtype=bool)
+        count = int(mask.sum())
+        if count == 0:
+            continue
+        with_views = frame['views'][mask].median()
+        without_views = frame['views'][~mask].median() if count < len(frame) else np.nan
+        summary.append({
+            'feature': feature,
+            'name': name,
+            'videos': count,
+            'share': count / len(frame),
+            'median_views_with': with_views,
+            'median_views_without': without_views,
+            'views_lift': with_views / without_views if without_views and not np.isnan(without_views) else None,
+            'engagement_with': frame['engagement_rate'][mask].mean(),
+            'engagement_without': frame['engagement_rate'][~mask].mean() if count < len(frame) else np.nan
+        })
+    return sorted(summary, key=lambda item: item['videos'], reverse=True)
+
+
+def format_title_feature_report(video_data):
+    """
+    Builds the title features section of the video performance report.
+
+    Args:
+        video_data: List of video data dictionaries
+
+    Returns:
+        Report text
+    """
+    frame = title_performance_frame(video_data)
+    report = "\nTITLE FEATURES (heuristic, all videos):\n"
+    report += f"Average title length: {frame['title_length'].mean():.1f} characters, {frame['word_count'].mean():.1f} words\n"
+    report += f"Average caps ratio: {frame['caps_ratio'].mean():.2f}\n"
+
+    for item in summarize_title_features(frame):
+        line = f"- {item['name']}: {item['videos']} videos ({item['share']:.0%}), median views {int(item['median_views_with'])}"
+        if item['views_lift'] is not None:
+            line += f" vs {int(item['median_views_without'])} without ({item['views_lift']:.2f}x)"
+        line += f", engagement {item['engagement_with']:.2f}%"
+        if not np.isnan(item['engagement_without']):
+            line += f" vs {item['engagement_without']:.2f}%"
+        report += line + "\n"
+
+    # Views by title length quartile
+    if len(frame) >= 4 and frame['title_length'].nunique() > 1:
+        quartiles = pd.qcut(frame['title_length'], 4, duplicates='drop')
+        report += "Median views by title length:\n"
+        for interval, views in frame.groupby(quartiles, observed=True)['views'].median().items():
+            report += f"- {int(interval.left) + 1}-{int(interval.right)} characters: {int(views)}\n"
+
+    return report
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Local Topic Engine
+
+Discovers a channel's topics locally instead of asking Gemini for the topic
+of every top video: titles, tags and descriptions are turned into a sparse
+TF-IDF matrix, clustered with k-means (or factorized with NMF), and every
+topic gets performance aggregates (video count, mean views, retention,
+shares and weighted score, see video_scoring.py) over the whole catalog.
+Topic discovery for a catalog of thousands of videos takes seconds and costs
+no API calls, and the content planner only uses Gemini for the final plan.
+
+scikit-learn is only needed here and is imported on use.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from video_scoring import DEFAULT_WEIGHTS, metric_values, score
+
+TOPIC_METHODS = ('kmeans', 'nmf')
+
+# Bounds of the automatic topic count (about one topic per 20 videos)
+MIN_TOPICS = 2
+MAX_TOPICS = 25
+VIDEOS_PER_TOPIC = 20
+
+# Vocabulary size of the TF-IDF matrix
+MAX_FEATURES = 20000
+
+# Separates the parts of a video's document (title, each tag, description
+# lines); n-grams never span two parts
+SEGMENT_SEPARATOR = '\n'
+
+# Metrics averaged per topic when the videos have them
+TOPIC_METRICS = ['views', 'engagement_rate', 'retention_rate', 'shares']
+
+
+def _require_sklearn():
+    try:
+        import sklearn
+    except ImportError:
+        raise ImportError("Local topic discovery needs scikit-learn. Install it with: pip install scikit-learn")
+    return sklearn
+
+
+def video_document(video):
+    """
+    Returns the text a video is clustered by: its title (twice, so it
+    outweighs long descriptions), tags and description, as SEGMENT_SEPARATOR
+    separated parts.
+    """
+    title = video.get('title') or ''
+    tags = video.get('tags')
+    if isinstance(tags, str):
+        tags = [tags]
+    elif tags is None or (isinstance(tags, float) and np.isnan(tags)):
+        tags = []
+    description = video.get('description') or ''
+    if not isinstance(description, str):
+        description = ''
+    parts = [title, title] + [str(tag) for tag in tags] + [description]
+    # Keep separators inside a title or tag from splitting it
+    parts = [part.replace(SEGMENT_SEPARATOR, ' ') for part in parts[:-1]] + parts[-1:]
+    return SEGMENT_SEPARATOR.join(parts)
+
+
+def segment_analyzer(analyzer):
+    """
+    Wraps a vectorizer analyzer so it analyzes each SEGMENT_SEPARATOR
+    separated part of a document on its own, so no n-gram spans two parts
+    (e.g. "world hello" from a title "hello world" repeated).
+    """
+    def analyze(document):
+        terms = []
+        for segment in document.split(SEGMENT_SEPARATOR):
+            terms.extend(analyzer(segment))
+        return terms
+    return analyze
+
+
+def default_topic_count(video_count):
+    """Returns the number of topics used when none is given."""
+    return int(min(MAX_TOPICS, max(MIN_TOPICS, round(video_count / VIDEOS_PER_TOPIC))))
+
+
+def cluster_documents(documents, n_topics, method='kmeans', top_terms=6, random_state=0):
+    """
+    Clusters documents into topics.
+
+    Args:
+        documents: List of document strings
+        n_topics: Number of topics (capped at the number of documents)
+        method: 'kmeans' or 'nmf'
+        top_terms: Number of terms describing each topic
+        random_state: Seed, so re-runs give the same topics
+
+    Returns:
+        Tuple of (array with the topic of every document, list of term lists per topic)
+    """
+    if method not in TOPIC_METHODS:
+        raise ValueError(f"Unknown topic method '{method}', expected one of {', '.join(TOPIC_METHODS)}")
+    _require_sklearn()
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    analyzer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2)).build_analyzer()
+    vectorizer = TfidfVectorizer(
+        analyzer=segment_analyzer(analyzer),
+        sublinear_tf=True,
+        # Terms found in a single video cannot describe a topic, except in tiny catalogs
+        min_df=2 if len(documents) >= 50 else 1,
+        max_df=0.5 if len(documents) >= 50 else 1.0,
+        max_features=MAX_FEATURES
+    )
+    matrix = vectorizer.fit_transform(documents)
+    terms = vectorizer.get_feature_names_out()
+    n_topics = max(1, min(n_topics, matrix.shape[0], matrix.shape[1]))
+
+    if method == 'kmeans':
+        from sklearn.cluster import KMeans
+        model = KMeans(n_clusters=n_topics, n_init=4, random_state=random_state)
+        labels = model.fit_predict(matrix)
+        term_weights = model.cluster_centers_
+    else:
+        from sklearn.decomposition import NMF
+        from sklearn.exceptions import ConvergenceWarning
+        model = NMF(n_components=n_topics, init='nndsvd', max_iter=400, random_state=random_state)
+        # An approximate factorization is good enough to name topics
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', ConvergenceWarning)
+            labels = model.fit_transform(matrix).argmax(axis=1)
+        term_weights = model.components_
+
+    top_term_indices = np.argsort(-term_weights, axis=1)[:, :top_terms]
+    topic_terms = [[terms[index] for index in row if term_weights[topic, index] > 0]
+                   for topic, row in enumerate(top_term_indices)]
+    return labels, topic_terms
+
+
+def topic_performance(videos, labels, topic_terms, scores, examples=3):
+    """
+    Aggregates video performance per topic.
+
+    Args:
+        videos: List of video dictionaries
+        labels: Topic of every video
+        topic_terms: List of term lists per topic
+        scores: Weighted score of every video
+        examples: Number of best-scoring titles kept per topic
+
+    Returns:
+        List of topic dictionaries, best mean score first
+    """
+    df = pd.DataFrame({
+        'topic': labels,
+        'title': [video.get('title', '') for video in videos],
+        'score': scores
+    })
+    metrics = [metric for metric in TOPIC_METRICS if any(metric in video for video in videos)]
+    for metric in metrics:
+        df[metric] = metric_values(videos, metric)
+
+    grouped = df.groupby('topic')
+    aggregates = grouped[['score'] + metrics].mean()
+    counts = grouped.size()
+
+    topics = []
+    for topic, row in aggregates.sort_values('score', ascending=False).iterrows():
+        best = df[df['topic'] == topic].nlargest(examples, 'score')
+        topics.append({
+            'topic_id': int(topic),
+            'label': ', '.join(topic_terms[topic][:3]) or f"Topic {topic + 1}",
+            'terms': topic_terms[topic],
+            'video_count': int(counts[topic]),
+            'mean_score': float(row['score']),
+            'metrics': {metric: float(row[metric]) for metric in metrics},
+            'example_titles': best['title'].tolist()
+        })
+    return topics
+
+
+def discover_topics(videos, n_topics=None, method='kmeans', weights=None, scoring='minmax'):
+    """
+    Discovers the topics of a catalog and ranks them by performance.
+
+    Args:
+        videos: List of video dictionaries (title, and optionally tags and description)
+        n_topics: Number of topics (default: about one per VIDEOS_PER_TOPIC videos)
+        method: 'kmeans' or 'nmf'
+        weights: Metric weights of the video score (default: DEFAULT_WEIGHTS)
+        scoring: 'minmax' or 'rank' normalization of the score
+
+    Returns:
+        List of topic dictionaries, best mean score first (empty if the
+        videos have no usable text)
+    """
+    if not videos:
+        return []
+    weights = weights or DEFAULT_WEIGHTS
+    documents = [video_document(video) for video in videos]
+    try:
+        labels, topic_terms = cluster_documents(documents, n_topics or default_topic_count(len(videos)), method)
+    except ValueError as e:
+        # TfidfVectorizer raises this when no terms are left (e.g. only stop words)
+        if 'empty vocabulary' not in str(e):
+            raise
+        print(f"Warning: Could not discover topics: {e}")
+        return []
+
+    scores = score({metric: metric_values(videos, metric) for metric in weights}, weights, scoring)
+    return topic_performance(videos, labels, topic_terms, scores)
+
+
+def format_metrics(metrics):
+    """Formats a topic's mean metrics, e.g. "12,345 avg views, 41.2% avg retention"."""
+    parts = []
+    if 'views' in metrics:
+        parts.append(f"{metrics['views']:,.0f} avg views")
+    if 'engagement_rate' in metrics:
+        parts.append(f"{metrics['engagement_rate']:.2f}% avg engagement")
+    if 'retention_rate' in metrics:
+        parts.append(f"{metrics['retention_rate']:.1f}% avg retention")
+    if 'shares' in metrics:
+        parts.append(f"{metrics['shares']:,.1f} avg shares")
+    return ', '.join(parts)
+
+
+def format_topics_for_prompt(topics, limit=5):
+    """
+    Describes the best-performing topics for the content plan prompt.
+
+    Args:
+        topics: Topic dictionaries from discover_topics()
+        limit: Number of topics to describe
+
+    Returns:
+        Multi-line string, one line per topic
+    """
+    lines = []
+    for topic in topics[:limit]:
+        line = f"- {', '.join(topic['terms'])} ({topic['video_count']} videos"
+        metrics = format_metrics(topic['metrics'])
+        if metrics:
+            line += f"; {metrics}"
+        line += ")"
+        if topic['example_titles']:
+            line += f", e.g. \"{'; '.join(topic['example_titles'][:2])}\""
+        lines.append(line)
+    return '\n'.join(lines)